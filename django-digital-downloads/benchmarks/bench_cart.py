@@ -0,0 +1,65 @@
+"""
+Queries and latency per cart operation (page view and AJAX mutations).
+
+    python -m benchmarks.bench_cart
+"""
+
+import json
+
+from benchmarks.harness import bench_database, measure, report, setup_django
+
+CART_LINES = 20
+
+
+def main() -> None:
+    setup_django()
+    from catalog.models import Product
+    from django.test import Client
+    from django.urls import reverse
+
+    with bench_database():
+        products = Product.objects.bulk_create(
+            [
+                Product(slug=f"p{i}", title=f"Track {i}", price_pennies=100 + i)
+                for i in range(CART_LINES)
+            ]
+        )
+        client = Client()
+        for p in products:
+            client.get(reverse("cart:add", args=[p.id]))
+        target = products[0]
+
+        def post(name, **payload):
+            url = reverse(name, args=[target.id])
+            return lambda: client.post(
+                url,
+                data=json.dumps(payload),
+                content_type="application/json",
+                HTTP_X_REQUESTED_WITH="XMLHttpRequest",
+            )
+
+        results = [
+            measure("cart view", lambda: client.get(reverse("cart:view"))),
+            measure("ajax add", post("cart:add", qty=1)),
+            measure("ajax update", post("cart:update", qty=2)),
+            measure("ajax remove + re-add", _remove_readd(client, target)),
+        ]
+        report(f"Cart with {CART_LINES} lines", results)
+
+
+def _remove_readd(client, product):
+    from django.urls import reverse
+
+    def run():
+        client.post(
+            reverse("cart:remove_json"),
+            data=json.dumps({"product_id": str(product.id)}),
+            content_type="application/json",
+        )
+        client.get(reverse("cart:add", args=[product.id]))
+
+    return run
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Replay benchmark for conditional GET: the same browser/CDN revisits
+replayed with and without the validators from the first response.
+
+Reports bytes sent and CPU time per request for each page.
+
+    python -m benchmarks.bench_conditional_get
+"""
+
+import time
+
+from benchmarks.harness import bench_database, setup_django
+
+PRODUCTS = 200
+REVIEWS = 30
+GRANTS = 50
+REPLAYS = 300
+
+
+def _replay(client, url, headers):
+    """(bytes per response, CPU ms per request, status of the last one)"""
+    sent = 0
+    start = time.process_time()
+    for _ in range(REPLAYS):
+        resp = client.get(url, **headers)
+        sent += len(resp.content)
+    cpu_ms = (time.process_time() - start) * 1000 / REPLAYS
+    return sent / REPLAYS, cpu_ms, resp.status_code
+
+
+def main() -> None:
+    setup_django()
+    from catalog.models import DigitalAsset, Product
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.urls import reverse
+    from orders.library import refresh_library
+    from orders.models import UserAsset
+    from reviews.models import Review
+
+    with bench_database():
+        products = Product.objects.bulk_create(
+            [
+                Product(slug=f"p{i}", title=f"Track {i}", price_pennies=100 + i)
+                for i in range(PRODUCTS)
+            ]
+        )
+        buyer = User.objects.create_user("buyer", password="pw")
+        reviewers = User.objects.bulk_create(
+            [User(username=f"r{i}", password="!") for i in range(REVIEWS)]
+        )
+        Review.objects.bulk_create(
+            [Review(product=products[0], user=u, rating=4) for u in reviewers]
+        )
+        assets = DigitalAsset.objects.bulk_create(
+            [
+                DigitalAsset(product=p, file_path=f"{p.slug}.mp3", file_name="a.mp3")
+                for p in products[:GRANTS]
+            ]
+        )
+        UserAsset.objects.bulk_create(
+            [
+                UserAsset(user=buyer, product_id=a.product_id, digital_asset=a)
+                for a in assets
+            ]
+        )
+        refresh_library(UserAsset.objects.filter(user=buyer))
+
+        anonymous, signed_in = Client(), Client()
+        signed_in.force_login(buyer)
+        pages = [
+            ("catalog list (anon)", anonymous, reverse("catalog:list")),
+            (
+                "product detail (anon)",
+                anonymous,
+                reverse("catalog:detail", args=[products[0].slug]),
+            ),
+            (
+                "product detail (signed in)",
+                signed_in,
+                reverse("catalog:detail", args=[products[0].slug]),
+            ),
+            ("purchases", signed_in, reverse("orders:downloads")),
+        ]
+
+        print(f"\n{REPLAYS} replays per page")
+        print(
+            f"{'page':<28}{'full B':>9}{'cond B':>9}"
+            f"{'full cpu ms':>13}{'cond cpu ms':>13}{'status':>8}"
+        )
+        for name, client, url in pages:
+            first = client.get(url)
+            client.get(url)  # warm the slug map and page caches
+            full_bytes, full_cpu, _ = _replay(client, url, {})
+            cond_bytes, cond_cpu, status = _replay(
+                client,
+                url,
+                {
+                    "HTTP_IF_NONE_MATCH": first["ETag"],
+                    "HTTP_IF_MODIFIED_SINCE": first["Last-Modified"],
+                },
+            )
+            print(
+                f"{name:<28}{full_bytes:>9.0f}{cond_bytes:>9.0f}"
+                f"{full_cpu:>13.3f}{cond_cpu:>13.3f}{status:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Signed-URL downloads vs the session-checked download_asset view.
+
+    python -m benchmarks.bench_downloads
+"""
+
+import tempfile
+from pathlib import Path
+
+from benchmarks.harness import bench_database, measure, report, setup_django
+
+FILE_SIZE = 256 * 1024
+
+
+def main() -> None:
+    setup_django()
+    from catalog.models import DigitalAsset, Product
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.urls import reverse
+    from orders.models import UserAsset
+    from orders.signing import signed_download_url
+
+    with bench_database(), tempfile.TemporaryDirectory() as media:
+        (Path(media) / "bench.mp3").write_bytes(b"\0" * FILE_SIZE)
+        user = User.objects.create_user("bench", password="bench-pass-123")
+        product = Product.objects.create(slug="bench", title="Bench", price_pennies=1)
+        asset = DigitalAsset.objects.create(
+            product=product,
+            file_path="bench.mp3",
+            file_name="bench.mp3",
+            sha256="0" * 64,
+            size_bytes=FILE_SIZE,
+        )
+        grant = UserAsset.objects.create(
+            user=user, product=product, digital_asset=asset
+        )
+        grant = UserAsset.objects.select_related("digital_asset").get(pk=grant.pk)
+
+        client = Client()
+        client.force_login(user)
+        session_url = reverse("orders:download", args=[grant.id])
+        signed_url = signed_download_url(grant)
+
+        def fetch(url):
+            return lambda: b"".join(client.get(url).streaming_content)
+
+        with override_settings(PROTECTED_MEDIA_ROOT=media):
+            results = [
+                measure("download_asset (session)", fetch(session_url)),
+                measure("signed_download (token)", fetch(signed_url)),
+            ]
+        report(f"Download of a {FILE_SIZE // 1024} KiB file", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Search latency as the catalog grows: the ranked index against a naive
+`title__icontains` scan (what the admin search does).
+
+    python -m benchmarks.bench_search
+"""
+
+import random
+
+from benchmarks.harness import bench_database, measure, report, setup_django
+
+SIZES = (1_000, 10_000, 50_000)
+WORDS = (
+    "ambient midnight drive neon rain piano echo city loop quiet light "
+    "summer dust river glass velvet static ocean ember signal"
+).split()
+
+
+def main() -> None:
+    setup_django()
+    from catalog.models import Product
+    from catalog.search import search
+
+    rng = random.Random(7)
+    with bench_database():
+        made = 0
+        for size in SIZES:
+            batch = []
+            while made < size:
+                title = " ".join(rng.sample(WORDS, 3)).title()
+                batch.append(
+                    Product(
+                        slug=f"bench-{made}",
+                        title=title,
+                        description=" ".join(rng.sample(WORDS, 8)),
+                        price_pennies=100,
+                    )
+                )
+                made += 1
+            Product.objects.bulk_create(batch, batch_size=2_000)
+
+            results = [
+                measure("search 'mid'", lambda: search("mid"), iterations=100),
+                measure("search 'neon rain'", lambda: search("neon rain")),
+                measure(
+                    "icontains 'neon rain'",
+                    lambda: list(
+                        Product.objects.filter(
+                            active=True,
+                            title__icontains="neon",
+                        ).filter(title__icontains="rain")[:20]
+                    ),
+                ),
+            ]
+            report(f"{size} products", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Type-ahead latency and memory per product for the in-process index.
+
+    python -m benchmarks.bench_suggest
+"""
+
+import random
+
+from benchmarks.harness import bench_database, measure, report, setup_django
+
+SIZES = (1_000, 10_000, 50_000)
+SYLLABLES = "ka lo mi ne ra to su vi da pe ri go an el or un".split()
+
+
+def main() -> None:
+    setup_django()
+    from catalog.models import Product
+    from catalog.suggest import index, suggest
+
+    rng = random.Random(7)
+    # A few thousand made-up words, so prefixes narrow like real titles
+    words = sorted(
+        {"".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(5000)}
+    )
+    with bench_database():
+        made = 0
+        for size in SIZES:
+            batch = []
+            while made < size:
+                title = " ".join(rng.sample(words, 3)).title()
+                batch.append(
+                    Product(slug=f"bench-{made}", title=title, price_pennies=100)
+                )
+                made += 1
+            Product.objects.bulk_create(batch, batch_size=2_000)
+            index.build()
+
+            results = [
+                measure("suggest 'k'", lambda: suggest("k"), iterations=1000),
+                measure("suggest 'kal'", lambda: suggest("kal"), iterations=1000),
+                measure("suggest 'kalo'", lambda: suggest("kalo"), iterations=1000),
+                measure("suggest 'kalo ne'", lambda: suggest("kalo ne"), 1000),
+                measure("suggest 'zzz'", lambda: suggest("zzz"), iterations=1000),
+            ]
+            stats = index.stats()
+            report(
+                f"{size} products, {stats['bytes_per_product']} bytes/product",
+                results,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Run a benchmark from the project directory (beside manage.py), e.g.:
+
+    python -m benchmarks.bench_downloads
+
+Each script works against a throwaway test database, never db.sqlite3.
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+
+def setup_django() -> None:
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def bench_database(test_name: Optional[str] = None):
+    """
+    Create a fresh test database for the duration of the block. Pass
+    `test_name` to put a SQLite test database in a file other processes
+    can open.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    if test_name:
+        connection.settings_dict["TEST"]["NAME"] = test_name
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@dataclass
+class Result:
+    name: str
+    timings_ms: List[float]
+    queries: float
+
+    def percentile(self, pct: float) -> float:
+        ordered = sorted(self.timings_ms)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def mean(self) -> float:
+        return statistics.fmean(self.timings_ms)
+
+
+def measure(
+    name: str, fn: Callable[[], object], iterations: int = 200, warmup: int = 10
+) -> Result:
+    """Time `fn` and record the average number of SQL queries per call."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    for _ in range(warmup):
+        fn()
+
+    with CaptureQueriesContext(connection) as ctx:
+        fn()
+    queries = len(ctx.captured_queries)
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return Result(name=name, timings_ms=timings, queries=queries)
+
+
+def report(title: str, results: List[Result]) -> None:
+    print(f"\n{title}")
+    print(f"{'scenario':<32}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'queries':>9}")
+    for r in results:
+        print(
+            f"{r.name:<32}{r.percentile(50):>10.3f}{r.percentile(95):>10.3f}"
+            f"{r.mean:>10.3f}{r.queries:>9}"
+        )
@@ -0,0 +1,678 @@
+"""
+End-to-end benchmark suite for the storefront.
+
+Drives the real URLconf through Django's test client (in-process, the
+default) or over HTTP against a local gunicorn (--gunicorn). Data comes
+from core.load_data, in a throwaway database unless --reuse-db is given;
+Stripe is stubbed (benchmarks.stubs).
+
+Each scenario records latency percentiles and, in-process, SQL queries and
+bytes allocated (tracemalloc peak) per request. --json saves the results
+with the commit they were taken at; --compare prints the change between
+two saved runs and exits 1 on a regression.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --json before.json
+    python -m benchmarks.run --compare before.json after.json
+    python -m benchmarks.run --gunicorn --workers 4 --only catalog
+    python -m benchmarks.run --reuse-db        # the DATABASE_URL dataset
+
+gunicorn serves static files through WhiteNoise, so run collectstatic
+first when DEBUG is off.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from pathlib import Path
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from benchmarks.harness import Result, bench_database, setup_django
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+PERCENTILES = (50, 90, 95, 99)
+# Requests per scenario that are counted for queries and allocations
+SAMPLES = 20
+DOWNLOAD_SIZE = 256 * 1024
+GRANTS = 50
+ORDERS = 20
+CART_PRODUCTS = 20
+AJAX = {"X-Requested-With": "XMLHttpRequest"}
+
+
+class Reply(NamedTuple):
+    status: int
+    body: bytes
+
+
+# Clients
+class InProcessClient:
+    """django.test.Client, with streamed bodies read in full."""
+
+    def __init__(self) -> None:
+        from django.test import Client
+
+        self.client = Client()
+
+    def login(self, user) -> None:
+        self.client.force_login(user)
+
+    def get(self, path: str, **headers) -> Reply:
+        return self._reply(self.client.get(path, headers=headers))
+
+    def post(self, path: str, data, **headers) -> Reply:
+        resp = self.client.post(
+            path,
+            data=json.dumps(data),
+            content_type="application/json",
+            headers=headers,
+        )
+        return self._reply(resp)
+
+    @staticmethod
+    def _reply(resp) -> Reply:
+        body = b"".join(resp.streaming_content) if resp.streaming else resp.content
+        return Reply(resp.status_code, body)
+
+
+class HttpClient:
+    """Keep-alive HTTP/1.1 client with a cookie jar, for the gunicorn target."""
+
+    def __init__(self, port: int) -> None:
+        self.port = port
+        self.conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        # Django accepts a client-chosen CSRF secret echoed in the header
+        self.cookies = {"csrftoken": secrets.token_hex(16)}
+
+    def login(self, user) -> None:
+        # Sessions live in the shared database, so one made here is valid there
+        from django.conf import settings
+        from django.test import Client
+
+        client = Client()
+        client.force_login(user)
+        name = settings.SESSION_COOKIE_NAME
+        self.cookies[name] = client.cookies[name].value
+
+    def get(self, path: str, **headers) -> Reply:
+        return self._request("GET", path, None, headers)
+
+    def post(self, path: str, data, **headers) -> Reply:
+        headers = {
+            "Content-Type": "application/json",
+            "X-CSRFToken": self.cookies["csrftoken"],
+            **headers,
+        }
+        return self._request("POST", path, json.dumps(data).encode(), headers)
+
+    def _request(self, method: str, path: str, body, headers: dict) -> Reply:
+        headers = {
+            # Harmless with DEBUG on; with it off, settings expect TLS at a proxy
+            "X-Forwarded-Proto": "https",
+            "Referer": f"https://127.0.0.1:{self.port}/",
+            "Cookie": "; ".join(f"{k}={v}" for k, v in self.cookies.items()),
+            **headers,
+        }
+        for attempt in (1, 2):
+            try:
+                self.conn.request(method, path, body=body, headers=headers)
+                resp = self.conn.getresponse()
+                data = resp.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The worker closed the keep-alive connection; retry once
+                self.conn.close()
+                if attempt == 2:
+                    raise
+        for header in resp.headers.get_all("Set-Cookie") or []:
+            for name, morsel in SimpleCookie(header).items():
+                if morsel["max-age"] == "0":
+                    self.cookies.pop(name, None)
+                else:
+                    self.cookies[name] = morsel.value
+        return Reply(resp.status, data)
+
+
+# Data
+@dataclass
+class Fixture:
+    user: object  # grants and past orders, for the account pages
+    buyer: object  # checks out; its orders pile up as scenarios run
+    hot: object
+    products: list
+    download_grant: object
+    run_id: str
+    sessions: Iterator[int] = field(default_factory=itertools.count)
+
+    def pending_order(self, i: int):
+        """A pending order with one item, as checkout.start leaves it."""
+        from orders.models import Order, OrderItem
+
+        product = self.products[i % len(self.products)]
+        order = Order.objects.create(
+            user=self.buyer,
+            subtotal_pennies=product.price_pennies,
+            total_pennies=product.price_pennies,
+            stripe_session_id=f"cs_bench_{self.run_id}_{next(self.sessions)}",
+        )
+        OrderItem.objects.create(
+            order=order, product=product, unit_price_pennies=product.price_pennies
+        )
+        return order
+
+
+def dataset_spec(scale: float):
+    from core.load_data import LoadSpec
+
+    def n(count: int) -> int:
+        return max(1, int(count * scale))
+
+    return LoadSpec(
+        products=n(2_000),
+        assets=n(2_000),
+        users=n(500),
+        orders=n(5_000),
+        reviews=n(5_000),
+        notes=n(500),
+    )
+
+
+def prepare(scale: float, media: Path) -> Fixture:
+    """Seed the dataset if needed and add the benchmark user's own rows."""
+    from catalog.models import DigitalAsset, Product
+    from core.load_data import already_seeded, seed
+    from django.contrib.auth.models import User
+    from orders.library import refresh_library
+    from orders.models import Order, OrderItem, UserAsset
+
+    if not already_seeded():
+        seed(dataset_spec(scale))
+
+    user, _ = User.objects.get_or_create(username="bench")
+    buyer, _ = User.objects.get_or_create(username="bench-buyer")
+    live = Product.objects.filter(active=True)
+    products = list(live.order_by("-review_count", "slug")[:CART_PRODUCTS])
+    UserAsset.objects.bulk_create(
+        [
+            UserAsset(user=user, product_id=a.product_id, digital_asset=a)
+            for a in DigitalAsset.objects.filter(product__in=live)[:GRANTS]
+        ],
+        ignore_conflicts=True,
+    )
+    refresh_library(UserAsset.objects.filter(user=user))
+    if not Order.objects.filter(user=user, status=Order.Status.PAID).exists():
+        orders = Order.objects.bulk_create(
+            [
+                Order(user=user, status=Order.Status.PAID, total_pennies=299)
+                for _ in range(ORDERS)
+            ]
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=o, product=products[0], unit_price_pennies=299)
+                for o in orders
+            ]
+        )
+
+    (media / "bench.mp3").write_bytes(b"\0" * DOWNLOAD_SIZE)
+    product, _ = Product.objects.get_or_create(
+        slug="bench-download", defaults={"title": "Bench", "price_pennies": 1}
+    )
+    asset, _ = DigitalAsset.objects.get_or_create(
+        product=product,
+        file_path="bench.mp3",
+        defaults={"file_name": "bench.mp3", "size_bytes": DOWNLOAD_SIZE},
+    )
+    grant, _ = UserAsset.objects.get_or_create(
+        user=user, digital_asset=asset, defaults={"product": product}
+    )
+    return Fixture(
+        user=user,
+        buyer=buyer,
+        hot=products[0],
+        products=products,
+        download_grant=grant,
+        run_id=secrets.token_hex(4),
+    )
+
+
+# Scenarios
+@dataclass
+class Scenario:
+    name: str
+    run: Callable[[int, object], Reply]
+    setup: Optional[Callable[[int], object]] = None
+    expect: int = 200
+
+
+def scenarios(fx: Fixture, new_client: Callable, in_process: bool) -> List[Scenario]:
+    from checkout.fulfilment import process_event
+    from checkout.models import ProcessedStripeEvent
+    from django.urls import reverse
+    from orders.signing import signed_download_url
+
+    anon, member, cart, buyer = (new_client() for _ in range(4))
+    member.login(fx.user)
+    buyer.login(fx.buyer)
+    detail = reverse("catalog:detail", args=[fx.hot.slug])
+
+    def product(i: int):
+        return fx.products[i % len(fx.products)]
+
+    def cart_add(i, _):
+        return cart.post(reverse("cart:add", args=[product(i).id]), {"qty": 1}, **AJAX)
+
+    def cart_update(i, _):
+        url = reverse("cart:update", args=[fx.hot.id])
+        return cart.post(url, {"qty": i % 5 + 1}, **AJAX)
+
+    def cart_remove(i, _):
+        payload = {"product_id": str(fx.hot.id)}
+        return cart.post(reverse("cart:remove_json"), payload, **AJAX)
+
+    def readd(i):
+        cart_add(0, None)
+
+    def new_cart(i):
+        # A different cart each time, so every start creates an order
+        buyer.post(reverse("cart:update", args=[fx.hot.id]), {"qty": i + 1}, **AJAX)
+
+    def event(order) -> dict:
+        return {
+            "id": f"evt_bench_{order.stripe_session_id}",
+            "type": "checkout.session.completed",
+            "data": {"object": {"id": order.stripe_session_id}},
+        }
+
+    def webhook(i, order):
+        return anon.post(
+            reverse("checkout:webhook"), event(order), **{"Stripe-Signature": "t=0"}
+        )
+
+    def queued(i):
+        order = fx.pending_order(i)
+        payload = event(order)
+        ProcessedStripeEvent.objects.create(
+            event_id=payload["id"], type=payload["type"], payload=payload
+        )
+        return payload["id"]
+
+    def fulfil(i, event_id):
+        return Reply(200 if process_event(event_id) else 500, b"")
+
+    buyer.get(reverse("cart:add", args=[fx.hot.id]))
+    found = [
+        Scenario("catalog list (anon)", lambda i, _: anon.get(reverse("catalog:list"))),
+        Scenario(
+            "catalog list (signed in)",
+            lambda i, _: member.get(reverse("catalog:list")),
+        ),
+        Scenario("product detail (anon)", lambda i, _: anon.get(detail)),
+        Scenario("product detail (signed in)", lambda i, _: member.get(detail)),
+        Scenario("cart add (ajax)", cart_add),
+        Scenario("cart update (ajax)", cart_update),
+        Scenario("cart remove (ajax)", cart_remove, setup=readd),
+        Scenario(
+            "checkout start",
+            lambda i, _: buyer.get(reverse("checkout:start")),
+            setup=new_cart,
+            expect=302,
+        ),
+        Scenario("webhook receive", webhook, setup=fx.pending_order),
+        Scenario("order history", lambda i, _: member.get(reverse("orders:history"))),
+        Scenario("purchases", lambda i, _: member.get(reverse("orders:downloads"))),
+        Scenario(
+            "download (session)",
+            lambda i, _: member.get(
+                reverse("orders:download", args=[fx.download_grant.id])
+            ),
+        ),
+        Scenario(
+            "download (signed url)",
+            lambda i, _: anon.get(signed_download_url(fx.download_grant)),
+        ),
+    ]
+    if in_process:
+        # The worker side of the webhook; not an HTTP request
+        found.insert(9, Scenario("webhook fulfilment", fulfil, setup=queued))
+    return found
+
+
+# Measurement
+def measure(sc: Scenario, iterations: int, warmup: int, in_process: bool) -> dict:
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    counter = itertools.count()
+
+    def prepared():
+        i = next(counter)
+        state = sc.setup(i) if sc.setup else None
+        return lambda: _checked(sc, sc.run(i, state))
+
+    for _ in range(warmup):
+        prepared()()
+
+    timings, sizes = [], []
+    for _ in range(iterations):
+        request = prepared()
+        start = time.perf_counter()
+        reply = request()
+        timings.append((time.perf_counter() - start) * 1000)
+        sizes.append(len(reply.body))
+
+    queries = allocated = None
+    if in_process:
+        counts = []
+        for _ in range(SAMPLES):
+            request = prepared()
+            with CaptureQueriesContext(connection) as ctx:
+                request()
+            counts.append(len(ctx.captured_queries))
+        peaks = []
+        tracemalloc.start()
+        try:
+            for _ in range(SAMPLES):
+                request = prepared()
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                request()
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        finally:
+            tracemalloc.stop()
+        queries = sum(counts) / len(counts)
+        allocated = sum(peaks) / len(peaks)
+
+    result = Result(name=sc.name, timings_ms=timings, queries=queries)
+    summary = {f"p{p}_ms": round(result.percentile(p), 3) for p in PERCENTILES}
+    summary.update(
+        mean_ms=round(result.mean, 3),
+        max_ms=round(max(timings), 3),
+        requests=iterations,
+        queries=queries,
+        alloc_bytes=None if allocated is None else round(allocated),
+        response_bytes=round(sum(sizes) / len(sizes)),
+    )
+    return summary
+
+
+def _checked(sc: Scenario, reply: Reply) -> Reply:
+    if reply.status != sc.expect:
+        raise RuntimeError(f"{sc.name}: HTTP {reply.status}, expected {sc.expect}")
+    return reply
+
+
+# Targets
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def gunicorn(workers: int, database_name: str, media: Path):
+    port = _free_port()
+    env = {
+        **os.environ,
+        "BENCH_DATABASE_NAME": str(database_name),
+        "PROTECTED_MEDIA_ROOT": str(media),
+    }
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "benchmarks.wsgi:application",
+            "--bind",
+            f"127.0.0.1:{port}",
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=PROJECT_DIR,
+        env=env,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("gunicorn did not start within 30s")
+                time.sleep(0.2)
+        yield port
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+@contextmanager
+def existing_database():
+    """The configured database, as is (for --reuse-db)."""
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    try:
+        yield
+    finally:
+        teardown_test_environment()
+
+
+def _commit() -> Optional[str]:
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROJECT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=PROJECT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return rev + ("-dirty" if dirty else "")
+
+
+def _run_scenarios(args, media: Path) -> dict:
+    from django.db import connection
+
+    began = time.perf_counter()
+    fx = prepare(args.scale, media)
+    print(f"Dataset ready in {time.perf_counter() - began:.1f}s")
+
+    if args.gunicorn:
+        target = gunicorn(args.workers, connection.settings_dict["NAME"], media)
+    else:
+        target = nullcontext()
+    with target as port:
+        in_process = port is None
+        if in_process:
+            new_client = InProcessClient
+        else:
+
+            def new_client():
+                return HttpClient(port)
+
+        results = {}
+        for sc in scenarios(fx, new_client, in_process):
+            if args.only and not any(o in sc.name for o in args.only):
+                continue
+            results[sc.name] = measure(sc, args.iterations, args.warmup, in_process)
+            print(f"  {sc.name}: p50 {results[sc.name]['p50_ms']:.2f} ms")
+    return results
+
+
+def run_suite(args) -> dict:
+    setup_django()
+    import django
+    from benchmarks.stubs import install_stripe_stub
+    from django.conf import settings
+    from django.db import connection
+
+    settings.DEBUG = False  # as under the test runner; no query log
+    settings.QUERY_BUDGET_MODE = "off"  # as in production
+    install_stripe_stub()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        media = Path(scratch) / "media"
+        media.mkdir()
+        file_db = None
+        if args.gunicorn and connection.vendor == "sqlite" and not args.reuse_db:
+            # gunicorn workers cannot see an in-memory test database
+            file_db = str(Path(scratch) / "bench.sqlite3")
+        database = existing_database() if args.reuse_db else bench_database(file_db)
+        with database:
+            settings.PROTECTED_MEDIA_ROOT = str(media)
+            results = _run_scenarios(args, media)
+
+    return {
+        "meta": {
+            "commit": _commit(),
+            "taken_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "target": f"gunicorn x{args.workers}" if args.gunicorn else "in-process",
+            "database": connection.vendor,
+            "dataset": "reused" if args.reuse_db else dataset_spec(args.scale).__dict__,
+            "iterations": args.iterations,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        },
+        "scenarios": results,
+    }
+
+
+# Reports
+def _num(value, fmt: str) -> str:
+    return "-" if value is None else format(value, fmt)
+
+
+def report(data: dict) -> None:
+    meta = data["meta"]
+    print(
+        f"\n{meta['target']} on {meta['database']}, commit {meta['commit']}, "
+        f"{meta['iterations']} requests per scenario"
+    )
+    print(
+        f"{'scenario':<28}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'queries':>9}{'alloc KiB':>11}{'bytes':>9}"
+    )
+    for name, r in data["scenarios"].items():
+        alloc = None if r["alloc_bytes"] is None else r["alloc_bytes"] / 1024
+        print(
+            f"{name:<28}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+            f"{_num(r['queries'], '.1f'):>9}{_num(alloc, '.1f'):>11}"
+            f"{r['response_bytes']:>9}"
+        )
+
+
+def _change(old, new) -> str:
+    if old is None or new is None:
+        return "-"
+    if not old:
+        return f"{new:g}"
+    return f"{(new - old) / old * 100:+.0f}%"
+
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    """Print the change per scenario; 1 if p95 or query counts regressed."""
+    old = json.loads(Path(old_path).read_text())
+    new = json.loads(Path(new_path).read_text())
+    print(f"\n{old['meta']['commit']} -> {new['meta']['commit']}")
+    print(
+        f"{'scenario':<28}{'p50':>8}{'p95':>8}{'queries':>10}{'alloc':>8}"
+        f"{'':>3}verdict"
+    )
+    failed = 0
+    for name, after in new["scenarios"].items():
+        before = old["scenarios"].get(name)
+        if before is None:
+            print(f"{name:<28}{'(new)':>8}")
+            continue
+        slower = after["p95_ms"] > before["p95_ms"] * (1 + threshold / 100)
+        more_queries = (
+            before["queries"] is not None
+            and after["queries"] is not None
+            and after["queries"] > before["queries"]
+        )
+        verdict = "REGRESSION" if slower or more_queries else "ok"
+        failed |= verdict != "ok"
+        print(
+            f"{name:<28}{_change(before['p50_ms'], after['p50_ms']):>8}"
+            f"{_change(before['p95_ms'], after['p95_ms']):>8}"
+            f"{_change(before['queries'], after['queries']):>10}"
+            f"{_change(before['alloc_bytes'], after['alloc_bytes']):>8}"
+            f"{'':>3}{verdict}"
+        )
+    for name in old["scenarios"].keys() - new["scenarios"].keys():
+        print(f"{name:<28}{'(gone)':>8}")
+    return int(failed)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="Multiplies the dataset size."
+    )
+    parser.add_argument(
+        "--only", action="append", help="Run scenarios whose name contains this."
+    )
+    parser.add_argument(
+        "--reuse-db",
+        action="store_true",
+        help="Use the configured database (e.g. one filled by seed_load_data).",
+    )
+    parser.add_argument("--gunicorn", action="store_true")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers.")
+    parser.add_argument("--json", metavar="PATH", help="Save results here.")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two saved runs."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=15.0,
+        help="Allowed p95 slowdown in percent before --compare fails.",
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+
+    data = run_suite(args)
+    report(data)
+    if args.json:
+        Path(args.json).write_text(json.dumps(data, indent=2) + "\n")
+        print(f"\nSaved {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
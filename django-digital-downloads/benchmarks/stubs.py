@@ -0,0 +1,33 @@
+"""
+Stand-ins for Stripe, so checkout and webhook scenarios never leave the
+machine. Used in-process by `benchmarks.run` and by `benchmarks.wsgi`.
+"""
+
+import json
+import uuid
+from types import SimpleNamespace
+
+WEBHOOK_SECRET = "whsec_bench"
+
+
+def _session(session_id: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=session_id, url=f"https://stripe.test/{session_id}", status="open"
+    )
+
+
+def install_stripe_stub() -> None:
+    """Fake Checkout Sessions and accept any webhook payload as the event."""
+    import stripe
+    from django.conf import settings
+
+    def create(**kwargs):
+        return _session(f"cs_bench_{uuid.uuid4().hex}")
+
+    def construct_event(payload, sig_header, secret):
+        return json.loads(payload)
+
+    stripe.checkout.Session.create = staticmethod(create)
+    stripe.checkout.Session.retrieve = staticmethod(_session)
+    stripe.Webhook.construct_event = staticmethod(construct_event)
+    settings.STRIPE_WEBHOOK_SECRET = WEBHOOK_SECRET
@@ -0,0 +1,25 @@
+"""
+WSGI entry point for `python -m benchmarks.run --gunicorn`.
+
+The app from config.wsgi with Stripe stubbed out, DEBUG off (as under the
+test runner), and BENCH_DATABASE_NAME, when set, replacing the database
+NAME so workers use the runner's test database.
+"""
+
+import os
+
+from benchmarks.harness import setup_django
+
+setup_django()
+
+from benchmarks.stubs import install_stripe_stub  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.core.wsgi import get_wsgi_application  # noqa: E402
+
+settings.DEBUG = False
+settings.QUERY_BUDGET_MODE = "off"
+if os.environ.get("BENCH_DATABASE_NAME"):
+    settings.DATABASES["default"]["NAME"] = os.environ["BENCH_DATABASE_NAME"]
+install_stripe_stub()
+
+application = get_wsgi_application()
@@ -0,0 +1,25 @@
+from django.conf import settings
+
+from .utils import CART_COOKIE, CART_COOKIE_SALT, NEW_CART_ATTR
+
+
+class CartMiddleware:
+    """Send the signed cookie naming a cart created during the request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        cart_id = getattr(request, NEW_CART_ATTR, None)
+        if cart_id:
+            response.set_signed_cookie(
+                CART_COOKIE,
+                cart_id,
+                salt=CART_COOKIE_SALT,
+                max_age=settings.CART_SECONDS,
+                secure=settings.SESSION_COOKIE_SECURE,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
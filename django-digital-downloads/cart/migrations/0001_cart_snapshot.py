@@ -0,0 +1,24 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="CartSnapshot",
+            fields=[
+                (
+                    "cart_id",
+                    models.CharField(max_length=32, primary_key=True, serialize=False),
+                ),
+                ("items", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("cart", "0002_cart_item"),
+        ("catalog", "0011_listing_partial_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="cartitem",
+            name="product",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="cart_items",
+                to="catalog.product",
+            ),
+        ),
+    ]
@@ -1,3 +1,54 @@
+from catalog.models import Product
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+# CART SNAPSHOT
+class CartSnapshot(models.Model):
+    """
+    Durable copy of a cache-held cart (cart.utils.CacheCartStore), written
+    behind the request and read back only when the cache has lost the cart.
+    """
+
+    cart_id = models.CharField(max_length=32, primary_key=True)
+    items = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f"Cart {self.cart_id} ({len(self.items)} lines)"
+
+
+# CART ITEMS
+class CartItem(models.Model):
+    """
+    A signed-in user's cart, one row per product. Loaded with one indexed
+    read when the cache does not have the cart (another device, restart).
+    """
+
+    # The (user, product) unique index serves lookups by user
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="cart_items",
+        db_index=False,
+    )
+    # No database constraint: a cached cart can outlive a deleted product
+    # (cart.utils.write_user_carts); Django still cascades the delete
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="cart_items",
+        db_constraint=False,
+    )
+    qty = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "product"], name="cart_cartitem_user_product_uniq"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} × {self.qty} {self.product_id}"
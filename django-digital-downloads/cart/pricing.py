@@ -0,0 +1,124 @@
+"""
+Cart pricing: turns a session cart ({product_id: qty}) into typed lines and
+totals with a single Product query. Inactive, missing or malformed product
+ids are dropped from the lines and reported in `unavailable`.
+"""
+
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Tuple
+
+from catalog.models import Product
+
+from .utils import get_cart
+
+__all__ = ["PricedLine", "PricedCart", "price_cart", "get_priced_cart"]
+
+MEMO_ATTR = "_priced_cart"
+
+
+@dataclass(frozen=True)
+class PricedLine:
+    id: str
+    slug: str
+    title: str
+    qty: int
+    unit_price: int  # pennies
+
+    @property
+    def line_total(self) -> int:
+        return self.qty * self.unit_price
+
+
+@dataclass(frozen=True)
+class PricedCart:
+    lines: Tuple[PricedLine, ...] = ()
+    unavailable: Tuple[str, ...] = ()
+
+    @property
+    def items(self) -> int:
+        return sum(line.qty for line in self.lines)
+
+    @property
+    def subtotal(self) -> int:
+        return sum(line.line_total for line in self.lines)
+
+    def totals_json(self) -> dict:
+        return {"ok": True, "items": self.items, "subtotal_pennies": self.subtotal}
+
+    def cart_json(self) -> dict:
+        """Totals plus every line, for clients that redraw the whole cart."""
+        data = self.totals_json()
+        data["lines"] = [
+            {
+                "id": line.id,
+                "qty": line.qty,
+                "unit_price_pennies": line.unit_price,
+                "line_total_pennies": line.line_total,
+            }
+            for line in self.lines
+        ]
+        return data
+
+
+def _valid_ids(cart: Mapping[str, int]) -> Dict[str, str]:
+    """Map canonical UUID strings back to the keys used in the cart."""
+    ids = {}
+    for key in cart:
+        try:
+            ids[str(uuid.UUID(str(key)))] = key
+        except ValueError:
+            continue
+    return ids
+
+
+def price_cart(cart: Mapping[str, int]) -> PricedCart:
+    """Price `cart` with one query; lines keep the cart's insertion order."""
+    cart = {str(k): int(v) for k, v in cart.items() if int(v) > 0}
+    ids = _valid_ids(cart)
+    if not ids:
+        return PricedCart(unavailable=tuple(cart))
+
+    products = {
+        str(p.id): p
+        for p in Product.objects.filter(id__in=ids.keys(), active=True).only(
+            "id", "slug", "title", "price_pennies"
+        )
+    }
+    by_key = {ids[pid]: p for pid, p in products.items()}
+
+    lines = []
+    unavailable = []
+    for key, qty in cart.items():
+        p = by_key.get(key)
+        if p is None:
+            unavailable.append(key)
+            continue
+        lines.append(
+            PricedLine(
+                id=str(p.id),
+                slug=p.slug,
+                title=p.title,
+                qty=qty,
+                unit_price=p.price_pennies,
+            )
+        )
+    return PricedCart(lines=tuple(lines), unavailable=tuple(unavailable))
+
+
+def get_priced_cart(request, cart: Optional[Mapping[str, int]] = None) -> PricedCart:
+    """
+    Price the request's cart (or `cart`), memoized on the request so the
+    same contents are never priced twice in one request.
+    """
+    if cart is None:
+        cart = get_cart(request)
+    key = tuple(sorted((str(k), int(v)) for k, v in cart.items()))
+    memo = getattr(request, MEMO_ATTR, None)
+    if memo is not None and memo[0] == key:
+        return memo[1]
+    priced = price_cart(cart)
+    setattr(request, MEMO_ATTR, (key, priced))
+    return priced
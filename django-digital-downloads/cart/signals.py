@@ -0,0 +1,11 @@
+from django.contrib.auth.signals import user_logged_in
+from django.dispatch import receiver
+
+from .utils import get_cart_store
+
+
+# Bring the cart a guest built into their account
+@receiver(user_logged_in)
+def merge_cart_on_login(sender, request, user, **kwargs):
+    if request is not None:
+        get_cart_store().merge_on_login(request, user)
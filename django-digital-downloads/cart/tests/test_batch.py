@@ -0,0 +1,111 @@
+import json
+
+import pytest
+from catalog.models import Product
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+@pytest.fixture
+def loop(db):
+    return Product.objects.create(slug="loop", title="Loop", price_pennies=250)
+
+
+def _batch(client, *ops):
+    return client.post(
+        reverse("cart:api_batch"),
+        data=json.dumps({"ops": list(ops)}),
+        content_type="application/json",
+    )
+
+
+def _cart_items(client):
+    return client.get(reverse("cart:view")).context["items"]
+
+
+# Every op is applied, products are priced in one query, one response
+@pytest.mark.django_db
+def test_batch_applies_ops_with_one_pricing_query(client, product, loop):
+    pid, lid = str(product.id), str(loop.id)
+    _batch(client, {"op": "add", "product_id": pid, "qty": 1})
+
+    with CaptureQueriesContext(connection) as ctx:
+        resp = _batch(
+            client,
+            {"op": "add", "product_id": lid, "qty": 2},
+            {"op": "set", "product_id": pid, "qty": 3},
+            {"op": "set", "product_id": lid, "qty": 4},
+            {"op": "remove", "product_id": "not-in-cart"},
+        )
+
+    pricing = [q for q in ctx.captured_queries if "catalog_product" in q["sql"]]
+    assert len(pricing) == 1
+    assert resp.json() == {
+        "ok": True,
+        "items": 7,
+        "subtotal_pennies": 3 * 499 + 4 * 250,
+        "lines": [
+            {
+                "id": pid,
+                "qty": 3,
+                "unit_price_pennies": 499,
+                "line_total_pennies": 1497,
+            },
+            {
+                "id": lid,
+                "qty": 4,
+                "unit_price_pennies": 250,
+                "line_total_pennies": 1000,
+            },
+        ],
+    }
+
+    resp = _batch(
+        client,
+        {"op": "remove", "product_id": pid},
+        {"op": "set", "product_id": lid, "qty": 0},
+    )
+    assert resp.json()["items"] == 0
+    assert _cart_items(client) == 0
+
+
+# One unavailable product rejects the whole batch
+@pytest.mark.django_db
+def test_batch_is_all_or_nothing(client, product, loop):
+    _batch(client, {"op": "add", "product_id": str(product.id), "qty": 1})
+    Product.objects.filter(pk=loop.pk).update(active=False)
+
+    resp = _batch(
+        client,
+        {"op": "set", "product_id": str(product.id), "qty": 5},
+        {"op": "add", "product_id": str(loop.id)},
+    )
+
+    assert resp.status_code == 400
+    assert resp.json()["product_ids"] == [str(loop.id)]
+    assert _cart_items(client) == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "body",
+    [
+        "not json",
+        json.dumps({"ops": []}),
+        json.dumps({"ops": [{"op": "explode", "product_id": "x"}]}),
+        json.dumps({"ops": [{"op": "set", "product_id": "x", "qty": "many"}]}),
+        json.dumps({"ops": [{"op": "add"}]}),
+    ],
+)
+def test_batch_rejects_malformed_ops(client, body):
+    resp = client.post(
+        reverse("cart:api_batch"), data=body, content_type="application/json"
+    )
+    assert resp.status_code == 400
+    assert resp.json()["ok"] is False
+
+
+@pytest.mark.django_db
+def test_batch_requires_post(client):
+    assert client.get(reverse("cart:api_batch")).status_code == 405
@@ -0,0 +1,83 @@
+import pytest
+from cart.models import CartItem
+from catalog.models import Product
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+@pytest.fixture
+def loop(db):
+    return Product.objects.create(slug="loop", title="Loop", price_pennies=250)
+
+
+def _login(client):
+    return client.post(
+        reverse("login"), {"username": "alice", "password": "testpass123"}
+    )
+
+
+def _cart(client):
+    resp = client.get(reverse("cart:view"))
+    return {line.slug: line.qty for line in resp.context["lines"]}
+
+
+# The guest cart and the stored cart are merged, priced once, written once
+@pytest.mark.django_db
+def test_login_merges_guest_cart_into_stored_cart(client, user, product, loop):
+    retired = Product.objects.create(slug="old", title="Old", price_pennies=1)
+    CartItem.objects.bulk_create(
+        [
+            CartItem(user=user, product=product, qty=3),
+            CartItem(user=user, product=retired, qty=1),
+        ]
+    )
+    Product.objects.filter(pk=retired.pk).update(active=False)
+    client.get(reverse("cart:add", args=[product.id]) + "?qty=2")
+    client.get(reverse("cart:add", args=[loop.id]))
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert _login(client).status_code == 302
+    cart_sql = [
+        q["sql"].split()[0]
+        for q in ctx.captured_queries
+        if "cart_cartitem" in q["sql"] or "catalog_product" in q["sql"]
+    ]
+
+    assert cart_sql == ["SELECT", "SELECT", "INSERT"]  # read, price, upsert
+    assert _cart(client) == {"sample": 3, "loop": 1}
+    rows = dict(CartItem.objects.values_list("product__slug", "qty"))
+    assert rows == {"sample": 3, "loop": 1, "old": 0}
+
+    client.logout()
+    assert _cart(client) == {}
+
+
+# Another device loads the cart with one indexed read
+@pytest.mark.django_db
+def test_cart_follows_user_across_devices(client, user, product, loop):
+    client.force_login(user)
+    client.get(reverse("cart:add", args=[product.id]))
+    client.get(reverse("cart:add", args=[loop.id]) + "?qty=2")
+    client.get(reverse("cart:remove", args=[product.id]))
+    cache.clear()
+
+    other = Client()
+    other.force_login(user)
+    with CaptureQueriesContext(connection) as ctx:
+        assert _cart(other) == {"loop": 2}
+    reads = [q for q in ctx.captured_queries if "cart_cartitem" in q["sql"]]
+    assert len(reads) == 1
+
+
+@pytest.mark.django_db
+def test_login_without_guest_cart_touches_nothing(client, user, product):
+    CartItem.objects.create(user=user, product=product, qty=2)
+
+    with CaptureQueriesContext(connection) as ctx:
+        _login(client)
+
+    assert not [q for q in ctx.captured_queries if "cart_" in q["sql"]]
+    assert _cart(client) == {"sample": 2}
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+from cart.models import CartSnapshot
+from cart.pricing import get_priced_cart, price_cart
+from catalog.models import Product
+from django.test.client import RequestFactory
+from django.urls import reverse
+
+
+# One query prices the cart; bad, missing and inactive ids are reported
+@pytest.mark.django_db
+def test_price_cart_single_query(product, django_assert_num_queries):
+    inactive = Product.objects.create(
+        slug="old", title="Old", price_pennies=100, active=False
+    )
+    cart = {
+        str(product.id): 3,
+        str(inactive.id): 1,
+        "not-a-uuid": 2,
+        "00000000-0000-0000-0000-000000000000": 1,
+    }
+    with django_assert_num_queries(1):
+        priced = price_cart(cart)
+
+    assert [line.id for line in priced.lines] == [str(product.id)]
+    assert priced.items == 3
+    assert priced.subtotal == 3 * product.price_pennies
+    assert set(priced.unavailable) == set(cart) - {str(product.id)}
+
+
+# Pricing is memoized per request for identical cart contents
+@pytest.mark.django_db
+def test_get_priced_cart_memoizes(product, django_assert_num_queries):
+    request = RequestFactory().get("/")
+    cart = {str(product.id): 1}
+    with django_assert_num_queries(1):
+        first = get_priced_cart(request, cart)
+        assert get_priced_cart(request, dict(cart)) is first
+    with django_assert_num_queries(1):
+        assert get_priced_cart(request, {str(product.id): 2}).items == 2
+
+
+# AJAX add prices once and rejects inactive products without saving
+@pytest.mark.django_db
+def test_ajax_add_returns_priced_totals(client, product):
+    url = reverse("cart:add", args=[product.id])
+    resp = client.post(
+        url, data=json.dumps({"qty": 2}), content_type="application/json"
+    )
+    assert resp.json() == {"ok": True, "items": 2, "subtotal_pennies": 998}
+
+    product.active = False
+    product.save()
+    resp = client.post(
+        url, data=json.dumps({"qty": 1}), content_type="application/json"
+    )
+    assert resp.status_code != 200
+    assert CartSnapshot.objects.get().items == {str(product.id): 2}
+
+
+# Cart page prunes products that became unavailable
+@pytest.mark.django_db
+def test_cart_view_prunes_unavailable(client, product):
+    client.get(reverse("cart:add", args=[product.id]))
+    Product.objects.filter(pk=product.pk).update(active=False)
+    resp = client.get(reverse("cart:view"))
+    assert resp.context["items"] == 0
+    assert not CartSnapshot.objects.exists()
@@ -0,0 +1,135 @@
+import json
+import runpy
+
+import pytest
+from cart.models import CartItem, CartSnapshot
+from cart.utils import snapshot_writer
+from catalog.models import Product
+from django.conf import settings as django_settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+def _session_writes(queries):
+    return [
+        q["sql"]
+        for q in queries
+        if "django_session" in q["sql"]
+        and q["sql"].lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))
+    ]
+
+
+# Adding, updating and removing never write the session row
+@pytest.mark.django_db
+def test_cart_changes_leave_session_alone(client, user, product):
+    client.force_login(user)
+    with CaptureQueriesContext(connection) as ctx:
+        client.get(reverse("cart:add", args=[product.id]))
+        client.post(
+            reverse("cart:update", args=[product.id]),
+            data=json.dumps({"qty": 3}),
+            content_type="application/json",
+        )
+        resp = client.get(reverse("cart:view"))
+        assert resp.context["items"] == 3
+        client.get(reverse("cart:remove", args=[product.id]))
+
+    assert _session_writes(ctx.captured_queries) == []
+    assert "cart" not in client.session
+
+
+@pytest.mark.django_db
+def test_anonymous_cart_needs_no_session(client, product):
+    client.get(reverse("cart:add", args=[product.id]))
+
+    assert "sessionid" not in client.cookies
+    assert client.cookies["cart"]["httponly"]
+    assert client.get(reverse("cart:view")).context["items"] == 1
+
+
+# The snapshot brings the cart back after the cache loses it
+@pytest.mark.django_db
+def test_cart_survives_cache_loss(client, product, django_assert_num_queries):
+    client.get(reverse("cart:add", args=[product.id]) + "?qty=2")
+    cache.clear()
+
+    assert client.get(reverse("cart:view")).context["items"] == 2
+    with django_assert_num_queries(1):  # pricing only; cart is cached again
+        client.get(reverse("cart:view"))
+
+
+@pytest.mark.django_db
+def test_tampered_cookie_starts_a_new_cart(client, product):
+    client.get(reverse("cart:add", args=[product.id]))
+    client.cookies["cart"] = client.cookies["cart"].value + "x"
+
+    assert client.get(reverse("cart:view")).context["items"] == 0
+
+
+# Snapshots are written behind the request, one row per cart
+@pytest.mark.django_db(transaction=True)
+def test_async_snapshots_coalesce(settings, client, product):
+    settings.CART_WRITE_THROUGH = "async"
+    for qty in (1, 2, 3):
+        client.get(reverse("cart:add", args=[product.id]) + f"?qty={qty}")
+    snapshot_writer.flush()
+
+    assert CartSnapshot.objects.get().items == {str(product.id): 6}
+
+    client.get(reverse("cart:remove", args=[product.id]))
+    snapshot_writer.flush()
+    assert not CartSnapshot.objects.exists()
+
+
+# A product deleted behind a cached cart must not sink other users' writes
+@pytest.mark.django_db(transaction=True)
+def test_deleted_product_in_one_cart_of_a_batch(
+    settings, client, user, product, django_user_model
+):
+    settings.CART_WRITE_THROUGH = "async"
+    gone = Product.objects.create(slug="gone", title="Gone", price_pennies=1)
+    bob = django_user_model.objects.create_user("bob", password="x")
+    gone_id = str(gone.id)
+    gone.delete()
+
+    snapshot_writer.submit(f"user:{user.pk}", {gone_id: 1, str(product.id): 2})
+    snapshot_writer.submit(f"user:{bob.pk}", {str(product.id): 3})
+    snapshot_writer.flush()
+
+    rows = set(CartItem.objects.values_list("user__username", "product_id", "qty"))
+    assert ("bob", product.id, 3) in rows
+    assert ("alice", product.id, 2) in rows
+
+    cache.clear()
+    client.force_login(user)
+    assert client.get(reverse("cart:view")).context["items"] == 2
+
+
+@pytest.mark.django_db
+def test_session_store_still_available(settings, client, product):
+    settings.CART_STORE = "cart.utils.SessionCartStore"
+    client.get(reverse("cart:add", args=[product.id]))
+
+    assert client.session["cart"] == {str(product.id): 1}
+    assert not CartSnapshot.objects.exists()
+
+
+def _settings_with(monkeypatch, **env):
+    for name in ("CACHE_URL", "REDIS_URL", "CART_STORE"):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(str(django_settings.BASE_DIR / "config" / "settings.py"))
+
+
+# A per-process cache would give every worker its own carts
+def test_cache_store_only_by_default_with_shared_cache(monkeypatch):
+    local = _settings_with(monkeypatch)
+    assert local["CART_STORE"] == "cart.utils.SessionCartStore"
+    assert "LocMemCache" in local["CACHES"]["default"]["BACKEND"]
+
+    shared = _settings_with(monkeypatch, REDIS_URL="redis://cache:6379/0")
+    assert shared["CART_STORE"] == "cart.utils.CacheCartStore"
+    assert shared["CACHES"]["default"]["LOCATION"] == "redis://cache:6379/0"
@@ -1,6 +1,12 @@
 from django.urls import path
 
-from .views import add_to_cart, cart_view, remove_from_cart, update_quantity
+from .views import (
+    add_to_cart,
+    batch_update,
+    cart_view,
+    remove_from_cart,
+    update_quantity,
+)
 
 app_name = "cart"
 
@@ -10,4 +16,5 @@ urlpatterns = [
     path("update/<uuid:product_id>/", update_quantity, name="update"),
     path("remove/<uuid:product_id>/", remove_from_cart, name="remove"),
     path("remove/", remove_from_cart, name="remove_json"),
+    path("api/batch/", batch_update, name="api_batch"),
 ]
@@ -1,38 +1,366 @@
+"""
+Cart storage.
+
+A cart is a dict of product_id (str) -> quantity (int). Where it lives is
+decided by settings.CART_STORE:
+
+    cart.utils.CacheCartStore    (default with a shared cache) the cache
+                                 named by CART_CACHE, which every worker
+                                 must share.
+                                 A guest's cart is keyed by a signed "cart"
+                                 cookie and copied to a CartSnapshot row; a
+                                 signed-in user's cart is keyed by the user
+                                 and copied to CartItem rows, so it follows
+                                 them across devices. The copies are made
+                                 behind the request (CART_WRITE_THROUGH) and
+                                 read back when the cache has lost a cart.
+    cart.utils.SessionCartStore  (default otherwise) request.session; every
+                                 change is an UPDATE of the session row.
+
+Views use get_cart / save_cart / clear_cart, which go through the
+configured store. CartMiddleware sets the cookie for a newly created cart;
+on login the guest cart is merged into the user's (cart.signals).
+"""
+
 from __future__ import annotations
 
-from typing import Dict
+import atexit
+import logging
+import os
+import queue
+import threading
+import uuid
+from functools import lru_cache
+from typing import Dict, Optional
 
-__all__ = ["add_to_cart", "get_cart", "save_cart", "clear_cart"]
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DatabaseError, close_old_connections
+from django.utils.module_loading import import_string
+
+__all__ = [
+    "CartStore",
+    "CacheCartStore",
+    "SessionCartStore",
+    "get_cart_store",
+    "add_to_cart",
+    "get_cart",
+    "save_cart",
+    "clear_cart",
+]
+
+logger = logging.getLogger(__name__)
 
 CART_SESSION_KEY = "cart"
+CART_COOKIE = "cart"
+CART_COOKIE_SALT = "cart.utils"
+CART_CACHE_KEY = "cart:{}"
+USER_CART_ID = "user:{}"
+# Set on the request when a cart id was minted; CartMiddleware sends it
+NEW_CART_ATTR = "_new_cart_id"
+WRITE_BATCH = 500
+
+
+def _normalize(cart) -> Dict[str, int]:
+    """Drop non-positive quantities; keys are str, values int."""
+    return {str(k): int(v) for k, v in (cart or {}).items() if int(v) > 0}
+
+
+class CartStore:
+    def load(self, request) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def save(self, request, cart: Dict[str, int]) -> None:
+        raise NotImplementedError
+
+    def clear(self, request) -> None:
+        self.save(request, {})
+
+    def merge_on_login(self, request, user) -> None:
+        """Combine the guest cart with `user`'s stored one (if stored apart)."""
+
+
+# Session store
+class SessionCartStore(CartStore):
+    def load(self, request) -> Dict[str, int]:
+        return _normalize(request.session.get(CART_SESSION_KEY))
+
+    def save(self, request, cart: Dict[str, int]) -> None:
+        request.session[CART_SESSION_KEY] = _normalize(cart)
+        request.session.modified = True
+
+    def clear(self, request) -> None:
+        request.session.pop(CART_SESSION_KEY, None)
+        request.session.modified = True
+
+
+# Write-behind to CartSnapshot
+class SnapshotWriter:
+    """
+    Copies carts to CartSnapshot on a background thread. Writes are
+    coalesced per cart and whatever is queued goes out as one UPSERT, so a
+    burst of clicks costs one statement; flush() waits until everything
+    queued has been written.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+
+    def _start(self) -> None:
+        # Per process: a forked worker starts its own thread and queue
+        self._pid = os.getpid()
+        self._pending: Dict[str, Dict[str, int]] = {}
+        self._queue: queue.Queue = queue.Queue()
+        threading.Thread(target=self._run, name="cart-snapshots", daemon=True).start()
+
+    def submit(self, cart_id: str, cart: Dict[str, int]) -> None:
+        with self._lock:
+            if self._pid != os.getpid():
+                self._start()
+            queued = cart_id in self._pending
+            if queued and cart_id.startswith("user:"):
+                # Keep the removals of the write this one replaces
+                cart = {**{k: 0 for k in self._pending[cart_id]}, **cart}
+            self._pending[cart_id] = cart
+        if not queued:
+            self._queue.put(cart_id)
+
+    def flush(self) -> None:
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            cart_ids = [self._queue.get()]
+            while len(cart_ids) < WRITE_BATCH:
+                try:
+                    cart_ids.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self._lock:
+                    carts = {
+                        cart_id: self._pending.pop(cart_id) for cart_id in cart_ids
+                    }
+                close_old_connections()
+                self._write(carts)
+            finally:
+                for _ in cart_ids:
+                    self._queue.task_done()
+
+    def _write(self, carts: Dict[str, Dict[str, int]]) -> None:
+        try:
+            write_snapshots(carts)
+            return
+        except DatabaseError:
+            if len(carts) == 1:
+                logger.exception("Could not save cart snapshot %s", *carts)
+                return
+        # One bad cart must not cost the rest of the batch their writes
+        for cart_id, cart in carts.items():
+            self._write({cart_id: cart})
+
+
+def write_snapshots(carts: Dict[str, Dict[str, int]]) -> None:
+    """
+    Upsert non-empty guest carts and delete empty ones, a statement each;
+    user carts go to write_user_carts.
+    """
+    from .models import CartSnapshot
+
+    users = {k: v for k, v in carts.items() if k.startswith("user:")}
+    if users:
+        write_user_carts({int(k[5:]): v for k, v in users.items()})
+    carts = {k: _normalize(v) for k, v in carts.items() if k not in users}
+    filled = [CartSnapshot(cart_id=k, items=v) for k, v in carts.items() if v]
+    emptied = [k for k, v in carts.items() if not v]
+    if filled:
+        CartSnapshot.objects.bulk_create(
+            filled,
+            update_conflicts=True,
+            unique_fields=["cart_id"],
+            update_fields=["items", "updated_at"],
+        )
+    if emptied:
+        CartSnapshot.objects.filter(cart_id__in=emptied).delete()
+
+
+def write_user_carts(carts: Dict[int, Dict[str, int]]) -> None:
+    """
+    Upsert every user's lines in one statement. Removed lines arrive with
+    qty 0 and are kept as such, so a removal is an upsert too. A cached
+    cart can outlive a deleted product; CartItem.product has no database
+    constraint, so such a line is written like any other and priced away
+    as unavailable when read.
+    """
+    from .models import CartItem
+
+    items = [
+        CartItem(user_id=user_id, product_id=key, qty=cart[key])
+        for user_id, cart in carts.items()
+        for key in _product_ids(cart)
+    ]
+    if items:
+        CartItem.objects.bulk_create(
+            items,
+            update_conflicts=True,
+            unique_fields=["user", "product"],
+            update_fields=["qty", "updated_at"],
+        )
+
+
+def read_user_cart(user_id: int) -> Dict[str, int]:
+    from .models import CartItem
+
+    rows = CartItem.objects.filter(user_id=user_id, qty__gt=0).order_by("id")
+    return {str(pid): qty for pid, qty in rows.values_list("product_id", "qty")}
+
+
+def _product_ids(cart: Dict[str, int]) -> list:
+    """Cart keys that can be product ids (malformed ones are priced away)."""
+    keys = []
+    for key in cart:
+        try:
+            uuid.UUID(key)
+        except ValueError:
+            continue
+        keys.append(key)
+    return keys
+
+
+def merge_carts(stored: Dict[str, int], guest: Dict[str, int]) -> Dict[str, int]:
+    """
+    Stored lines first, then new guest lines. A product in both keeps the
+    larger quantity: the same item added on two devices is one purchase,
+    and merging the same guest cart twice changes nothing.
+    """
+    merged = dict(stored)
+    for key, qty in guest.items():
+        merged[key] = max(qty, merged.get(key, 0))
+    return merged
+
+
+snapshot_writer = SnapshotWriter()
+atexit.register(snapshot_writer.flush)
+
+
+# Cache store
+class CacheCartStore(CartStore):
+    """
+    Carts in the cache under "user:<pk>" for signed-in users, otherwise a
+    random id from a signed cookie; guests without a cart touch neither the
+    cache nor the database.
+    """
+
+    def cart_id(self, request, create: bool = False) -> Optional[str]:
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return USER_CART_ID.format(user.pk)
+        return self.guest_cart_id(request, create)
+
+    def guest_cart_id(self, request, create: bool = False) -> Optional[str]:
+        cart_id = getattr(request, NEW_CART_ATTR, None) or request.get_signed_cookie(
+            CART_COOKIE, default=None, salt=CART_COOKIE_SALT
+        )
+        if cart_id is None and create:
+            cart_id = uuid.uuid4().hex
+            setattr(request, NEW_CART_ATTR, cart_id)
+        return cart_id
+
+    def load(self, request) -> Dict[str, int]:
+        cart_id = self.cart_id(request)
+        return self.read(cart_id) if cart_id else {}
+
+    def read(self, cart_id: str) -> Dict[str, int]:
+        cache = caches[settings.CART_CACHE]
+        cart = cache.get(CART_CACHE_KEY.format(cart_id))
+        if cart is None:
+            if cart_id.startswith("user:"):
+                cart = read_user_cart(int(cart_id[5:]))
+            else:
+                from .models import CartSnapshot
+
+                snapshot = CartSnapshot.objects.filter(cart_id=cart_id).first()
+                cart = _normalize(snapshot.items) if snapshot else {}
+            cache.set(CART_CACHE_KEY.format(cart_id), cart, settings.CART_SECONDS)
+        return dict(cart)
+
+    def save(self, request, cart: Dict[str, int]) -> None:
+        cart = _normalize(cart)
+        cart_id = self.cart_id(request, create=bool(cart))
+        if cart_id is not None:
+            self.write(cart_id, cart)
+
+    def write(self, cart_id: str, cart: Dict[str, int], mode: str = "") -> None:
+        cache = caches[settings.CART_CACHE]
+        durable = cart
+        if cart_id.startswith("user:"):
+            # Lines that left the cart are written with qty 0
+            previous = self.read(cart_id)
+            durable = {**{k: 0 for k in previous}, **cart}
+        cache.set(CART_CACHE_KEY.format(cart_id), cart, settings.CART_SECONDS)
+        mode = mode or settings.CART_WRITE_THROUGH
+        if mode == "async":
+            snapshot_writer.submit(cart_id, durable)
+        elif mode == "sync":
+            write_snapshots({cart_id: durable})
+
+    def merge_on_login(self, request, user) -> None:
+        """
+        Fold the guest cart into the user's stored cart. Unavailable
+        products are dropped by one pricing query, and the result is
+        written straight away (one bulk upsert) so the user's other
+        devices see it. The guest cart is emptied.
+        """
+        from .pricing import price_cart
+
+        guest_id = self.guest_cart_id(request)
+        guest = self.read(guest_id) if guest_id else {}
+        if not guest:
+            return
+        user_id = USER_CART_ID.format(user.pk)
+        merged = merge_carts(self.read(user_id), guest)
+        for key in price_cart(merged).unavailable:
+            merged.pop(key, None)
+        if settings.CART_WRITE_THROUGH != "off":
+            # The guest lines must not be lost behind the writer queue
+            snapshot_writer.flush()
+            self.write(user_id, merged, "sync")
+        else:
+            self.write(user_id, merged)
+        self.write(guest_id, {})
+
+
+@lru_cache(maxsize=None)
+def _store(path: str) -> CartStore:
+    return import_string(path)()
+
+
+def get_cart_store() -> CartStore:
+    return _store(settings.CART_STORE)
 
 
 # Add to the cart
 def add_to_cart(request, product_id, qty: int = 1) -> None:
-    cart = request.session.get(CART_SESSION_KEY, {}) or {}
+    cart = get_cart(request)
     pid = str(product_id)
     cart[pid] = int(cart.get(pid, 0)) + int(qty)
-    request.session[CART_SESSION_KEY] = cart
-    request.session.modified = True
+    save_cart(request, cart)
 
 
 # Get the cart
 def get_cart(request) -> Dict[str, int]:
     """Return dict mapping product_id (str) -> quantity (int)."""
-    raw = request.session.get(CART_SESSION_KEY, {}) or {}
-    # normalize & drop non-positive quantities
-    return {str(k): int(v) for k, v in raw.items() if int(v) > 0}
+    return get_cart_store().load(request)
 
 
 # Save the cart
 def save_cart(request, cart: Dict[str, int]) -> None:
-    normalized = {str(k): int(v) for k, v in cart.items() if int(v) > 0}
-    request.session[CART_SESSION_KEY] = normalized
-    request.session.modified = True
+    get_cart_store().save(request, cart)
 
 
 # Clear the cart
 def clear_cart(request) -> None:
-    """Remove the cart from the session completely."""
-    request.session.pop(CART_SESSION_KEY, None)
-    request.session.modified = True
+    """Remove the cart from the store completely."""
+    get_cart_store().clear(request)
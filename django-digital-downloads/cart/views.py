@@ -1,52 +1,69 @@
 import json
-from typing import Tuple
 
-from catalog.models import Product
-from django.http import JsonResponse
-from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.http import require_http_methods
+from django.http import Http404, JsonResponse
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_http_methods, require_POST
 
+from .pricing import get_priced_cart
 from .utils import get_cart, save_cart
 
+MAX_BATCH_OPS = 100
+BATCH_OPS = ("add", "set", "remove")
+
+
+class InvalidBatch(ValueError):
+    pass
+
+
+def apply_ops(cart: dict, ops) -> set:
+    """
+    Apply add/set/remove operations to `cart` in place and return the
+    product ids they add or change. Raises InvalidBatch on a malformed op.
+    """
+    if not isinstance(ops, list) or not ops:
+        raise InvalidBatch("ops must be a non-empty list")
+    if len(ops) > MAX_BATCH_OPS:
+        raise InvalidBatch(f"At most {MAX_BATCH_OPS} ops per batch")
+    touched = set()
+    for op in ops:
+        if not isinstance(op, dict) or op.get("op") not in BATCH_OPS:
+            raise InvalidBatch(f"Unknown op: {op!r}")
+        key = str(op.get("product_id") or "").strip()
+        if not key:
+            raise InvalidBatch("Missing product_id")
+        if op["op"] == "remove":
+            cart.pop(key, None)
+            continue
+        try:
+            qty = int(op.get("qty", 1))
+        except (TypeError, ValueError):
+            raise InvalidBatch(f"Invalid qty: {op.get('qty')!r}")
+        if op["op"] == "add":
+            cart[key] = int(cart.get(key, 0)) + max(qty, 1)
+        elif qty > 0:
+            cart[key] = qty
+        else:
+            cart.pop(key, None)
+        if key in cart:
+            touched.add(key)
+    return touched
+
 
 def cart_view(request):
     cart = get_cart(request)
-    products = Product.objects.filter(id__in=cart.keys())
-    lines = []
-    for p in products:
-        qty = cart.get(str(p.id), 0)
-        lines.append(
-            {
-                "id": str(p.id),
-                "title": p.title,
-                "qty": qty,
-                "unit_price": p.price_pennies,
-                "line_total": qty * p.price_pennies,
-                "slug": p.slug,
-            }
-        )
-    items, subtotal = _cart_totals(cart)
+    priced = get_priced_cart(request, cart)
+    if priced.unavailable:
+        # Drop products that were deactivated or deleted since being added
+        for key in priced.unavailable:
+            cart.pop(key, None)
+        save_cart(request, cart)
     return render(
         request,
         "cart/view.html",
-        {"lines": lines, "items": items, "subtotal": subtotal},
+        {"lines": priced.lines, "items": priced.items, "subtotal": priced.subtotal},
     )
 
 
-def _cart_totals(cart) -> Tuple[int, int]:
-    """Returns (items_count, subtotal_pennies)."""
-    items = 0
-    subtotal = 0
-    products = {str(p.id): p for p in Product.objects.filter(id__in=cart.keys())}
-    for pid, qty in cart.items():
-        p = products.get(pid)
-        if not p:
-            continue
-        items += qty
-        subtotal += qty * p.price_pennies
-    return items, subtotal
-
-
 @require_http_methods(["GET", "POST"])
 def add_to_cart(request, product_id: int):
     if request.method == "POST" and request.headers.get("content-type", "").startswith(
@@ -57,19 +74,20 @@ def add_to_cart(request, product_id: int):
     else:
         qty = int(request.GET.get("qty") or request.POST.get("qty") or 1)
 
-    # ensure product exists/active
-    product = get_object_or_404(Product.objects.only("id"), id=product_id, active=True)
-
     cart = get_cart(request)
-    key = str(product.id)
+    key = str(product_id)
     cart[key] = int(cart.get(key, 0)) + (qty if qty > 0 else 1)
+
+    # Pricing the new cart also proves the product exists and is active
+    priced = get_priced_cart(request, cart)
+    if key in priced.unavailable:
+        raise Http404("Product not available")
     save_cart(request, cart)
     # AJAX -> JSON; normal link/form -> redirect to cart
     if request.method == "POST" and request.headers.get("content-type", "").startswith(
         "application/json"
     ):
-        items, subtotal = _cart_totals(cart)
-        return JsonResponse({"ok": True, "items": items, "subtotal_pennies": subtotal})
+        return JsonResponse(priced.totals_json())
     return redirect("cart:view")
 
 
@@ -101,8 +119,7 @@ def update_quantity(request, product_id: int):
         request.headers.get("x-requested-with") == "XMLHttpRequest"
         or ctype.startswith("application/json")
     ):
-        items, subtotal = _cart_totals(cart)
-        return JsonResponse({"ok": True, "items": items, "subtotal_pennies": subtotal})
+        return JsonResponse(get_priced_cart(request, cart).totals_json())
     return redirect("cart:view")
 
 
@@ -131,7 +148,37 @@ def remove_from_cart(request, product_id=None):
     if request.headers.get("x-requested-with") == "XMLHttpRequest" or ctype.startswith(
         "application/json"
     ):
-        items, subtotal = _cart_totals(cart)
-        return JsonResponse({"ok": True, "items": items, "subtotal_pennies": subtotal})
+        return JsonResponse(get_priced_cart(request, cart).totals_json())
 
     return redirect("cart:view")
+
+
+# Batch Cart API
+@require_POST
+def batch_update(request):
+    """
+    Apply {"ops": [{"op": "add"|"set"|"remove", "product_id", "qty"}]}
+    all-or-nothing: one pricing query validates every product, and the
+    cart is saved and priced once.
+    """
+    try:
+        payload = json.loads(request.body or "{}")
+        cart = get_cart(request)
+        touched = apply_ops(cart, payload.get("ops"))
+    except (ValueError, AttributeError) as exc:
+        message = str(exc) if isinstance(exc, InvalidBatch) else "Invalid JSON"
+        return JsonResponse({"ok": False, "error": message}, status=400)
+
+    priced = get_priced_cart(request, cart)
+    rejected = sorted(touched.intersection(priced.unavailable))
+    if rejected:
+        return JsonResponse(
+            {"ok": False, "error": "Product not available", "product_ids": rejected},
+            status=400,
+        )
+    # Lines that went unavailable since they were added are dropped, as on
+    # the cart page
+    for key in priced.unavailable:
+        cart.pop(key, None)
+    save_cart(request, cart)
+    return JsonResponse(priced.cart_json())
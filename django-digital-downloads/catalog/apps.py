@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class CatalogConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "catalog"
+
+    def ready(self):
+        from core.metrics import register
+
+        from . import signals  # noqa: F401
+        from .cache import metrics_lines
+        from .search import on_post_migrate
+
+        post_migrate.connect(on_post_migrate, sender=self)
+        register(metrics_lines)
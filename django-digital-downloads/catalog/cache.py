@@ -0,0 +1,224 @@
+"""
+Versioned caching for catalog pages.
+
+Cached pages and fragments embed a version token in their key instead of
+being deleted on change. Writes replace the token and old entries are
+never read again, so they expire on their own:
+
+    catalog:v:all               every catalog page (bulk ingest / recompute)
+    catalog:v:list              the listing (product added, edited, hidden)
+    catalog:v:product:<id>      one detail page (product, asset or review)
+
+The tokens live in the cache when it is shared (settings.SHARED_CACHE).
+Otherwise each process has its own cache, so they are kept in the
+CacheVersion table instead, at one indexed read per page.
+
+Anonymous GETs are served whole from the cache. Signed-in users get the
+page rendered around cached fragments (product grid, review block).
+Hits and misses are counted in the cache, so with a shared cache every
+worker adds to the same totals. They are served with the other process
+metrics at /metrics (see `metrics_lines`).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import uuid
+from functools import wraps
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished, request_started
+from django.db import transaction
+from django.dispatch import receiver
+
+ALL_KEY = "catalog:v:all"
+LIST_KEY = "catalog:v:list"
+SLUG_KEY = "catalog:slug:{}"
+STATS_KEY = "catalog:cache:{}:{}"
+STAT_KINDS = ("page", "fragment")
+
+
+def product_key(product_id) -> str:
+    return f"catalog:v:product:{product_id}"
+
+
+# Versions. Database tokens are read once per request (see _request_memo)
+_local = threading.local()
+
+
+@receiver(request_started)
+@receiver(request_finished)
+def _request_memo(signal, **kwargs) -> None:
+    _local.tokens = {} if signal is request_started else None
+
+
+def _load(keys) -> dict:
+    if settings.SHARED_CACHE:
+        return cache.get_many(keys)
+    from .models import CacheVersion
+
+    memo = getattr(_local, "tokens", None)
+    if memo is not None and all(k in memo for k in keys):
+        return {k: memo[k] for k in keys}
+    found = dict(CacheVersion.objects.filter(key__in=keys).values_list("key", "token"))
+    if memo is not None:
+        memo.update(found)
+    return found
+
+
+def _store(tokens: dict) -> None:
+    if settings.SHARED_CACHE:
+        cache.set_many(tokens, None)
+        return
+    from .models import CacheVersion
+
+    CacheVersion.objects.bulk_create(
+        [CacheVersion(key=k, token=t) for k, t in tokens.items()],
+        ignore_conflicts=True,
+    )
+    if getattr(_local, "tokens", None) is not None:
+        _local.tokens.update(tokens)
+
+
+def _retire(keys) -> None:
+    if settings.SHARED_CACHE:
+        cache.delete_many(keys)
+        return
+    from .models import CacheVersion
+
+    # Replaced rather than deleted, so readers need not mint them again
+    tokens = {k: uuid.uuid4().hex[:12] for k in keys}
+    CacheVersion.objects.bulk_create(
+        [CacheVersion(key=k, token=t) for k, t in tokens.items()],
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=["token"],
+    )
+    if getattr(_local, "tokens", None) is not None:
+        _local.tokens.update(tokens)
+
+
+def _versions(*keys: str) -> str:
+    """Current tokens for `keys`, minting any that are missing."""
+    found = _load(keys)
+    missing = {k: uuid.uuid4().hex[:12] for k in keys if k not in found}
+    if missing:
+        _store(missing)
+        found.update(missing)
+    return ".".join(found[k] for k in keys)
+
+
+def list_version() -> str:
+    return _versions(ALL_KEY, LIST_KEY)
+
+
+def product_version(product_id) -> str:
+    return _versions(ALL_KEY, product_key(product_id))
+
+
+def bump(keys: Iterable[str]) -> None:
+    """
+    Retire the versions in `keys`. Inside a transaction this happens again
+    on commit, so a page rendered from pre-commit data cannot be cached
+    under the new version.
+    """
+    keys = list(keys)
+    _retire(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _retire(keys))
+
+
+def bump_product(product_id, listing: bool = False) -> None:
+    bump([product_key(product_id)] + ([LIST_KEY] if listing else []))
+
+
+def bump_all() -> None:
+    bump([ALL_KEY])
+
+
+def memoize(name: str, version: str, compute: Callable):
+    """`compute()`, cached for as long as `version` stays current."""
+    return cache.get_or_set(
+        f"catalog:{name}:{version}", compute, settings.CATALOG_PAGE_CACHE_SECONDS
+    )
+
+
+# Slug -> id, so detail pages can be keyed before the product is loaded
+def remember_slug(slug: str, product_id) -> None:
+    cache.set(
+        SLUG_KEY.format(slug), str(product_id), settings.CATALOG_PAGE_CACHE_SECONDS
+    )
+
+
+def slug_version(slug: str) -> Optional[str]:
+    product_id = cache.get(SLUG_KEY.format(slug))
+    return product_version(product_id) if product_id else None
+
+
+# Hit / miss counters
+def record(kind: str, hit: bool) -> None:
+    key = STATS_KEY.format(kind, "hit" if hit else "miss")
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def cache_metrics() -> dict:
+    keys = [STATS_KEY.format(k, o) for k in STAT_KINDS for o in ("hit", "miss")]
+    values = cache.get_many(keys)
+    return {
+        kind: {o: values.get(STATS_KEY.format(kind, o), 0) for o in ("hit", "miss")}
+        for kind in STAT_KINDS
+    }
+
+
+def metrics_lines() -> list:
+    lines = [
+        "# HELP catalog_cache_requests_total Catalog cache lookups by result.",
+        "# TYPE catalog_cache_requests_total counter",
+    ]
+    for kind, counts in cache_metrics().items():
+        for result, value in counts.items():
+            lines.append(
+                f'catalog_cache_requests_total{{kind="{kind}",result="{result}"}} '
+                f"{value}"
+            )
+    return lines
+
+
+# Full-page cache for anonymous users
+def cache_anonymous_page(version_for: Callable[..., Optional[str]]):
+    """
+    Serve anonymous GET/HEAD requests from the cache, keyed by the path and
+    `version_for(request, *args, **kwargs)`. A None version skips the cache.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            version = version_for(request, *args, **kwargs)
+            if version is None:
+                return view(request, *args, **kwargs)
+
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = f"catalog:page:{view.__name__}:{version}:{path}"
+            response = cache.get(key)
+            record("page", hit=response is not None)
+            if response is not None:
+                return response
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies:
+                cache.set(key, response, settings.CATALOG_PAGE_CACHE_SECONDS)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,233 @@
+"""
+MP3 ingestion pipeline used by `manage.py ingest_demo_mp3s` and
+`ingest_mp3s.py`.
+
+    scan protected_media/{products,samples}
+      -> skip files whose (size, mtime) match the manifest
+      -> hash the rest in chunks across a process pool
+      -> batched bulk upserts of Products and DigitalAssets, then the
+         library entries of any grants on those assets
+      -> rewrite the manifest
+
+Re-running over an unchanged library only costs a directory scan.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from hashlib import sha256
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.db import transaction
+from orders.library import refresh_library
+from orders.models import UserAsset
+
+from .cache import bump_all
+from .models import DigitalAsset, Product
+
+SUBDIRS = ("products", "samples")
+MANIFEST_NAME = ".ingest-manifest.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+DEFAULT_BATCH_SIZE = 500
+
+
+def slugify(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-zA-Z0-9]+", "-", s).strip("-").lower() or "track"
+
+
+@dataclass(frozen=True)
+class Candidate:
+    rel_path: str  # relative to protected_media/, e.g. "products/song.mp3"
+    abs_path: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def stem(self) -> str:
+        return Path(self.rel_path).stem
+
+    @property
+    def name(self) -> str:
+        return Path(self.rel_path).name
+
+
+@dataclass
+class IngestStats:
+    scanned: int = 0
+    unchanged: int = 0
+    hashed: int = 0
+    products_created: int = 0
+    assets_upserted: int = 0
+
+
+# Scan
+def scan(base: Path) -> List[Candidate]:
+    found = []
+    for sub in SUBDIRS:
+        d = base / sub
+        if not d.is_dir():
+            continue
+        with os.scandir(d) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(".mp3"):
+                    continue
+                st = entry.stat()
+                found.append(
+                    Candidate(
+                        rel_path=f"{sub}/{entry.name}",
+                        abs_path=entry.path,
+                        size=st.st_size,
+                        mtime_ns=st.st_mtime_ns,
+                    )
+                )
+    return sorted(found, key=lambda c: c.rel_path)
+
+
+# Manifest
+def load_manifest(base: Path) -> Dict[str, list]:
+    """Return {rel_path: [size, mtime_ns, sha256]} from the last run."""
+    try:
+        with open(base / MANIFEST_NAME) as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_manifest(base: Path, manifest: Dict[str, list]) -> None:
+    tmp = base / (MANIFEST_NAME + ".tmp")
+    with open(tmp, "w") as fh:
+        json.dump(manifest, fh, separators=(",", ":"), sort_keys=True)
+    os.replace(tmp, base / MANIFEST_NAME)
+
+
+# Hashing
+def hash_file(path: str) -> str:
+    """sha256 of a file, read in fixed-size chunks."""
+    h = sha256()
+    with open(path, "rb") as fh:
+        while chunk := fh.read(HASH_CHUNK_SIZE):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_files(paths: List[str], workers: Optional[int] = None) -> List[str]:
+    """Hash `paths` in order, fanning out over a process pool when useful."""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(paths) < 2:
+        return [hash_file(p) for p in paths]
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_file, paths, chunksize=chunksize))
+
+
+# Database writes
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+def _upsert_batch(batch: List[tuple]) -> tuple[int, int]:
+    """batch: [(Candidate, sha256)] -> (products_created, assets_upserted)"""
+    slugs: Dict[str, Candidate] = {}
+    for c, _ in batch:
+        slugs.setdefault(slugify(c.stem), c)
+    with transaction.atomic():
+        existing = set(
+            Product.objects.filter(slug__in=slugs).values_list("slug", flat=True)
+        )
+        new_products = [
+            Product(
+                slug=slug,
+                title=c.stem.replace("_", " ").title(),
+                description="Royalty-free demo track",
+                price_pennies=299,
+                active=True,
+            )
+            for slug, c in slugs.items()
+            if slug not in existing
+        ]
+        # Existing products keep any admin edits (get_or_create semantics)
+        Product.objects.bulk_create(new_products, ignore_conflicts=True)
+        ids = dict(Product.objects.filter(slug__in=slugs).values_list("slug", "id"))
+
+        assets = [
+            DigitalAsset(
+                product_id=ids[slugify(c.stem)],
+                file_path=c.rel_path,
+                file_name=c.name,
+                sha256=digest,
+                size_bytes=c.size,
+            )
+            for c, digest in batch
+        ]
+        DigitalAsset.objects.bulk_create(
+            assets,
+            update_conflicts=True,
+            unique_fields=["product", "file_path"],
+            update_fields=["file_name", "sha256", "size_bytes"],
+        )
+        # The upsert sends no post_save, so copy the new hashes into the
+        # library here; signed links (and their ETags) are built from it
+        refresh_library(
+            UserAsset.objects.filter(
+                digital_asset__product_id__in=ids.values(),
+                digital_asset__file_path__in=[c.rel_path for c, _ in batch],
+            )
+        )
+    return len(new_products), len(assets)
+
+
+def ingest(
+    base: Path,
+    *,
+    workers: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    full: bool = False,
+) -> IngestStats:
+    """
+    Ingest MP3s under `base`. `full=True` ignores the manifest and
+    re-hashes everything.
+    """
+    base = Path(base)
+    stats = IngestStats()
+    candidates = scan(base)
+    stats.scanned = len(candidates)
+
+    previous = {} if full else load_manifest(base)
+    if previous and not DigitalAsset.objects.exists():
+        previous = {}  # fresh database: the manifest describes another one
+    manifest: Dict[str, list] = {}
+    changed: List[Candidate] = []
+    for c in candidates:
+        prev = previous.get(c.rel_path)
+        if prev and prev[:2] == [c.size, c.mtime_ns]:
+            manifest[c.rel_path] = prev
+            stats.unchanged += 1
+        else:
+            changed.append(c)
+
+    digests = hash_files([c.abs_path for c in changed], workers)
+    stats.hashed = len(changed)
+
+    for batch in _batched(zip(changed, digests), batch_size):
+        created, upserted = _upsert_batch(batch)
+        stats.products_created += created
+        stats.assets_upserted += upserted
+        for c, digest in batch:
+            manifest[c.rel_path] = [c.size, c.mtime_ns, digest]
+
+    if stats.hashed:
+        bump_all()  # bulk writes skip the model signals
+    if manifest != previous and base.is_dir():
+        save_manifest(base, manifest)
+    return stats
@@ -0,0 +1,19 @@
+from catalog.search import install_sqlite_index
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the SQLite FTS5 product search index (run after VACUUM or a "
+        "restore). Postgres maintains its search column itself."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        if install_sqlite_index(options["database"]):
+            msg = "[rebuild_search_index] Rebuilt the product search index."
+        else:
+            msg = "[rebuild_search_index] Nothing to do on this database."
+        self.stdout.write(self.style.SUCCESS(msg))
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0005_merge_0003_ingest_demo_mp3s_0004_seed_demo_assets"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["active", "-created_at", "-id"],
+                name="catalog_prod_active_created",
+            ),
+        ),
+    ]
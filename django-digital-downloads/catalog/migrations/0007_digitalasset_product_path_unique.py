@@ -0,0 +1,49 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:15
+
+from django.db import migrations, models
+
+
+def merge_duplicate_assets(apps, schema_editor):
+    """
+    Keep the first asset (by id) of each (product, file_path) so the
+    constraint can be added. Grants on the others move to it, or are
+    dropped where the user already holds it.
+    """
+    DigitalAsset = apps.get_model("catalog", "DigitalAsset")
+    UserAsset = apps.get_model("orders", "UserAsset")
+    duplicated = list(
+        DigitalAsset.objects.values("product_id", "file_path")
+        .annotate(n=models.Count("id"))
+        .filter(n__gt=1)
+        .values_list("product_id", "file_path")
+    )
+    for product_id, file_path in duplicated:
+        keep, *extra = (
+            DigitalAsset.objects.filter(product_id=product_id, file_path=file_path)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        for asset_id in extra:
+            holders = UserAsset.objects.filter(digital_asset_id=keep).values("user_id")
+            grants = UserAsset.objects.filter(digital_asset_id=asset_id)
+            grants.filter(user_id__in=holders).delete()
+            grants.update(digital_asset_id=keep)
+        DigitalAsset.objects.filter(id__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0006_product_catalog_listing_index"),
+        ("orders", "0004_order_idempotency_key"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_assets, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="digitalasset",
+            constraint=models.UniqueConstraint(
+                fields=("product", "file_path"), name="catalog_asset_product_path_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+def add_search_index(apps, schema_editor):
+    # SQLite's FTS5 table is installed after migrate (catalog.search)
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from catalog.search import POSTGRES_SCHEMA
+
+    for statement in POSTGRES_SCHEMA:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from catalog.search import POSTGRES_DROP
+
+    for statement in POSTGRES_DROP:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0008_product_review_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, drop_search_index),
+    ]
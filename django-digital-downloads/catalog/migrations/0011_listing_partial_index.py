@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0010_product_updated_at"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="product",
+            name="catalog_prod_active_created",
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("active", True)),
+                fields=["-created_at", "-id"],
+                name="catalog_prod_live_created",
+            ),
+        ),
+    ]
@@ -16,13 +16,46 @@ class Product(models.Model):
     price_pennies = models.PositiveIntegerField(validators=[MinValueValidator(0)])
     active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also bumped by review changes; drives the catalog's Last-Modified
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Review aggregates, maintained by reviews.utils (recompute_review_stats)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Keyset pagination for the catalog listing: (created_at, id).
+            # Partial, because SQLite cannot seek on a bare boolean column
+            models.Index(
+                fields=["-created_at", "-id"],
+                condition=models.Q(active=True),
+                name="catalog_prod_live_created",
+            ),
+            # Newest change, for conditional GETs on the listing
+            models.Index(fields=["-updated_at"], name="catalog_prod_updated"),
+        ]
 
     def __str__(self) -> str:
         return self.title
 
+    @property
+    def average_rating(self) -> float | None:
+        if not self.review_count:
+            return None
+        return round(self.rating_sum / self.review_count, 1)
+
+    @property
+    def rating_histogram(self) -> list[tuple[int, int]]:
+        """[(stars, count), ...] from 5 stars down to 1."""
+        return [(n, getattr(self, f"rating_{n}")) for n in range(5, 0, -1)]
+
 
 # DIGITAL ASSETS
 class DigitalAsset(models.Model):
@@ -41,6 +74,15 @@ class DigitalAsset(models.Model):
     sha256 = models.CharField(max_length=64, blank=True)
     size_bytes = models.PositiveBigIntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            # Ingestion upserts on (product, file_path)
+            models.UniqueConstraint(
+                fields=["product", "file_path"],
+                name="catalog_asset_product_path_uniq",
+            ),
+        ]
+
     def __str__(self) -> str:
         return self.file_name
 
@@ -62,3 +104,18 @@ class UserNote(models.Model):
 
     def __str__(self) -> str:
         return f"{self.user} · {self.title}"
+
+
+# PAGE CACHE VERSIONS
+class CacheVersion(models.Model):
+    """
+    Version tokens for catalog.cache when there is no shared cache. Every
+    process reads them here, so a change made in any process (admin,
+    ingest, the worker) retires the pages cached by all of them.
+    """
+
+    key = models.CharField(max_length=100, primary_key=True)
+    token = models.CharField(max_length=12)
+
+    def __str__(self) -> str:
+        return f"{self.key} = {self.token}"
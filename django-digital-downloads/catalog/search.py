@@ -0,0 +1,184 @@
+"""
+Ranked full-text search over Product.title / Product.description.
+
+Postgres: a stored, generated `search_vector` tsvector column with a GIN
+index (migration 0009), ranked with ts_rank. The database keeps it in
+step with every INSERT/UPDATE, including bulk ingestion.
+
+SQLite (dev/tests): an external-content FTS5 table kept in sync by
+triggers, ranked with bm25(). SQLite rebuilds tables on most schema
+changes and VACUUM may renumber rowids, so the table and triggers are
+(re)created and the index rebuilt after every `migrate`; run
+`manage.py rebuild_search_index` after a VACUUM or a restore.
+
+Every query term is matched as a prefix, so "mid" finds "Midnight".
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import List
+
+from django.db import connection, connections
+
+from .models import Product
+
+FTS_TABLE = "catalog_product_fts"
+MAX_TERMS = 8
+# Broad terms can match most of the catalog; only the best-scoring this
+# many matches are joined to catalog_product, filtered and sorted
+MAX_CANDIDATES = 1000
+# Title matches count for more than description matches
+TITLE_WEIGHT, DESCRIPTION_WEIGHT = 10.0, 1.0
+
+SQLITE_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='catalog_product', content_rowid='rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON catalog_product
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.rowid, new.title, new.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON catalog_product
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.rowid, old.title, old.description);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+    AFTER UPDATE OF title, description ON catalog_product
+    BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.rowid, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description)
+        VALUES (new.rowid, new.title, new.description);
+    END
+    """,
+]
+
+POSTGRES_SCHEMA = [
+    """
+    ALTER TABLE catalog_product ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A')
+        || setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    """
+    CREATE INDEX catalog_product_search_gin ON catalog_product
+    USING GIN (search_vector)
+    """,
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS catalog_product_search_gin",
+    "ALTER TABLE catalog_product DROP COLUMN IF EXISTS search_vector",
+]
+
+
+# Query parsing
+def terms(text: str, limit: int = MAX_TERMS) -> List[str]:
+    """Lower-cased ASCII word tokens, at most `limit` of them."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    return re.findall(r"[a-z0-9]+", text)[:limit]
+
+
+# Index maintenance
+def install_sqlite_index(using: str = "default") -> bool:
+    """
+    Create the FTS5 table and triggers if missing, then rebuild the index
+    from catalog_product. Returns False when not on SQLite.
+    """
+    conn = connections[using]
+    if conn.vendor != "sqlite":
+        return False
+    with conn.cursor() as cursor:
+        if "catalog_product" not in conn.introspection.table_names(cursor):
+            return False
+        for statement in SQLITE_SCHEMA:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def on_post_migrate(sender, using="default", **kwargs) -> None:
+    install_sqlite_index(using)
+
+
+# Queries
+def _sqlite_ids(words: List[str], limit: int) -> List[str]:
+    match = " ".join(f'"{w}"*' for w in words)
+    sql = f"""
+        SELECT p.id FROM (
+            SELECT rowid, bm25({FTS_TABLE}, %s, %s) AS score FROM {FTS_TABLE}
+            WHERE {FTS_TABLE} MATCH %s
+            ORDER BY score
+            LIMIT %s
+        ) f
+        JOIN catalog_product p ON p.rowid = f.rowid
+        WHERE p.active
+        ORDER BY f.score, p.created_at DESC
+        LIMIT %s
+    """
+    params = [TITLE_WEIGHT, DESCRIPTION_WEIGHT, match, MAX_CANDIDATES, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _postgres_ids(words: List[str], limit: int) -> List[str]:
+    sql = """
+        SELECT c.id FROM (
+            SELECT p.id, p.created_at, p.active, ts_rank(p.search_vector, q) AS score
+            FROM catalog_product p, to_tsquery('simple', %s) q
+            WHERE p.search_vector @@ q
+            ORDER BY score DESC
+            LIMIT %s
+        ) c
+        WHERE c.active
+        ORDER BY c.score DESC, c.created_at DESC
+        LIMIT %s
+    """
+    query = " & ".join(f"{w}:*" for w in words)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [query, MAX_CANDIDATES, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(text: str, limit: int = 20) -> List[Product]:
+    """Active products matching every term of `text`, best match first."""
+    words = terms(text)
+    if not words:
+        return []
+
+    if connection.vendor == "postgresql":
+        ids = _postgres_ids(words, limit)
+    elif connection.vendor == "sqlite":
+        ids = _sqlite_ids(words, limit)
+    else:
+        # No ranked index on this backend: plain title scan
+        qs = Product.objects.filter(active=True)
+        for w in words:
+            qs = qs.filter(title__icontains=w)
+        return list(qs.order_by("title")[:limit])
+
+    found = Product.objects.only(
+        "id", "slug", "title", "price_pennies", "created_at"
+    ).in_bulk(ids)
+    return [found[pk] for pk in map(_pk, ids) if pk in found]
+
+
+def _pk(value):
+    # SQLite hands back UUIDs as hex strings
+    return Product._meta.pk.to_python(value)
@@ -0,0 +1,27 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_product
+from .models import DigitalAsset, Product
+from .suggest import index
+
+
+# Retire cached pages now; update this process's type-ahead index on commit
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    bump_product(instance.pk, listing=True)
+    transaction.on_commit(lambda: index.upsert(instance))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    pid = str(instance.pk)
+    bump_product(pid, listing=True)
+    transaction.on_commit(lambda: index.discard(pid))
+
+
+# Asset changes only show on the product's own page
+@receiver([post_save, post_delete], sender=DigitalAsset)
+def asset_changed(sender, instance, **kwargs):
+    bump_product(instance.product_id)
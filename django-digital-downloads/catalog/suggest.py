@@ -0,0 +1,260 @@
+"""
+In-process type-ahead index for product titles.
+
+Each process keeps a sorted list of (token, product_id) pairs built from
+normalised active product titles. A query is a bisect on its longest term
+followed by a scan of at most MAX_SCAN neighbouring entries; prefixes of
+up to HEAD_PREFIX_LEN characters are answered from precomputed top-k
+lists. Queries never touch the database.
+
+Each serving process builds the index on a background thread at startup
+(`warm_up()`, called from config/wsgi.py and config/asgi.py); a query
+that arrives before that build is done waits for it rather than starting
+its own. Product post_save / post_delete signals update it in place for
+the process that made the change. Other processes pick changes up through
+a rebuild once the index is SUGGEST_REFRESH_SECONDS old: one background
+thread rebuilds while queries keep reading the old index. Memory
+is bounded by SUGGEST_MAX_PRODUCTS (most-reviewed products are kept) and
+MAX_TOKENS tokens per title; `stats()` reports the measured footprint.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connections
+
+from .models import Product
+from .search import terms
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKENS = 12
+MAX_SCAN = 2000
+DEFAULT_LIMIT = 8
+# Short prefixes match a large slice of the catalog, so their top results
+# are kept ready-made instead of being found by a scan
+HEAD_PREFIX_LEN = 3
+HEAD_SIZE = 20
+
+
+@dataclass(frozen=True, slots=True)
+class Suggestion:
+    id: str
+    slug: str
+    title: str
+
+
+def _tokens(title: str) -> Tuple[str, ...]:
+    return tuple(dict.fromkeys(terms(title, MAX_TOKENS)))
+
+
+def _rank(review_count: int, title: str) -> Tuple[int, str]:
+    # Most-reviewed first, then alphabetical
+    return (-review_count, title.lower())
+
+
+class SuggestIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: List[Tuple[str, str]] = []
+        self._products: Dict[str, Suggestion] = {}
+        self._tokens: Dict[str, Tuple[str, ...]] = {}
+        self._ranks: Dict[str, Tuple[int, str]] = {}
+        self._heads: Dict[str, List[str]] = {}
+        self.built_at: Optional[float] = None
+        self._pid: Optional[int] = None
+
+    # Build / maintain
+    def build(self) -> None:
+        cap = settings.SUGGEST_MAX_PRODUCTS
+        rows = (
+            Product.objects.filter(active=True)
+            .order_by("-review_count", "title")
+            .values_list("id", "slug", "title", "review_count")[:cap]
+        )
+        products, tokens, ranks, heads, entries = {}, {}, {}, {}, []
+        # Rows arrive best-first, so heads fill in rank order
+        for pk, slug, title, review_count in rows.iterator(chunk_size=2000):
+            pid = str(pk)
+            products[pid] = Suggestion(pid, slug, title)
+            tokens[pid] = _tokens(title)
+            ranks[pid] = _rank(review_count, title)
+            entries.extend((tok, pid) for tok in tokens[pid])
+            for prefix in _head_prefixes(tokens[pid]):
+                head = heads.setdefault(prefix, [])
+                if len(head) < HEAD_SIZE:
+                    head.append(pid)
+        entries.sort()
+        with self._lock:
+            self._entries, self._products = entries, products
+            self._tokens, self._ranks, self._heads = tokens, ranks, heads
+            self.built_at = time.monotonic()
+
+    def _build_lock(self) -> threading.Lock:
+        # Per process: a worker forked mid-build must not inherit a held lock
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._building = threading.Lock()
+            return self._building
+
+    def build_once(self) -> None:
+        """Build if nothing is built yet; waits on a build already running."""
+        with self._build_lock():
+            if self.built_at is None:
+                self.build()
+
+    def refresh_in_background(self) -> None:
+        """Rebuild on a new thread, unless a build is already running."""
+        building = self._build_lock()
+        if not building.acquire(blocking=False):
+            return
+
+        def run() -> None:
+            try:
+                self.build()
+            except Exception:
+                logger.exception("Could not rebuild the suggest index")
+            finally:
+                building.release()
+                connections.close_all()  # this thread's own connections
+
+        threading.Thread(target=run, name="suggest-index", daemon=True).start()
+
+    def _ensure_fresh(self) -> None:
+        if self.built_at is None:
+            self.build_once()
+        elif time.monotonic() - self.built_at > settings.SUGGEST_REFRESH_SECONDS:
+            self.refresh_in_background()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries, self._products = [], {}
+            self._tokens, self._ranks, self._heads = {}, {}, {}
+            self.built_at = None
+
+    def discard(self, pid: str) -> None:
+        if self.built_at is None:
+            return  # not built yet; the first query loads everything
+        with self._lock:
+            own = self._tokens.pop(pid, ())
+            for tok in own:
+                i = bisect_left(self._entries, (tok, pid))
+                if i < len(self._entries) and self._entries[i] == (tok, pid):
+                    del self._entries[i]
+            for prefix in _head_prefixes(own):
+                # Leaves the head one short until the next rebuild
+                head = self._heads.get(prefix)
+                if head and pid in head:
+                    head.remove(pid)
+            self._products.pop(pid, None)
+            self._ranks.pop(pid, None)
+
+    def upsert(self, product: Product) -> None:
+        pid = str(product.pk)
+        self.discard(pid)
+        if self.built_at is None or not product.active:
+            return
+        with self._lock:
+            if len(self._products) >= settings.SUGGEST_MAX_PRODUCTS:
+                return  # full; the next rebuild decides what is kept
+            self._products[pid] = Suggestion(pid, product.slug, product.title)
+            self._tokens[pid] = _tokens(product.title)
+            self._ranks[pid] = _rank(product.review_count, product.title)
+            for tok in self._tokens[pid]:
+                insort(self._entries, (tok, pid))
+            for prefix in _head_prefixes(self._tokens[pid]):
+                head = self._heads.setdefault(prefix, [])
+                insort(head, pid, key=self._ranks.__getitem__)
+                del head[HEAD_SIZE:]
+
+    # Query
+    def suggest(self, text: str, limit: int = DEFAULT_LIMIT) -> List[Suggestion]:
+        words = terms(text)
+        if not words:
+            return []
+        self._ensure_fresh()
+
+        anchor = max(words, key=len)
+        if len(words) == 1 and len(anchor) <= HEAD_PREFIX_LEN and limit <= HEAD_SIZE:
+            products = self._products
+            head = self._heads.get(anchor, ())[:limit]
+            return [products[pid] for pid in head if pid in products]
+
+        others = list(words)
+        others.remove(anchor)
+        entries, tokens = self._entries, self._tokens
+
+        lo = bisect_left(entries, (anchor,))
+        hi = min(len(entries), lo + MAX_SCAN)
+        matches = set()
+        for tok, pid in entries[lo:hi]:
+            if not tok.startswith(anchor):
+                break
+            if pid in matches:
+                continue
+            own = tokens.get(pid, ())
+            if all(any(t.startswith(w) for t in own) for w in others):
+                matches.add(pid)
+
+        ranks, products = self._ranks, self._products
+        best = heapq.nsmallest(limit, matches, key=lambda pid: ranks.get(pid, ()))
+        return [products[pid] for pid in best if pid in products]
+
+    # Introspection
+    def stats(self) -> dict:
+        size = _deep_size(
+            [self._entries, self._products, self._tokens, self._ranks, self._heads],
+        )
+        count = len(self._products)
+        return {
+            "products": count,
+            "entries": len(self._entries),
+            "bytes": size,
+            "bytes_per_product": size // count if count else 0,
+        }
+
+
+def _head_prefixes(tokens: Iterable[str]) -> set:
+    return {tok[:n] for tok in tokens for n in range(1, HEAD_PREFIX_LEN + 1)}
+
+
+def _deep_size(objects: Iterable) -> int:
+    """Approximate memory held by nested containers (each object once)."""
+    seen, stack, total = set(), list(objects), 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set)):
+            stack.extend(obj)
+        elif isinstance(obj, Suggestion):
+            stack.extend((obj.id, obj.slug, obj.title))
+    return total
+
+
+index = SuggestIndex()
+
+
+def suggest(text: str, limit: int = DEFAULT_LIMIT) -> List[Suggestion]:
+    return index.suggest(text, limit)
+
+
+def warm_up() -> None:
+    """Start building this process's index without waiting for it."""
+    index.refresh_in_background()
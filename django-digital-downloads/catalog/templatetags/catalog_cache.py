@@ -0,0 +1,42 @@
+from catalog.cache import record
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(f"catalog.{self.name}", vary_on)
+        value = cache.get(key)
+        record("fragment", hit=value is not None)
+        if value is None:
+            value = self.nodelist.render(context)
+            cache.set(key, value, settings.CATALOG_PAGE_CACHE_SECONDS)
+        return value
+
+
+@register.tag
+def cachefragment(parser, token):
+    """
+    {% cachefragment name var1 var2 ... %} ... {% endcachefragment %}
+
+    Like {% cache %}, but with the catalog's timeout and hit/miss counters.
+    Pass a version from catalog.cache among the vars.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"{bits[0]!r} needs a fragment name")
+    nodelist = parser.parse(("endcachefragment",))
+    parser.delete_first_token()
+    return FragmentNode(
+        nodelist, bits[1].strip("\"'"), [parser.compile_filter(b) for b in bits[2:]]
+    )
@@ -0,0 +1,101 @@
+import pytest
+from catalog.models import Product
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+from reviews.utils import save_review
+
+
+def _revalidate(client, url, resp, **headers):
+    return client.get(url, HTTP_IF_NONE_MATCH=resp["ETag"], **headers)
+
+
+# A matching ETag short-circuits before the template renders
+@pytest.mark.django_db
+def test_list_304_until_catalog_changes(client, product):
+    url = reverse("catalog:list")
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first["Last-Modified"]
+    assert "no-cache" in first["Cache-Control"]
+
+    again = _revalidate(client, url, first)
+    assert again.status_code == 304
+    assert not again.templates
+    assert again.content == b""
+
+    Product.objects.create(slug="newer", title="Newer", price_pennies=1)
+    assert _revalidate(client, url, first).status_code == 200
+
+
+@pytest.mark.django_db
+def test_list_if_modified_since(client, product):
+    url = reverse("catalog:list")
+    first = client.get(url)
+    resp = client.get(url, HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+    assert resp.status_code == 304
+
+
+@pytest.mark.django_db
+def test_detail_304_until_reviewed(client, user, product):
+    url = reverse("catalog:detail", args=[product.slug])
+    first = client.get(url)
+    assert _revalidate(client, url, first).status_code == 304
+
+    other = User(username="bob")
+    other.set_unusable_password()
+    other.save()
+    save_review(product, other, 3, "Fine")
+    assert _revalidate(client, url, first).status_code == 200
+
+
+# The navbar differs per viewer, so the validators do too
+@pytest.mark.django_db
+def test_detail_etag_depends_on_viewer(client, user, product):
+    url = reverse("catalog:detail", args=[product.slug])
+    anonymous = client.get(url)
+
+    client.force_login(user)
+    signed_in = client.get(url)
+    assert signed_in["ETag"] != anonymous["ETag"]
+    assert "private" in signed_in["Cache-Control"]
+    assert _revalidate(client, url, anonymous).status_code == 200
+    assert _revalidate(client, url, signed_in).status_code == 304
+
+
+# Logging in again rotates the CSRF secret; the cached forms must not be reused
+@pytest.mark.django_db
+def test_detail_etag_changes_when_csrf_secret_rotates(user, product):
+    client = Client(enforce_csrf_checks=True)
+    url = reverse("catalog:detail", args=[product.slug])
+
+    def login():
+        token = client.get(reverse("login")).context["csrf_token"]
+        client.post(
+            reverse("login"),
+            {"username": "alice", "password": "testpass123"},
+            HTTP_X_CSRFTOKEN=str(token),
+        )
+
+    login()
+    first = client.get(url)
+    assert _revalidate(client, url, first).status_code == 304
+
+    client.post(reverse("logout"), HTTP_X_CSRFTOKEN=str(first.context["csrf_token"]))
+    login()
+    again = _revalidate(client, url, first)
+    assert again.status_code == 200
+
+    token = str(again.context["csrf_token"])
+    resp = client.post(
+        reverse("reviews:add", args=[product.slug]),
+        {"rating": 4, "csrfmiddlewaretoken": token},
+    )
+    assert resp.status_code != 403
+
+
+@pytest.mark.django_db
+def test_missing_product_is_still_404(client):
+    resp = client.get(reverse("catalog:detail", args=["nope"]))
+    assert resp.status_code in (302, 404)  # handler404 redirects home
+    assert "ETag" not in resp
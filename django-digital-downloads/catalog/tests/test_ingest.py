@@ -0,0 +1,91 @@
+import os
+from hashlib import sha256
+
+import pytest
+from catalog.ingest import MANIFEST_NAME, ingest
+from catalog.models import DigitalAsset, Product
+from django.core.management import call_command
+from orders.models import LibraryEntry, UserAsset
+from orders.signing import signed_entry_url
+
+
+@pytest.fixture
+def library(tmp_path):
+    (tmp_path / "products").mkdir()
+    (tmp_path / "samples").mkdir()
+    (tmp_path / "products" / "happy_loop.mp3").write_bytes(b"loop-bytes")
+    (tmp_path / "samples" / "dark-choir.mp3").write_bytes(b"choir-bytes")
+    (tmp_path / "samples" / "notes.txt").write_text("ignored")
+    return tmp_path
+
+
+# First run creates products and hashed assets, and writes a manifest
+@pytest.mark.django_db
+def test_ingest_creates_products_and_assets(library):
+    stats = ingest(library, workers=1)
+
+    assert stats.hashed == 2 and stats.products_created == 2
+    asset = DigitalAsset.objects.get(file_path="products/happy_loop.mp3")
+    assert asset.sha256 == sha256(b"loop-bytes").hexdigest()
+    assert asset.size_bytes == len(b"loop-bytes")
+    assert asset.product.title == "Happy Loop"
+    assert (library / MANIFEST_NAME).exists()
+
+
+# Unchanged files are skipped without touching the database
+@pytest.mark.django_db
+def test_ingest_skips_unchanged_files(library, django_assert_num_queries):
+    ingest(library, workers=1)
+    with django_assert_num_queries(1):  # DigitalAsset.exists() sanity check
+        stats = ingest(library, workers=1)
+    assert stats.unchanged == 2 and stats.hashed == 0
+
+
+# A modified file is re-hashed and its asset updated in place
+@pytest.mark.django_db
+def test_ingest_updates_changed_file(library):
+    ingest(library, workers=1)
+    Product.objects.filter(slug="happy-loop").update(title="Edited In Admin")
+
+    track = library / "products" / "happy_loop.mp3"
+    track.write_bytes(b"new-loop-bytes")
+    os.utime(track, ns=(1, 1))
+    stats = ingest(library, workers=1)
+
+    assert stats.hashed == 1 and stats.products_created == 0
+    assert DigitalAsset.objects.count() == 2
+    asset = DigitalAsset.objects.get(file_path="products/happy_loop.mp3")
+    assert asset.sha256 == sha256(b"new-loop-bytes").hexdigest()
+    assert asset.product.title == "Edited In Admin"
+
+
+# Re-ingesting a changed file updates the library, so signed links carry
+# the new hash and the download's ETag changes with the bytes
+@pytest.mark.django_db
+def test_reingest_refreshes_signed_links(library, settings, client, user):
+    settings.PROTECTED_MEDIA_ROOT = library
+    ingest(library, workers=1)
+    asset = DigitalAsset.objects.get(file_path="products/happy_loop.mp3")
+    UserAsset.objects.create(user=user, product=asset.product, digital_asset=asset)
+    old_etag = client.get(signed_entry_url(LibraryEntry.objects.get()))["ETag"]
+
+    track = library / "products" / "happy_loop.mp3"
+    track.write_bytes(b"version2")
+    os.utime(track, ns=(1, 1))
+    ingest(library, workers=1)
+
+    entry = LibraryEntry.objects.get()
+    assert entry.sha256 == sha256(b"version2").hexdigest()
+    resp = client.get(signed_entry_url(entry))
+    assert b"".join(resp.streaming_content) == b"version2"
+    assert resp["ETag"] != old_etag
+    assert entry.sha256 in resp["ETag"]
+
+
+# Management command hashes across a process pool
+@pytest.mark.django_db
+def test_ingest_command_with_worker_pool(library, settings, capsys):
+    settings.PROTECTED_MEDIA_ROOT = library
+    call_command("ingest_demo_mp3s", "--workers", "2", "--batch-size", "1")
+    assert DigitalAsset.objects.count() == 2
+    assert "created 2 products" in capsys.readouterr().out
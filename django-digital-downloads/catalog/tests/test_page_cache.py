@@ -0,0 +1,116 @@
+import pytest
+from catalog.cache import metrics_lines
+from catalog.models import CacheVersion, DigitalAsset, Product
+from django.urls import reverse
+from reviews.utils import save_review
+
+
+def _get(client, url, **params):
+    resp = client.get(url, params)
+    assert resp.status_code == 200
+    return resp
+
+
+# Anonymous listing is served whole from the cache until a product changes
+@pytest.mark.django_db
+def test_anonymous_list_cached_until_product_saved(client, django_assert_num_queries):
+    Product.objects.create(slug="first", title="First", price_pennies=100)
+    _get(client, reverse("catalog:list"))
+    with django_assert_num_queries(0):
+        _get(client, reverse("catalog:list"))
+
+    Product.objects.create(slug="second", title="Second", price_pennies=100)
+    assert b"Second" in _get(client, reverse("catalog:list")).content
+
+
+# Without a shared cache the versions are read from the database, so a
+# change made by another process (bulk ingest here) still retires pages
+@pytest.mark.django_db
+@pytest.mark.query_budget("catalog:list", queries=6)  # + version read and mint
+def test_versions_in_database_without_shared_cache(
+    client, settings, django_assert_num_queries
+):
+    settings.SHARED_CACHE = False
+    Product.objects.create(slug="first", title="First", price_pennies=100)
+    _get(client, reverse("catalog:list"))
+    with django_assert_num_queries(1):  # the version read
+        _get(client, reverse("catalog:list"))
+
+    Product.objects.bulk_create(
+        [Product(slug="second", title="Second", price_pennies=100)]
+    )
+    CacheVersion.objects.filter(key="catalog:v:all").update(token="x")  # bump_all()
+    assert b"Second" in _get(client, reverse("catalog:list")).content
+
+
+# A review bumps its product's page and nothing else
+@pytest.mark.django_db
+def test_review_bumps_only_its_product(
+    client, user, product, django_assert_num_queries
+):
+    other = Product.objects.create(slug="other", title="Other", price_pennies=1)
+    for url in (
+        reverse("catalog:list"),
+        reverse("catalog:detail", args=[product.slug]),
+        reverse("catalog:detail", args=[other.slug]),
+    ):
+        _get(client, url)
+        _get(client, url)  # first visit learns the slug; this one fills the cache
+
+    save_review(product, user, 4, "Lovely")
+
+    with django_assert_num_queries(0):
+        _get(client, reverse("catalog:list"))
+        _get(client, reverse("catalog:detail", args=[other.slug]))
+    resp = _get(client, reverse("catalog:detail", args=[product.slug]))
+    assert b"Lovely" in resp.content
+
+
+@pytest.mark.django_db
+def test_asset_change_bumps_detail_page(client, product):
+    url = reverse("catalog:detail", args=[product.slug])
+    _get(client, url)
+    first = _get(client, url).content
+
+    Product.objects.filter(pk=product.pk).update(title="Renamed")
+    assert _get(client, url).content == first  # update() skips signals
+
+    DigitalAsset.objects.create(product=product, file_path="x.mp3", file_name="x")
+    assert b"Renamed" in _get(client, url).content
+
+
+# Signed-in users skip the page cache but reuse the review fragment
+@pytest.mark.django_db
+def test_review_fragment_cached_for_signed_in_users(client, user, product):
+    save_review(product, user, 5, "Great")
+    client.force_login(user)
+    url = reverse("catalog:detail", args=[product.slug])
+
+    _get(client, url)
+    assert b"Great" in _get(client, url).content
+    assert b"Log in</a> to leave a review" not in _get(client, url).content
+
+    metrics = "\n".join(metrics_lines())
+    assert 'catalog_cache_requests_total{kind="fragment",result="hit"} 2' in metrics
+    assert 'catalog_cache_requests_total{kind="page",result="hit"} 0' in metrics
+
+
+# The same flow works against a file-based cache
+@pytest.mark.django_db
+def test_file_based_cache_backend(client, settings, tmp_path):
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": str(tmp_path),
+        }
+    }
+    product = Product.objects.create(slug="filed", title="Filed", price_pennies=1)
+    _get(client, reverse("catalog:list"))
+    _get(client, reverse("catalog:list"))
+
+    product.title = "Refiled"
+    product.save()
+    assert b"Refiled" in _get(client, reverse("catalog:list")).content
+
+    metrics = "\n".join(metrics_lines())
+    assert 'catalog_cache_requests_total{kind="page",result="hit"} 1' in metrics
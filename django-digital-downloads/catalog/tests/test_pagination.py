@@ -0,0 +1,78 @@
+import pytest
+from catalog.models import Product
+from django.test.utils import override_settings
+from django.urls import reverse
+
+
+def _get_json(client, url):
+    resp = client.get(url)
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def _make_products(n):
+    return [
+        Product.objects.create(
+            slug=f"track-{i}", title=f"Track {i}", price_pennies=100 + i, active=True
+        )
+        for i in range(n)
+    ]
+
+
+# API pages are disjoint and cover every active product
+@pytest.mark.django_db
+def test_products_api_walks_all_pages(client):
+    made = _make_products(7)
+    Product.objects.create(slug="hidden", title="Hidden", price_pennies=1, active=False)
+
+    seen = []
+    url = reverse("catalog:api_products") + "?page_size=3"
+    while url:
+        data = _get_json(client, url)
+        seen.extend(r["slug"] for r in data["results"])
+        url = data["next"]
+
+    assert len(seen) == len(set(seen)) == 7
+    assert set(seen) == {p.slug for p in made}
+
+
+# Products sharing a timestamp are split by id, not skipped
+@pytest.mark.django_db
+def test_products_api_breaks_timestamp_ties_by_id(client):
+    made = _make_products(5)
+    Product.objects.update(created_at=made[0].created_at)
+
+    first = _get_json(client, reverse("catalog:api_products") + "?page_size=2")
+    rest = _get_json(client, first["next"])
+    last = _get_json(client, rest["next"])
+
+    slugs = [r["slug"] for r in first["results"] + rest["results"] + last["results"]]
+    assert sorted(slugs) == sorted(p.slug for p in made)
+    assert last["next"] is None
+
+
+# Bad cursors are rejected by the API and ignored by the HTML list
+@pytest.mark.django_db
+def test_invalid_cursor(client, product):
+    resp = client.get(reverse("catalog:api_products"), {"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
+
+    resp = client.get(reverse("catalog:list"), {"cursor": "not-a-cursor"})
+    assert resp.status_code == 200
+    assert product.title.encode() in resp.content
+
+
+# HTML list links to the next page and uses the cached count
+@pytest.mark.django_db
+@override_settings(CATALOG_PAGE_SIZE=2)
+def test_product_list_next_link_and_cached_count(client, django_assert_num_queries):
+    _make_products(3)
+    resp = client.get(reverse("catalog:list"))
+    assert resp.context["page"].has_next
+    assert b"Next page" in resp.content
+    assert resp.context["count_estimate"] == 3
+
+    # Count is served from cache: only the page query runs
+    next_cursor = resp.context["page"].next_cursor
+    with django_assert_num_queries(1):
+        client.get(reverse("catalog:list"), {"cursor": next_cursor})
@@ -0,0 +1,105 @@
+import pytest
+from catalog.models import Product
+from catalog.search import search, terms
+from django.core.management import call_command
+from django.urls import reverse
+
+
+def _product(slug, title, description="", active=True):
+    return Product.objects.create(
+        slug=slug,
+        title=title,
+        description=description,
+        price_pennies=100,
+        active=active,
+    )
+
+
+def _slugs(products):
+    return [p.slug for p in products]
+
+
+def test_terms_normalise_and_cap():
+    assert terms("  Café  DEL-MAR!! ") == ["cafe", "del", "mar"]
+    assert terms('"*) OR (') == ["or"]
+    assert len(terms(" ".join("w" * 3 for _ in range(20)))) == 8
+
+
+# Prefix matching, every term must match
+@pytest.mark.django_db
+def test_search_matches_prefixes_of_all_terms():
+    _product("midnight-drive", "Midnight Drive")
+    _product("midday-walk", "Midday Walk")
+    _product("drive-home", "Drive Home")
+
+    assert set(_slugs(search("mid"))) == {"midnight-drive", "midday-walk"}
+    assert _slugs(search("mid dri")) == ["midnight-drive"]
+    assert search("nothing") == []
+    assert search("  ") == []
+
+
+# Title hits outrank description hits; inactive products are hidden
+@pytest.mark.django_db
+def test_search_ranks_title_above_description():
+    _product("ambient-notes", "Quiet Loop", description="ambient piano sketch")
+    _product("ambient-rain", "Ambient Rain")
+    _product("ambient-hidden", "Ambient Hidden", active=False)
+
+    assert _slugs(search("ambient")) == ["ambient-rain", "ambient-notes"]
+
+
+# The candidate cap keeps the best matches, not the first ones found
+@pytest.mark.django_db
+def test_search_ranks_before_capping_candidates(monkeypatch):
+    monkeypatch.setattr("catalog.search.MAX_CANDIDATES", 2)
+    _product("notes-one", "Quiet Loop", description="ambient piano")
+    _product("notes-two", "Slow Loop", description="ambient strings")
+    _product("ambient-rain", "Ambient Rain")
+
+    results = _slugs(search("ambient"))
+    assert len(results) == 2 and results[0] == "ambient-rain"
+
+
+# The index follows inserts, edits, deletes and bulk (ingest) writes
+@pytest.mark.django_db
+def test_index_follows_writes():
+    p = _product("first-light", "First Light")
+    assert _slugs(search("first")) == ["first-light"]
+
+    p.title = "Last Light"
+    p.save()
+    assert search("first") == []
+    assert _slugs(search("last")) == ["first-light"]
+
+    p.delete()
+    assert search("light") == []
+
+    Product.objects.bulk_create(
+        [
+            Product(slug=f"bulk-{i}", title=f"Bulk Track {i}", price_pennies=1)
+            for i in range(3)
+        ]
+    )
+    assert len(search("bulk")) == 3
+
+
+@pytest.mark.django_db
+def test_rebuild_command_keeps_results():
+    _product("echo-chamber", "Echo Chamber")
+    call_command("rebuild_search_index")
+    assert _slugs(search("echo")) == ["echo-chamber"]
+
+
+@pytest.mark.django_db
+def test_search_api_and_page(client):
+    _product("neon-city", "Neon City")
+
+    data = client.get(reverse("catalog:api_search"), {"q": "neo"}).json()
+    assert [r["slug"] for r in data["results"]] == ["neon-city"]
+    assert data["results"][0]["url"] == reverse("catalog:detail", args=["neon-city"])
+
+    assert client.get(reverse("catalog:api_search"), {"limit": "x"}).status_code == 400
+
+    resp = client.get(reverse("catalog:search"), {"q": "neon"})
+    assert resp.status_code == 200
+    assert b"Neon City" in resp.content
@@ -0,0 +1,154 @@
+import threading
+import time
+
+import pytest
+from catalog.models import Product
+from catalog.suggest import index, suggest, warm_up
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    index.clear()
+    yield
+    index.clear()
+
+
+def _product(slug, title, review_count=0, active=True):
+    return Product.objects.create(
+        slug=slug,
+        title=title,
+        price_pennies=100,
+        review_count=review_count,
+        active=active,
+    )
+
+
+def _slugs(results):
+    return [s.slug for s in results]
+
+
+# Any word of the title can be typed as a prefix; popular products first
+@pytest.mark.django_db
+def test_suggest_prefix_any_word_ranked_by_reviews():
+    _product("neon-nights", "Neon Nights", review_count=1)
+    _product("city-neon", "City Neon", review_count=9)
+    _product("night-bus", "Night Bus")
+    _product("neon-hidden", "Neon Hidden", active=False)
+
+    assert _slugs(suggest("ne")) == ["city-neon", "neon-nights"]
+    assert _slugs(suggest("neon ni")) == ["neon-nights"]
+    assert _slugs(suggest("NIGHT")) == ["neon-nights", "night-bus"]
+    assert suggest("") == []
+
+
+# Queries are served from memory once built
+@pytest.mark.django_db
+def test_suggest_does_not_query_after_build():
+    _product("lofi-beats", "Lofi Beats")
+    suggest("lo")
+    with CaptureQueriesContext(connection) as ctx:
+        assert _slugs(suggest("lof")) == ["lofi-beats"]
+    assert not ctx.captured_queries
+
+
+@pytest.fixture
+def slow_build(monkeypatch):
+    """Replace index.build with one that blocks until `release` is set."""
+    calls, release = [], threading.Event()
+
+    def build():
+        calls.append(threading.current_thread().name)
+        release.wait(5)
+        index.built_at = time.monotonic()
+
+    monkeypatch.setattr(index, "build", build)
+    yield calls, release
+    release.set()
+    with index._build_lock():  # let a background build finish
+        pass
+
+
+# A stale index is rebuilt off the request path, once, while the old one
+# keeps answering
+@pytest.mark.django_db
+def test_stale_index_rebuilds_in_background(slow_build):
+    calls, release = slow_build
+    _product("lofi-beats", "Lofi Beats")
+    index.__class__.build(index)
+    index.built_at -= 10_000
+
+    with CaptureQueriesContext(connection) as ctx:
+        for _ in range(3):
+            assert _slugs(suggest("lof")) == ["lofi-beats"]
+    assert not ctx.captured_queries
+    release.set()
+    with index._build_lock():
+        assert calls == ["suggest-index"]
+
+
+# Startup builds on a thread; a query that arrives first waits for that
+# build instead of starting another
+@pytest.mark.django_db
+def test_warm_up_builds_once(slow_build):
+    calls, release = slow_build
+    warm_up()
+    waiter = threading.Thread(target=index.build_once)
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()
+
+    release.set()
+    waiter.join(5)
+    assert calls == ["suggest-index"]
+
+
+# Saves and deletes update the built index in place
+@pytest.mark.django_db
+def test_signals_update_index(django_capture_on_commit_callbacks):
+    suggest("warm")  # build the (empty) index
+
+    with django_capture_on_commit_callbacks(execute=True):
+        p = _product("warm-tape", "Warm Tape")
+    assert _slugs(suggest("warm")) == ["warm-tape"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        p.title = "Cold Tape"
+        p.save()
+    assert suggest("warm") == []
+    assert _slugs(suggest("cold")) == ["warm-tape"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        p.delete()
+    assert suggest("tape") == []
+    assert index.stats()["entries"] == 0
+
+
+# Index size is capped and reported
+@pytest.mark.django_db
+def test_index_is_bounded(settings):
+    settings.SUGGEST_MAX_PRODUCTS = 3
+    for i in range(5):
+        _product(f"track-{i}", f"Track Number {i}", review_count=i)
+
+    assert _slugs(suggest("track")) == ["track-4", "track-3", "track-2"]
+    stats = index.stats()
+    assert stats["products"] == 3
+    assert 0 < stats["bytes_per_product"] < 2048
+
+
+@pytest.mark.django_db
+def test_suggest_api(client):
+    _product("glass-river", "Glass River")
+    data = client.get(reverse("catalog:api_suggest"), {"q": "gla"}).json()
+    assert data["results"] == [
+        {
+            "id": str(Product.objects.get().id),
+            "slug": "glass-river",
+            "title": "Glass River",
+            "url": reverse("catalog:detail", args=["glass-river"]),
+        }
+    ]
+    assert client.get(reverse("catalog:api_suggest"), {"limit": "x"}).status_code == 400
@@ -1,11 +1,25 @@
 from django.urls import path
 
-from .views import catalog_health, product_detail, product_list
+from .views import (
+    catalog_health,
+    catalog_health_slugs,
+    product_detail,
+    product_list,
+    product_list_api,
+    product_search,
+    product_search_api,
+    product_suggest_api,
+)
 
 app_name = "catalog"
 
 urlpatterns = [
     path("", product_list, name="list"),
     path("health/", catalog_health, name="health"),
+    path("health/slugs/", catalog_health_slugs, name="health_slugs"),
+    path("search/", product_search, name="search"),
+    path("api/products/", product_list_api, name="api_products"),
+    path("api/search/", product_search_api, name="api_search"),
+    path("api/suggest/", product_suggest_api, name="api_suggest"),
     path("<slug:slug>/", product_detail, name="detail"),
 ]
@@ -1,27 +1,290 @@
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, render
+from core.conditional import conditional_page, make_etag, viewer
+from core.pagination import InvalidCursor, paginate
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, Q
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.cache import never_cache
 
+from .cache import (
+    cache_anonymous_page,
+    list_version,
+    memoize,
+    product_version,
+    remember_slug,
+    slug_version,
+)
 from .models import Product
+from .search import search
+from .suggest import DEFAULT_LIMIT as SUGGEST_LIMIT
+from .suggest import suggest
 
+ACTIVE_COUNT_CACHE_KEY = "catalog:active_count"
+CATALOG_STATS_CACHE_KEY = "catalog:stats"
+MAX_API_PAGE_SIZE = 100
+REVIEWS_PER_PAGE = 10
+SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 50
+MAX_SUGGEST_LIMIT = 20
 
-# Health Check View
+
+def catalog_stats() -> dict:
+    """
+    Product counts, from one aggregate query at most once per
+    CATALOG_COUNT_CACHE_SECONDS; probes and dashboards read the snapshot.
+    """
+
+    def compute():
+        stats = Product.objects.aggregate(
+            total=Count("id"), active=Count("id", filter=Q(active=True))
+        )
+        stats["refreshed_at"] = timezone.now().isoformat()
+        return stats
+
+    return cache.get_or_set(
+        CATALOG_STATS_CACHE_KEY, compute, settings.CATALOG_COUNT_CACHE_SECONDS
+    )
+
+
+# Health Check View (cached counts; slugs are in catalog_health_slugs)
+@never_cache
 def catalog_health(request):
-    qs = Product.objects.all()
-    act = Product.objects.filter(active=True)
+    stats = catalog_stats()
     return HttpResponse(
-        f"total={qs.count()} active={act.count()} slugs={list(act.values_list(
-            'slug', flat=True
-        ))}"
+        f"total={stats['total']} active={stats['active']} "
+        f"refreshed_at={stats['refreshed_at']}",
+        content_type="text/plain",
+    )
+
+
+# Active Slugs Diagnostic (staff only, keyset-paginated)
+@staff_member_required
+def catalog_health_slugs(request):
+    try:
+        page_size = int(request.GET.get("page_size") or MAX_API_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"error": "Invalid page_size"}, status=400)
+    page_size = max(1, min(page_size, MAX_API_PAGE_SIZE))
+
+    products = Product.objects.filter(active=True).only("id", "slug", "created_at")
+    try:
+        page = paginate(products, request.GET.get("cursor"), page_size)
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+    return JsonResponse(
+        {"slugs": [p.slug for p in page.items], "next_cursor": page.next_cursor}
+    )
+
+
+def active_product_estimate() -> int:
+    """
+    Approximate number of active products.
+    Refreshed at most once per CATALOG_COUNT_CACHE_SECONDS so listing pages
+    never pay for a COUNT(*) on every hit.
+    """
+    return cache.get_or_set(
+        ACTIVE_COUNT_CACHE_KEY,
+        lambda: Product.objects.filter(active=True).count(),
+        settings.CATALOG_COUNT_CACHE_SECONDS,
     )
 
 
+def _product_json(p) -> dict:
+    return {
+        "id": str(p.id),
+        "slug": p.slug,
+        "title": p.title,
+        "price_pennies": p.price_pennies,
+        "url": reverse("catalog:detail", args=[p.slug]),
+    }
+
+
+def _listing_page(cursor, page_size: int):
+    products = Product.objects.filter(active=True).only(
+        "id", "slug", "title", "price_pennies", "created_at"
+    )
+    return paginate(products, cursor, page_size)
+
+
+# Conditional GET validators
+def _list_etag(request):
+    return make_etag(viewer(request), list_version(), request.GET.get("cursor"))
+
+
+def _list_last_modified(request):
+    # Inactive rows count too: hiding a product changes the listing
+    return memoize(
+        "list_modified",
+        list_version(),
+        lambda: Product.objects.aggregate(latest=Max("updated_at"))["latest"],
+    )
+
+
+def _detail_product(request, slug):
+    """The active product for `slug`, fetched at most once per request."""
+    if not hasattr(request, "_product"):
+        request._product = Product.objects.filter(slug=slug, active=True).first()
+    return request._product
+
+
+def _detail_updated_at(request, slug):
+    """
+    Product.updated_at for `slug`. Served from the cache while the
+    product's version stands; otherwise the product itself is loaded and
+    handed on to the view.
+    """
+    if not hasattr(request, "_product_updated_at"):
+        version = slug_version(slug)
+        if version is None:
+            product = _detail_product(request, slug)
+            updated_at = product.updated_at if product else None
+        else:
+            updated_at = memoize(
+                f"modified:{slug}",
+                version,
+                lambda: Product.objects.filter(slug=slug, active=True)
+                .values_list("updated_at", flat=True)
+                .first(),
+            )
+        request._product_updated_at = updated_at
+    return request._product_updated_at
+
+
+def _detail_etag(request, slug):
+    updated_at = _detail_updated_at(request, slug)
+    if updated_at is None:
+        return None
+    return make_etag(viewer(request), updated_at.isoformat(), request.GET.get("page"))
+
+
 # Product List View
+@conditional_page(_list_etag, _list_last_modified)
+@cache_anonymous_page(lambda request: list_version())
 def product_list(request):
-    products = Product.objects.filter(active=True).order_by("-created_at")
-    return render(request, "catalog/list.html", {"products": products})
+    cursor = request.GET.get("cursor")
+
+    def load_page():
+        try:
+            return _listing_page(cursor, settings.CATALOG_PAGE_SIZE)
+        except InvalidCursor:
+            # Stale or mangled link: start again from the first page
+            return _listing_page(None, settings.CATALOG_PAGE_SIZE)
+
+    return render(
+        request,
+        "catalog/list.html",
+        {
+            # Only queried when the grid fragment is not cached
+            "page": SimpleLazyObject(load_page),
+            "count_estimate": active_product_estimate(),
+            "cache_version": list_version(),
+        },
+    )
+
+
+# Product List API
+def product_list_api(request):
+    try:
+        page_size = int(request.GET.get("page_size") or settings.CATALOG_PAGE_SIZE)
+    except ValueError:
+        return JsonResponse({"error": "Invalid page_size"}, status=400)
+    page_size = max(1, min(page_size, MAX_API_PAGE_SIZE))
+
+    try:
+        page = _listing_page(request.GET.get("cursor"), page_size)
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    next_url = None
+    if page.next_cursor:
+        next_url = (
+            f"{reverse('catalog:api_products')}?cursor={page.next_cursor}"
+            f"&page_size={page_size}"
+        )
+    return JsonResponse(
+        {
+            "results": [_product_json(p) for p in page.items],
+            "next_cursor": page.next_cursor,
+            "next": next_url,
+            "count_estimate": active_product_estimate(),
+        }
+    )
+
+
+# Product Search View
+def product_search(request):
+    q = request.GET.get("q", "").strip()
+    return render(
+        request,
+        "catalog/search.html",
+        {"q": q, "products": search(q, SEARCH_LIMIT) if q else []},
+    )
+
+
+# Product Search API
+def product_search_api(request):
+    q = request.GET.get("q", "").strip()
+    try:
+        limit = int(request.GET.get("limit") or SEARCH_LIMIT)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+    results = search(q, limit) if q else []
+    return JsonResponse({"q": q, "results": [_product_json(p) for p in results]})
+
+
+# Type-ahead API
+def product_suggest_api(request):
+    q = request.GET.get("q", "").strip()
+    try:
+        limit = int(request.GET.get("limit") or SUGGEST_LIMIT)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    limit = max(1, min(limit, MAX_SUGGEST_LIMIT))
+
+    return JsonResponse(
+        {
+            "q": q,
+            "results": [
+                {
+                    "id": s.id,
+                    "slug": s.slug,
+                    "title": s.title,
+                    "url": reverse("catalog:detail", args=[s.slug]),
+                }
+                for s in suggest(q, limit)
+            ],
+        }
+    )
 
 
 # Product Detail View
+@conditional_page(_detail_etag, _detail_updated_at)
+@cache_anonymous_page(lambda request, slug: slug_version(slug))
 def product_detail(request, slug: str):
-    product = get_object_or_404(Product, slug=slug, active=True)
-    return render(request, "catalog/detail.html", {"product": product})
+    product = _detail_product(request, slug)
+    if product is None:
+        raise Http404("No Product matches the given query.")
+    remember_slug(slug, product.pk)
+    reviews = SimpleLazyObject(
+        lambda: Paginator(
+            product.reviews.select_related("user").order_by("-created_at", "-id"),
+            REVIEWS_PER_PAGE,
+        ).get_page(request.GET.get("page"))
+    )
+    return render(
+        request,
+        "catalog/detail.html",
+        {
+            "product": product,
+            "reviews": reviews,
+            "cache_version": product_version(product.pk),
+        },
+    )
@@ -1,3 +1,21 @@
 from django.contrib import admin
 
+from .models import ProcessedStripeEvent
+
 # Register your models here.
+
+
+# STRIPE EVENT ADMIN
+@admin.register(ProcessedStripeEvent)
+class ProcessedStripeEventAdmin(admin.ModelAdmin):
+    list_display = (
+        "event_id",
+        "type",
+        "status",
+        "attempts",
+        "next_attempt_at",
+        "received_at",
+    )
+    list_filter = ("status", "type")
+    search_fields = ("event_id",)
+    readonly_fields = ("payload", "received_at", "processed_at")
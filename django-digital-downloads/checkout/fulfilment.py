@@ -0,0 +1,176 @@
+"""
+Stripe event processing, run by `manage.py process_stripe_events`.
+
+The webhook view only verifies and records events; everything that
+touches orders and grants happens here, off the request path.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+from datetime import timedelta
+from typing import Callable, Dict
+
+from django.db import transaction
+from django.utils import timezone
+from orders.library import refresh_library
+from orders.models import DigitalAsset, Order, UserAsset
+
+from .models import ProcessedStripeEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+# Retries wait 1, 2, 4, 8... minutes, so a blip or a deploy has time to pass
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 60 * 60
+
+
+# Fulfilment
+def _session_orders(session_id: str):
+    # Repeats the partial unique index's condition so SQLite will use it
+    return Order.objects.filter(stripe_session_id=session_id).exclude(
+        stripe_session_id=""
+    )
+
+
+def _metadata_order(session: dict):
+    """The pending order named in the session's metadata, if any."""
+    order_id = (session.get("metadata") or {}).get("order_id")
+    try:
+        return Order.objects.filter(
+            pk=uuid.UUID(str(order_id)), status=Order.Status.PENDING
+        )
+    except ValueError:
+        return Order.objects.none()
+
+
+def fulfil_checkout_session(session: dict) -> int:
+    """
+    Mark the session's order paid and grant every asset it bought.
+    Returns the number of grants attempted; safe to run more than once.
+    """
+    session_id = session.get("id")
+    if not session_id:
+        return 0
+
+    with transaction.atomic():
+        paid = {
+            "status": Order.Status.PAID,
+            "stripe_payment_intent": session.get("payment_intent") or "",
+        }
+        updated = (
+            _session_orders(session_id)
+            .filter(status=Order.Status.PENDING)
+            .update(**paid)
+        )
+        if not updated and not _session_orders(session_id).exists():
+            # The order's session id was replaced after this session was
+            # opened; the session still names its order
+            updated = _metadata_order(session).update(
+                stripe_session_id=session_id, **paid
+            )
+            if not updated:
+                logger.warning("Checkout session %s matches no order", session_id)
+        if not updated:
+            return 0  # unknown session, or another worker already paid it
+
+        order = _session_orders(session_id).only("id", "user_id").get()
+        grants = [
+            UserAsset(
+                user_id=order.user_id,
+                product_id=product_id,
+                digital_asset_id=asset_id,
+            )
+            for asset_id, product_id in DigitalAsset.objects.filter(
+                product__order_items__order=order
+            )
+            .values_list("id", "product_id")
+            .distinct()
+        ]
+        UserAsset.objects.bulk_create(grants, ignore_conflicts=True)
+        # bulk_create skips post_save, and conflicting rows keep their ids
+        refresh_library(
+            UserAsset.objects.filter(
+                user_id=order.user_id,
+                digital_asset_id__in=[g.digital_asset_id for g in grants],
+            )
+        )
+    return len(grants)
+
+
+HANDLERS: Dict[str, Callable[[dict], object]] = {
+    "checkout.session.completed": lambda event: fulfil_checkout_session(
+        (event.get("data") or {}).get("object") or {}
+    ),
+}
+
+
+# Queue consumer
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff after the `attempts`-th failure."""
+    seconds = RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, RETRY_MAX_SECONDS))
+
+
+def process_event(event_id: str, max_attempts: int = MAX_ATTEMPTS) -> bool:
+    """
+    Claim and handle one pending event. Returns False when another worker
+    holds it or it is no longer pending.
+    """
+    with transaction.atomic():
+        event = (
+            ProcessedStripeEvent.objects.select_for_update(skip_locked=True)
+            .filter(pk=event_id, status=ProcessedStripeEvent.Status.PENDING)
+            .first()
+        )
+        if event is None:
+            return False
+
+        event.attempts += 1
+        handler = HANDLERS.get(event.type)
+        try:
+            with transaction.atomic():
+                if handler is not None:
+                    handler(event.payload)
+        except Exception as exc:
+            logger.exception("Stripe event %s failed", event.event_id)
+            event.last_error = f"{type(exc).__name__}: {exc}"
+            if event.attempts >= max_attempts:
+                event.status = ProcessedStripeEvent.Status.FAILED
+            else:
+                event.next_attempt_at = timezone.now() + retry_delay(event.attempts)
+        else:
+            event.status = ProcessedStripeEvent.Status.DONE
+            event.last_error = ""
+            event.processed_at = timezone.now()
+        event.save(
+            update_fields=[
+                "status",
+                "attempts",
+                "last_error",
+                "next_attempt_at",
+                "processed_at",
+            ]
+        )
+    return True
+
+
+def process_pending_events(
+    batch_size: int = DEFAULT_BATCH_SIZE, max_attempts: int = MAX_ATTEMPTS
+) -> int:
+    """
+    Work through up to `batch_size` pending events that are due, oldest
+    first; events waiting out a retry delay are left for a later pass.
+    """
+    ids = list(
+        ProcessedStripeEvent.objects.filter(
+            status=ProcessedStripeEvent.Status.PENDING,
+            next_attempt_at__lte=timezone.now(),
+        )
+        .order_by("next_attempt_at")
+        .values_list("event_id", flat=True)[:batch_size]
+    )
+    return sum(process_event(event_id, max_attempts) for event_id in ids)
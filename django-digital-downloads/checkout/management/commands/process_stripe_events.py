@@ -0,0 +1,45 @@
+import time
+
+from checkout.fulfilment import (
+    DEFAULT_BATCH_SIZE,
+    MAX_ATTEMPTS,
+    process_pending_events,
+)
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Fulfil Stripe webhook events queued by checkout.views.webhook"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Drain the queue and exit instead of polling",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS)
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            handled = process_pending_events(
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"],
+            )
+            total += handled
+            if handled:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["sleep"])
+
+        self.stdout.write(
+            self.style.SUCCESS(f"[process_stripe_events] Processed {total} events.")
+        )
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("checkout", "0001_stripe_event_queue"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="processedstripeevent",
+            name="checkout_event_queue_idx",
+        ),
+        migrations.AddField(
+            model_name="processedstripeevent",
+            name="next_attempt_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name="processedstripeevent",
+            index=models.Index(
+                fields=["status", "next_attempt_at"], name="checkout_event_due_idx"
+            ),
+        ),
+    ]
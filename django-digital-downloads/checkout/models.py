@@ -1,3 +1,44 @@
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
+
+
+# STRIPE EVENT QUEUE
+class ProcessedStripeEvent(models.Model):
+    """
+    One row per Stripe event id. The webhook only records the event;
+    `manage.py process_stripe_events` does the fulfilment. Stripe retries
+    of the same event collide on the primary key and are dropped.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    event_id = models.CharField(max_length=255, primary_key=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(
+        max_length=12,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Failed attempts push this back (checkout.fulfilment.retry_delay)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["received_at"]
+        indexes = [
+            models.Index(
+                fields=["status", "next_attempt_at"], name="checkout_event_due_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.type} {self.event_id} ({self.status})"
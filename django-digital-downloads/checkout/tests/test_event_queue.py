@@ -0,0 +1,170 @@
+from datetime import timedelta
+
+import pytest
+import stripe
+from checkout import fulfilment
+from checkout.fulfilment import process_pending_events
+from checkout.models import ProcessedStripeEvent
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from orders.models import Order, OrderItem, UserAsset
+
+
+def _event(event_id="evt_1", session_id="cs_test_1"):
+    return {
+        "id": event_id,
+        "type": "checkout.session.completed",
+        "data": {"object": {"id": session_id, "payment_intent": "pi_1"}},
+    }
+
+
+@pytest.fixture
+def pending_order(user, product, digital_asset):
+    order = Order.objects.create(
+        user=user,
+        currency="GBP",
+        subtotal_pennies=product.price_pennies,
+        total_pennies=product.price_pennies,
+        stripe_session_id="cs_test_1",
+    )
+    OrderItem.objects.create(
+        order=order, product=product, unit_price_pennies=product.price_pennies
+    )
+    return order
+
+
+@pytest.fixture
+def post_event(client, monkeypatch, settings):
+    settings.STRIPE_WEBHOOK_SECRET = "test_secret"
+
+    def post(event):
+        monkeypatch.setattr(
+            stripe.Webhook, "construct_event", staticmethod(lambda *a: event)
+        )
+        return client.post(
+            reverse("checkout:webhook"),
+            data=b"{}",
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE="sig",
+        )
+
+    return post
+
+
+@pytest.mark.django_db
+def test_webhook_only_queues_the_event(post_event, pending_order):
+    with CaptureQueriesContext(connection) as ctx:
+        resp = post_event(_event())
+    assert resp.status_code == 200
+    assert len(ctx.captured_queries) == 1  # the INSERT into the queue
+
+    pending_order.refresh_from_db()
+    assert pending_order.status == Order.Status.PENDING
+    assert ProcessedStripeEvent.objects.get().status == "pending"
+
+
+@pytest.mark.django_db
+def test_redelivered_event_is_fulfilled_once(post_event, pending_order, user):
+    for _ in range(3):
+        assert post_event(_event()).status_code == 200
+    assert ProcessedStripeEvent.objects.count() == 1
+
+    call_command("process_stripe_events", "--once")
+    # A late retry after processing is still ignored
+    post_event(_event())
+    call_command("process_stripe_events", "--once")
+
+    event = ProcessedStripeEvent.objects.get()
+    assert event.status == "done"
+    assert event.attempts == 1
+    assert UserAsset.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.django_db
+def test_event_without_id_is_rejected(post_event):
+    event = _event()
+    del event["id"]
+    assert post_event(event).status_code == 400
+    assert not ProcessedStripeEvent.objects.exists()
+
+
+@pytest.mark.django_db
+def test_unhandled_event_types_are_not_queued(post_event):
+    assert post_event({"id": "evt_x", "type": "charge.refunded"}).status_code == 200
+    assert not ProcessedStripeEvent.objects.exists()
+
+
+@pytest.mark.django_db
+def test_fulfilment_skips_existing_grants(pending_order, user, digital_asset):
+    UserAsset.objects.create(
+        user=user, product=digital_asset.product, digital_asset=digital_asset
+    )
+    ProcessedStripeEvent.objects.create(
+        event_id="evt_1", type="checkout.session.completed", payload=_event()
+    )
+    assert process_pending_events() == 1
+
+    pending_order.refresh_from_db()
+    assert pending_order.status == Order.Status.PAID
+    assert UserAsset.objects.filter(user=user).count() == 1
+
+
+# Two sessions were opened for one order and the other one was paid
+@pytest.mark.django_db
+def test_fulfilment_finds_order_by_metadata_when_session_was_replaced(
+    pending_order, user
+):
+    Order.objects.filter(pk=pending_order.pk).update(stripe_session_id="cs_test_2")
+    event = _event()
+    event["data"]["object"]["metadata"] = {"order_id": str(pending_order.id)}
+    ProcessedStripeEvent.objects.create(
+        event_id="evt_1", type="checkout.session.completed", payload=event
+    )
+    assert process_pending_events() == 1
+
+    pending_order.refresh_from_db()
+    assert pending_order.status == Order.Status.PAID
+    assert pending_order.stripe_session_id == "cs_test_1"
+    assert UserAsset.objects.filter(user=user).count() == 1
+
+
+# Failures back off instead of burning every attempt in one go
+@pytest.mark.django_db
+def test_failing_event_is_retried_then_marked_failed(monkeypatch):
+    def boom(event):
+        raise RuntimeError("stripe payload drift")
+
+    def make_due(event):
+        ProcessedStripeEvent.objects.filter(pk=event.pk).update(
+            next_attempt_at=timezone.now()
+        )
+
+    monkeypatch.setitem(fulfilment.HANDLERS, "checkout.session.completed", boom)
+    ProcessedStripeEvent.objects.create(
+        event_id="evt_1", type="checkout.session.completed", payload=_event()
+    )
+
+    before = timezone.now()
+    assert process_pending_events(max_attempts=3) == 1
+    event = ProcessedStripeEvent.objects.get()
+    assert (event.status, event.attempts) == ("pending", 1)
+    assert event.next_attempt_at >= before + timedelta(seconds=60)
+    assert process_pending_events(max_attempts=3) == 0  # still backing off
+
+    make_due(event)
+    before = timezone.now()
+    assert process_pending_events(max_attempts=3) == 1
+    event.refresh_from_db()
+    assert event.attempts == 2
+    assert event.next_attempt_at >= before + timedelta(seconds=120)
+
+    make_due(event)
+    assert process_pending_events(max_attempts=3) == 1
+    event.refresh_from_db()
+    assert (event.status, event.attempts) == ("failed", 3)
+    assert "stripe payload drift" in event.last_error
+    make_due(event)
+    assert process_pending_events(max_attempts=3) == 0
@@ -0,0 +1,118 @@
+from types import SimpleNamespace
+
+import pytest
+import stripe
+from catalog.models import Product
+from django.urls import reverse
+from orders.models import Order, OrderItem
+
+
+@pytest.fixture
+def fake_stripe(monkeypatch):
+    sessions = {}
+
+    def create(**kwargs):
+        session_id = f"cs_test_{len(sessions) + 1}"
+        session = SimpleNamespace(
+            id=session_id, url=f"https://stripe.test/{session_id}", status="open"
+        )
+        sessions[session_id] = (session, kwargs)
+        return session
+
+    def retrieve(session_id):
+        return sessions[session_id][0]
+
+    def expire(session_id):
+        sessions[session_id][0].status = "expired"
+
+    monkeypatch.setattr(stripe.checkout.Session, "create", staticmethod(create))
+    monkeypatch.setattr(stripe.checkout.Session, "retrieve", staticmethod(retrieve))
+    monkeypatch.setattr(stripe.checkout.Session, "expire", staticmethod(expire))
+    return sessions
+
+
+@pytest.fixture
+def cart_client(client, user, product):
+    other = Product.objects.create(slug="loop", title="Loop", price_pennies=250)
+    client.force_login(user)
+    client.get(reverse("cart:add", args=[product.id]) + "?qty=2")
+    client.get(reverse("cart:add", args=[other.id]))
+    return client
+
+
+# Order is created with final totals and all items in one go
+@pytest.mark.django_db
+def test_start_creates_order_with_items_atomically(
+    cart_client, fake_stripe, django_assert_max_num_queries
+):
+    with django_assert_max_num_queries(10):
+        resp = cart_client.get(reverse("checkout:start"))
+    assert resp.status_code == 302
+    assert resp["Location"] == "https://stripe.test/cs_test_1"
+
+    order = Order.objects.get()
+    assert order.subtotal_pennies == order.total_pennies == 2 * 499 + 250
+    assert order.stripe_session_id == "cs_test_1"
+    assert OrderItem.objects.filter(order=order).count() == 2
+    _, kwargs = fake_stripe["cs_test_1"]
+    assert kwargs["metadata"]["order_id"] == str(order.id)
+
+
+# Double submit of the same cart reuses the pending order and session
+@pytest.mark.django_db
+def test_start_double_submit_is_idempotent(cart_client, fake_stripe):
+    first = cart_client.get(reverse("checkout:start"))
+    second = cart_client.get(reverse("checkout:start"))
+
+    assert Order.objects.count() == 1
+    assert len(fake_stripe) == 1
+    assert first["Location"] == second["Location"]
+
+
+# A changed cart gets its own order
+@pytest.mark.django_db
+def test_start_new_order_when_cart_changes(cart_client, fake_stripe, product):
+    cart_client.get(reverse("checkout:start"))
+    cart_client.get(reverse("cart:add", args=[product.id]))
+    cart_client.get(reverse("checkout:start"))
+    assert Order.objects.count() == 2
+
+
+# If Stripe fails, the retry reuses the order instead of duplicating it
+@pytest.mark.django_db
+def test_start_retry_after_stripe_error(cart_client, fake_stripe, monkeypatch):
+    def boom(**kwargs):
+        raise stripe.APIConnectionError("down")
+
+    working = stripe.checkout.Session.create
+    monkeypatch.setattr(stripe.checkout.Session, "create", staticmethod(boom))
+    with pytest.raises(stripe.APIConnectionError):
+        cart_client.get(reverse("checkout:start"))
+    assert Order.objects.get().stripe_session_id == ""
+
+    monkeypatch.setattr(stripe.checkout.Session, "create", staticmethod(working))
+    cart_client.get(reverse("checkout:start"))
+    assert Order.objects.count() == 1
+    assert Order.objects.get().stripe_session_id == "cs_test_1"
+
+
+# Two submits race past the "no session yet" check: one session wins
+@pytest.mark.django_db
+@pytest.mark.query_budget("checkout:start", queries=11)  # + the rival's UPDATE
+def test_start_concurrent_submit_keeps_one_session(
+    cart_client, fake_stripe, monkeypatch
+):
+    create = stripe.checkout.Session.create
+
+    def racing_create(**kwargs):
+        # The other request stores its session while ours is being made
+        winner = create(**kwargs)
+        Order.objects.update(stripe_session_id=winner.id)
+        return create(**kwargs)
+
+    monkeypatch.setattr(stripe.checkout.Session, "create", staticmethod(racing_create))
+    resp = cart_client.get(reverse("checkout:start"))
+
+    assert resp["Location"] == "https://stripe.test/cs_test_1"
+    assert Order.objects.get().stripe_session_id == "cs_test_1"
+    assert fake_stripe["cs_test_2"][0].status == "expired"
@@ -1,6 +1,7 @@
 import json
 
 import pytest
+from django.core.management import call_command
 from django.test.utils import override_settings
 from django.urls import reverse
 from orders.models import Order, OrderItem, UserAsset
@@ -33,6 +34,7 @@ def test_webhook_marks_order_paid_and_grants_assets(
 
     def fake_construct_event(payload, sig, secret):
         return {
+            "id": "evt_123",
             "type": "checkout.session.completed",
             "data": {"object": {"id": "cs_test_123", "payment_intent": "pi_123"}},
         }
@@ -50,6 +52,9 @@ def test_webhook_marks_order_paid_and_grants_assets(
     )
     assert resp.status_code == 200
 
+    # Fulfilment happens in the queue worker, not the request
+    call_command("process_stripe_events", "--once")
+
     order.refresh_from_db()
     assert order.status == "paid"
     assert order.stripe_payment_intent == "pi_123"
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from hashlib import sha256
+
+from cart.pricing import PricedCart
+from django.db import IntegrityError, transaction
+from orders.models import Order, OrderItem
+
+__all__ = ["cart_idempotency_key", "get_or_create_pending_order"]
+
+
+def cart_idempotency_key(user_id, priced: PricedCart, currency: str) -> str:
+    """Stable hash of who is buying what, at which prices."""
+    parts = [str(user_id), currency.upper()]
+    parts += sorted(f"{ln.id}:{ln.qty}:{ln.unit_price}" for ln in priced.lines)
+    return sha256("|".join(parts).encode()).hexdigest()
+
+
+def get_or_create_pending_order(user, priced: PricedCart, currency: str) -> Order:
+    """
+    Return the pending Order for this exact cart, creating it (with final
+    totals and all items) in one transaction if it does not exist yet.
+    """
+    key = cart_idempotency_key(user.pk, priced, currency)
+    lookup = {"user": user, "status": Order.Status.PENDING, "idempotency_key": key}
+
+    order = Order.objects.filter(**lookup).first()
+    if order is not None:
+        return order
+
+    try:
+        with transaction.atomic():
+            order = Order.objects.create(
+                **lookup,
+                currency=currency,
+                subtotal_pennies=priced.subtotal,
+                total_pennies=priced.subtotal,
+            )
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(
+                        order=order,
+                        product_id=line.id,
+                        quantity=line.qty,
+                        unit_price_pennies=line.unit_price,
+                    )
+                    for line in priced.lines
+                ]
+            )
+    except IntegrityError:
+        # A concurrent double submit won the race
+        order = Order.objects.filter(**lookup).first()
+        if order is None:
+            raise
+    return order
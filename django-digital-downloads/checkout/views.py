@@ -1,15 +1,20 @@
-from typing import Any, Dict
+import json
+from typing import Any
 
 import stripe
-from cart.utils import get_cart
-from catalog.models import Product
+from cart.pricing import get_priced_cart
+from core.timing import phase
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
-from orders.models import DigitalAsset, Order, OrderItem, UserAsset
+from orders.models import Order
+
+from .fulfilment import HANDLERS
+from .models import ProcessedStripeEvent
+from .utils import get_or_create_pending_order
 
 # Stripe config
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -32,68 +37,82 @@ def start(request):
     Stripe Checkout Session.
     Redirect user to Stripe-hosted checkout.
     """
-    cart: Dict[str, int] = get_cart(request) or {}
-    if not cart:
+    priced = get_priced_cart(request)
+    if not priced.lines:
         return redirect("cart:view")
 
-    products = Product.objects.filter(id__in=cart.keys(), active=True)
-    if not products:
-        return redirect("cart:view")
+    # Order + items are written atomically; a double submit of the same
+    # cart gets the same pending order back
+    order = get_or_create_pending_order(request.user, priced, settings.STRIPE_CURRENCY)
+
+    session = _open_session(order)
+    if session is None:
+        session = _create_session(request, order, priced)
+        # Compare-and-set: a concurrent submit of the same cart may have
+        # stored its session first. Use that one and expire ours, so the
+        # order only ever has one payable session.
+        claimed = Order.objects.filter(
+            pk=order.pk, stripe_session_id=order.stripe_session_id
+        ).update(stripe_session_id=session.id)
+        if not claimed:
+            _expire_session(session.id)
+            order.refresh_from_db(fields=["stripe_session_id"])
+            session = _open_session(order)
+            if session is None:
+                return redirect("checkout:start")
 
-    order = Order.objects.create(
-        user=request.user,
-        status="pending",
-        currency=settings.STRIPE_CURRENCY,
-        subtotal_pennies=0,
-        total_pennies=0,
-    )
-
-    line_items: list[dict[str, Any]] = []
-    subtotal = 0
-
-    for p in products:
-        qty = int(cart.get(str(p.id), 1))
-        unit_pp = int(p.price_pennies)
-        line_total = unit_pp * qty
-        subtotal += line_total
-
-        OrderItem.objects.create(
-            order=order, product=p, quantity=qty, unit_price_pennies=unit_pp
-        )
+    return redirect(session.url)
 
-        line_items.append(
-            {
-                "quantity": qty,
-                "price_data": {
-                    "currency": settings.STRIPE_CURRENCY.lower(),
-                    "unit_amount": unit_pp,
-                    "product_data": {
-                        "name": p.title,
-                        "metadata": {"product_id": str(p.id), "slug": p.slug},
-                    },
-                },
-            }
-        )
 
-    order.subtotal_pennies = subtotal
-    order.total_pennies = subtotal
-    order.save(update_fields=["subtotal_pennies", "total_pennies"])
+def _expire_session(session_id: str) -> None:
+    try:
+        with phase("stripe"):
+            stripe.checkout.Session.expire(session_id)
+    except stripe.StripeError:
+        pass  # unpaid sessions lapse on their own after 24 hours
 
-    success_url = settings.SITE_BASE_URL + reverse("checkout:success")
-    cancel_url = settings.SITE_BASE_URL + reverse("checkout:cancel")
 
-    session = stripe.checkout.Session.create(  # type: ignore[arg-type]
-        mode="payment",
-        line_items=line_items,
-        success_url=success_url + "?session_id={CHECKOUT_SESSION_ID}",
-        cancel_url=cancel_url,
-        metadata={"order_id": str(order.id), "user_id": str(request.user.id)},
-    )
+def _open_session(order):
+    """The order's existing Stripe session, if it can still be paid."""
+    if not order.stripe_session_id:
+        return None
+    try:
+        with phase("stripe"):
+            session = stripe.checkout.Session.retrieve(order.stripe_session_id)
+    except stripe.StripeError:
+        return None
+    if getattr(session, "status", None) == "open" and getattr(session, "url", None):
+        return session
+    return None
+
+
+def _create_session(request, order, priced):
+    line_items: list[dict[str, Any]] = [
+        {
+            "quantity": line.qty,
+            "price_data": {
+                "currency": order.currency.lower(),
+                "unit_amount": line.unit_price,
+                "product_data": {
+                    "name": line.title,
+                    "metadata": {"product_id": line.id, "slug": line.slug},
+                },
+            },
+        }
+        for line in priced.lines
+    ]
 
-    order.stripe_session_id = session.id
-    order.save(update_fields=["stripe_session_id"])
+    success_url = settings.SITE_BASE_URL + reverse("checkout:success")
+    cancel_url = settings.SITE_BASE_URL + reverse("checkout:cancel")
 
-    return redirect(session.url)
+    with phase("stripe"):
+        return stripe.checkout.Session.create(  # type: ignore[arg-type]
+            mode="payment",
+            line_items=line_items,
+            success_url=success_url + "?session_id={CHECKOUT_SESSION_ID}",
+            cancel_url=cancel_url,
+            metadata={"order_id": str(order.id), "user_id": str(request.user.id)},
+        )
 
 
 @login_required
@@ -109,8 +128,9 @@ def cancel(request):
 @csrf_exempt
 def webhook(request):
     """
-    Stripe webhook: verify signature; on checkout.session.completed,
-    mark order paid and grant UserAsset(s).
+    Stripe webhook: verify the signature and queue the event.
+    Fulfilment runs in `manage.py process_stripe_events`, so this stays
+    fast; redelivered events are dropped on their id.
     """
     payload = request.body
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE", "")
@@ -119,33 +139,31 @@ def webhook(request):
         return HttpResponse(status=400)
 
     try:
-        event = stripe.Webhook.construct_event(payload, sig_header, endpoint_secret)
+        with phase("webhook_verify"):
+            event = stripe.Webhook.construct_event(payload, sig_header, endpoint_secret)
     except ValueError:
         return HttpResponse(status=400)
     except SignatureVerificationError:
         return HttpResponse(status=400)
 
-    if event.get("type") == "checkout.session.completed":
-        session = event.get("data", {}).get("object", {}) or {}
-        session_id = session.get("id")
-        payment_intent = session.get("payment_intent", "")
-
-        try:
-            order = Order.objects.get(stripe_session_id=session_id)
-        except Order.DoesNotExist:
-            return HttpResponse(status=200)
-
-        if order.status != "paid":
-            order.status = "paid"
-            order.stripe_payment_intent = payment_intent or ""
-            order.save(update_fields=["status", "stripe_payment_intent"])
-
-            items = OrderItem.objects.filter(order=order).select_related("product")
-            assets = DigitalAsset.objects.filter(product__in=[i.product for i in items])
+    event = _event_to_dict(event)
+    event_id = event.get("id")
+    if not event_id:
+        return HttpResponse(status=400)
 
-            for asset in assets:
-                UserAsset.objects.get_or_create(
-                    user=order.user, product=asset.product, digital_asset=asset
+    if event.get("type") in HANDLERS:
+        ProcessedStripeEvent.objects.bulk_create(
+            [
+                ProcessedStripeEvent(
+                    event_id=event_id, type=event["type"], payload=event
                 )
+            ],
+            ignore_conflicts=True,
+        )
 
     return HttpResponse(status=200)
+
+
+def _event_to_dict(event) -> dict:
+    """stripe.Event (a dict subclass) as plain JSON-serialisable data."""
+    return json.loads(json.dumps(event))
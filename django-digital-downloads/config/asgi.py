@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_asgi_application()
+
+# Only serving processes get here (not manage.py commands or the tests)
+from catalog.suggest import warm_up  # noqa: E402
+
+warm_up()
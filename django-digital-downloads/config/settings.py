@@ -64,9 +64,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.timing.ServerTimingMiddleware",
+    "core.query_budget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "cart.middleware.CartMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -84,13 +87,16 @@ if not DEBUG:
     SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
     SESSION_COOKIE_SECURE = True
     SECURE_SSL_REDIRECT = True
+    # Probes talk plain HTTP to the container
+    SECURE_REDIRECT_EXEMPT = [r"^healthz$", r"^readyz$"]
     CSRF_COOKIE_SECURE = True
 
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.timing.TimedDjangoTemplates",
+        "NAME": "django",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -178,6 +184,19 @@ STORAGES = {
     },
 }
 
+# Non-public files served by orders.download_asset
+PROTECTED_MEDIA_ROOT = Path(
+    os.getenv("PROTECTED_MEDIA_ROOT", BASE_DIR / "protected_media")
+)
+
+# Download delivery: "stream" (in-process), "nginx" (X-Accel-Redirect)
+# or "sendfile" (X-Sendfile). Proxy modes need an internal location that
+# maps DOWNLOAD_ACCEL_PREFIX onto PROTECTED_MEDIA_ROOT.
+DOWNLOAD_DELIVERY = os.getenv("DOWNLOAD_DELIVERY", "stream")
+DOWNLOAD_ACCEL_PREFIX = os.getenv("DOWNLOAD_ACCEL_PREFIX", "/protected/")
+# Lifetime (seconds) of signed download links minted on the purchases page
+DOWNLOAD_URL_TTL = int(os.getenv("DOWNLOAD_URL_TTL", "900"))
+
 # Stripe settings/reads from environment variables
 STRIPE_PUBLIC_KEY = os.getenv("STRIPE_PUBLIC_KEY", "")
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
@@ -185,6 +204,90 @@ STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
 STRIPE_CURRENCY = os.getenv("STRIPE_CURRENCY", "GBP")
 SITE_BASE_URL = os.getenv("SITE_BASE_URL", "http://127.0.0.1:8000")
 
+# Caches. Set REDIS_URL (or CACHE_URL) to a redis:// URL in production:
+# carts, catalog page versions and /metrics counters live in the cache and
+# every worker process must see the same ones. Without it each process
+# gets its own local-memory cache.
+CACHE_URL = os.getenv("CACHE_URL") or os.getenv("REDIS_URL", "")
+SHARED_CACHE = bool(CACHE_URL)
+if SHARED_CACHE:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Catalog listing
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "24"))
+CATALOG_COUNT_CACHE_SECONDS = int(os.getenv("CATALOG_COUNT_CACHE_SECONDS", "300"))
+CATALOG_PAGE_CACHE_SECONDS = int(os.getenv("CATALOG_PAGE_CACHE_SECONDS", "600"))
+
+# Order history page (keyset-paginated)
+ORDER_HISTORY_PAGE_SIZE = int(os.getenv("ORDER_HISTORY_PAGE_SIZE", "20"))
+
+# Purchases page (orders.library read model, keyset-paginated)
+PURCHASES_PAGE_SIZE = int(os.getenv("PURCHASES_PAGE_SIZE", "50"))
+
+# Type-ahead index (catalog.suggest), held in memory by each process
+SUGGEST_MAX_PRODUCTS = int(os.getenv("SUGGEST_MAX_PRODUCTS", "100000"))
+SUGGEST_REFRESH_SECONDS = int(os.getenv("SUGGEST_REFRESH_SECONDS", "300"))
+
+# Carts (cart.utils): with a shared cache, kept in the CART_CACHE cache under
+# a signed cookie and copied to CartSnapshot rows behind the request
+# ("async"), inline ("sync") or not at all ("off"). Otherwise they stay in
+# the session ("cart.utils.SessionCartStore"): a per-process cache would
+# give each worker its own carts.
+CART_STORE = os.getenv(
+    "CART_STORE",
+    "cart.utils.CacheCartStore" if SHARED_CACHE else "cart.utils.SessionCartStore",
+)
+CART_CACHE = os.getenv("CART_CACHE", "default")
+CART_SECONDS = int(os.getenv("CART_SECONDS", str(60 * 60 * 24 * 30)))
+CART_WRITE_THROUGH = os.getenv("CART_WRITE_THROUGH", "async")
+
+# SQL budgets per URL name (core.query_budget). Counts include the session
+# and user lookups; time budgets are only checked with QUERY_BUDGET_CHECK_TIME=True
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "warn" if DEBUG else "off")
+QUERY_BUDGET_CHECK_TIME = os.getenv("QUERY_BUDGET_CHECK_TIME", "False") == "True"
+QUERY_BUDGETS = {
+    "catalog:list": {"queries": 4, "time_ms": 50},
+    "catalog:detail": {"queries": 6, "time_ms": 50},
+    "catalog:search": {"queries": 3, "time_ms": 50},
+    "catalog:api_products": {"queries": 3, "time_ms": 50},
+    "catalog:api_search": {"queries": 3, "time_ms": 50},
+    "catalog:api_suggest": {"queries": 2, "time_ms": 20},
+    "cart:view": {"queries": 5, "time_ms": 50},
+    "cart:add": {"queries": 5, "time_ms": 50},
+    "cart:update": {"queries": 5, "time_ms": 50},
+    "cart:remove": {"queries": 5, "time_ms": 50},
+    "cart:remove_json": {"queries": 5, "time_ms": 50},
+    "cart:api_batch": {"queries": 5, "time_ms": 50},
+    "checkout:start": {"queries": 10, "time_ms": 100},
+    "checkout:webhook": {"queries": 2, "time_ms": 20},
+    "orders:history": {"queries": 4, "time_ms": 50},
+    "orders:history_api": {"queries": 4, "time_ms": 50},
+    "orders:detail": {"queries": 4, "time_ms": 50},
+    "orders:downloads": {"queries": 4, "time_ms": 50},
+    "orders:download": {"queries": 3, "time_ms": 20},
+    "orders:signed_download": {"queries": 1, "time_ms": 20},
+    "orders:download_library_zip": {"queries": 3, "time_ms": 20},
+    "orders:download_order_zip": {"queries": 3, "time_ms": 20},
+    "reviews:add": {"queries": 13, "time_ms": 100},
+    "core:healthz": {"queries": 0},
+    "core:readyz": {"queries": 1, "time_ms": 20},
+    "catalog:health": {"queries": 1, "time_ms": 50},
+    "catalog:health_slugs": {"queries": 3, "time_ms": 50},
+}
+
+# Per-request phase timings (core.timing) and /metrics. The header is cheap
+# enough to leave on. /metrics answers 404 until METRICS_TOKEN is set (then
+# it requires "Authorization: Bearer <token>"), unless DEBUG is on
+SERVER_TIMING = os.getenv("SERVER_TIMING", "True") == "True"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
 LOGOUT_REDIRECT_URL = "core:home"
 LOGIN_URL = "/login/"
 LOGIN_REDIRECT_URL = "/"
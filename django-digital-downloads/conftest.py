@@ -1,8 +1,32 @@
 import pytest
 from catalog.models import Product
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from orders.models import DigitalAsset, UserAsset
 
+# Requests over their QUERY_BUDGETS entry fail the test
+pytest_plugins = ["core.pytest_query_budget"]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+# Tests run in one process, so LocMemCache is as good as a shared cache
+@pytest.fixture(autouse=True)
+def shared_cache(settings):
+    settings.SHARED_CACHE = True
+    settings.CART_STORE = "cart.utils.CacheCartStore"
+
+
+# The background cart snapshot writer can't see a test's transaction
+@pytest.fixture(autouse=True)
+def cart_snapshots_inline(settings):
+    settings.CART_WRITE_THROUGH = "sync"
+
 
 @pytest.fixture
 def user(db):
@@ -38,3 +62,12 @@ def owned_asset(db, user, product, digital_asset):
         product=product,
         digital_asset=digital_asset,
     )
+
+
+@pytest.fixture
+def protected_media(tmp_path, settings, digital_asset):
+    root = tmp_path / "protected_media"
+    (root / "samples").mkdir(parents=True)
+    (root / digital_asset.file_path).write_bytes(b"hello")
+    settings.PROTECTED_MEDIA_ROOT = root
+    return root
@@ -0,0 +1,63 @@
+"""
+Conditional GET for HTML pages.
+
+`conditional_page` wraps Django's `condition` decorator: the validator
+functions run before the view, and a matching If-None-Match /
+If-Modified-Since returns 304 without rendering. Responses (including
+304s) are marked `no-cache`, so browsers and the CDN revalidate every
+time instead of guessing a freshness lifetime, and `private` for
+signed-in users.
+
+Pages carry the navbar, which differs per viewer, so every ETag includes
+`viewer(request)`. Signed-in pages also embed `{% csrf_token %}`, and
+logging in rotates the CSRF secret, so for them the viewer includes the
+secret: a cached page with a stale token is never revalidated.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from functools import wraps
+from typing import Callable, Optional
+
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+__all__ = ["conditional_page", "make_etag", "viewer"]
+
+
+def viewer(request) -> str:
+    user = getattr(request, "user", None)
+    if user is None or not user.is_authenticated:
+        return "anon"
+    get_token(request)  # mints the secret (and its cookie) if there is none yet
+    return f"u{user.pk}:{request.META['CSRF_COOKIE']}"
+
+
+def make_etag(*parts) -> str:
+    """Short strong ETag from the parts that decide a page's content."""
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return hashlib.md5(raw.encode()).hexdigest()[:20]
+
+
+def conditional_page(
+    etag_func: Optional[Callable] = None,
+    last_modified_func: Optional[Callable] = None,
+):
+    def decorator(view):
+        conditional_view = condition(etag_func, last_modified_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            patch_vary_headers(response, ["Cookie"])
+            return response
+
+        return wrapper
+
+    return decorator
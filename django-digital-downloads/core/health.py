@@ -0,0 +1,44 @@
+"""
+Readiness checks for /readyz.
+
+Each check is cheap and constant-time whatever the data size: a trivial
+query and a permission check on PROTECTED_MEDIA_ROOT. A check returns
+None when healthy, or a short reason.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+
+
+def check_database() -> Optional[str]:
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+    except DatabaseError as exc:
+        return f"unreachable: {exc.__class__.__name__}"
+    return None
+
+
+def check_protected_media() -> Optional[str]:
+    root = settings.PROTECTED_MEDIA_ROOT
+    if not os.path.isdir(root):
+        return "missing"
+    if not os.access(root, os.R_OK | os.X_OK):
+        return "not readable"
+    return None
+
+
+CHECKS: Dict[str, Callable[[], Optional[str]]] = {
+    "database": check_database,
+    "protected_media": check_protected_media,
+}
+
+
+def run_checks() -> Dict[str, str]:
+    return {name: check() or "ok" for name, check in CHECKS.items()}
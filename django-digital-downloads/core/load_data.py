@@ -0,0 +1,435 @@
+"""
+Synthetic load-test data used by `manage.py seed_load_data`.
+
+    users (main process, one shared password hash)
+      -> products, assets, orders (+ items, grants), reviews, notes:
+         rows generated in fixed-size chunks across a process pool
+      -> batched bulk_create per chunk, one transaction each
+      -> review aggregates recomputed, purchase libraries built, catalog
+         caches retired
+
+Every chunk has its own random stream seeded from (seed, table, chunk), and
+primary keys are derived from the same seed, so a given seed and set of
+counts always produces the same dataset whatever the worker count or
+insert batch size. Rows reference each other by index, so no chunk needs
+to read back what another one wrote.
+
+Generated assets point at files that do not exist; the data is for
+exercising queries, not downloads.
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from hashlib import blake2b
+from typing import Callable, Dict, Iterator, List, Optional
+
+from catalog.cache import bump_all
+from catalog.models import DigitalAsset, Product, UserNote
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from orders.library import rebuild_library
+from orders.models import Order, OrderItem, UserAsset
+from reviews.models import Review
+from reviews.utils import recompute_stats
+
+PREFIX = "load-"
+PASSWORD = "load-test"
+# Rows generated per task. Fixed, so the data does not depend on batch size
+CHUNK = 5_000
+DEFAULT_BATCH_SIZE = 2_000
+START = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+SPAN_SECONDS = 365 * 24 * 3600
+
+WORDS = (
+    "ambient midnight drive neon rain piano echo city loop quiet light summer "
+    "dust river glass velvet static ocean ember signal north lunar drift hollow "
+    "golden paper tide winter fever motion silver bloom circuit harbor canyon"
+).split()
+STATUSES = (
+    (Order.Status.PAID, 85),
+    (Order.Status.PENDING, 8),
+    (Order.Status.FAILED, 4),
+    (Order.Status.CANCELED, 3),
+)
+RATING_WEIGHTS = (5, 8, 17, 35, 35)  # 1..5 stars
+
+
+@dataclass(frozen=True)
+class LoadSpec:
+    products: int = 10_000
+    assets: int = 10_000  # spread round-robin over products
+    users: int = 1_000
+    orders: int = 10_000
+    max_items: int = 3
+    reviews: int = 10_000
+    notes: int = 1_000
+    seed: int = 1
+
+
+@dataclass
+class SeedStats:
+    rows: Dict[str, int] = field(default_factory=dict)
+    seconds: Dict[str, float] = field(default_factory=dict)
+
+
+# Deterministic values
+def _uuid(seed: int, *parts) -> uuid.UUID:
+    digest = blake2b(repr((seed,) + parts).encode(), digest_size=16).digest()
+    return uuid.UUID(bytes=digest, version=4)
+
+
+def _rng(spec: LoadSpec, table: str, start: int) -> random.Random:
+    return random.Random(f"{spec.seed}:{table}:{start}")
+
+
+def _price(spec: LoadSpec, product: int) -> int:
+    digest = blake2b(f"{spec.seed}:price:{product}".encode(), digest_size=4)
+    return 99 + 100 * (int.from_bytes(digest.digest(), "big") % 20)
+
+
+def _when(rng: random.Random) -> datetime:
+    return START + timedelta(seconds=rng.randrange(SPAN_SECONDS))
+
+
+def _words(rng: random.Random, lo: int, hi: int) -> str:
+    return " ".join(rng.choices(WORDS, k=rng.randint(lo, hi)))
+
+
+def _popular(rng: random.Random, count: int) -> int:
+    # Skewed towards low indices, so some products sell far more than others
+    return int(count * rng.random() ** 2)
+
+
+# Row generators (run in worker processes; plain tuples only)
+def _product_rows(spec: LoadSpec, start: int, stop: int) -> list:
+    rng = _rng(spec, "products", start)
+    return [
+        (
+            i,
+            _words(rng, 2, 4).title(),
+            _words(rng, 8, 24).capitalize() + ".",
+            _price(spec, i),
+            rng.random() < 0.97,
+            _when(rng),
+        )
+        for i in range(start, stop)
+    ]
+
+
+def _asset_rows(spec: LoadSpec, start: int, stop: int) -> list:
+    rng = _rng(spec, "assets", start)
+    return [(k, rng.randrange(2_000_000, 12_000_000)) for k in range(start, stop)]
+
+
+def _order_rows(spec: LoadSpec, start: int, stop: int) -> list:
+    """[(order, [items], [grants])] with products and users as indices."""
+    rng = _rng(spec, "orders", start)
+    statuses, weights = zip(*STATUSES)
+    rows = []
+    for i in range(start, stop):
+        user = rng.randrange(spec.users)
+        status = rng.choices(statuses, weights)[0]
+        created = _when(rng)
+        wanted = min(rng.randint(1, spec.max_items), spec.products)
+        products = set()
+        while len(products) < wanted:
+            products.add(_popular(rng, spec.products))
+        items = [(j, p, _price(spec, p)) for j, p in enumerate(sorted(products))]
+        grants = []
+        if status == Order.Status.PAID:
+            granted = created + timedelta(seconds=rng.randint(5, 120))
+            grants = [
+                (p, k, granted)
+                for _, p, _ in items
+                for k in range(p, spec.assets, spec.products)
+            ]
+        subtotal = sum(price for _, _, price in items)
+        rows.append((i, user, status, subtotal, created, items, grants))
+    return rows
+
+
+def _review_rows(spec: LoadSpec, start: int, stop: int) -> list:
+    rng = _rng(spec, "reviews", start)
+    stars = range(1, 6)
+    return [
+        (
+            _popular(rng, spec.products),
+            rng.randrange(spec.users),
+            rng.choices(stars, RATING_WEIGHTS)[0],
+            _words(rng, 0, 30).capitalize(),
+            _when(rng),
+        )
+        for _ in range(start, stop)
+    ]
+
+
+def _note_rows(spec: LoadSpec, start: int, stop: int) -> list:
+    rng = _rng(spec, "notes", start)
+    return [
+        (
+            n,
+            rng.randrange(spec.products),
+            rng.randrange(spec.users),
+            _words(rng, 1, 4).capitalize(),
+            _words(rng, 10, 60).capitalize(),
+            _when(rng),
+        )
+        for n in range(start, stop)
+    ]
+
+
+def _generate(task: tuple) -> list:
+    generator, spec, start, stop = task
+    return generator(spec, start, stop)
+
+
+# Process pool
+def _chunks(total: int) -> Iterator[tuple[int, int]]:
+    for start in range(0, total, CHUNK):
+        yield start, min(total, start + CHUNK)
+
+
+def _generated(
+    pool: Optional[ProcessPoolExecutor],
+    workers: int,
+    generator: Callable,
+    spec: LoadSpec,
+    total: int,
+) -> Iterator[list]:
+    """Chunks of rows in order, with a bounded number generated ahead."""
+    tasks = ((generator, spec, start, stop) for start, stop in _chunks(total))
+    if pool is None:
+        yield from map(_generate, tasks)
+        return
+    ahead = deque()
+    for task in tasks:
+        ahead.append(pool.submit(_generate, task))
+        if len(ahead) > workers * 2:
+            yield ahead.popleft().result()
+    while ahead:
+        yield ahead.popleft().result()
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Let bulk_create keep the generated created_at / updated_at values."""
+    saved = []
+    for model in models:
+        for f in model._meta.concrete_fields:
+            if getattr(f, "auto_now", False) or getattr(f, "auto_now_add", False):
+                saved.append((f, f.auto_now, f.auto_now_add))
+                f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+# Database writes
+def already_seeded() -> bool:
+    return Product.objects.filter(slug=f"{PREFIX}0").exists()
+
+
+def _create_users(spec: LoadSpec, batch_size: int) -> List[int]:
+    User = get_user_model()
+    password = make_password(PASSWORD)  # hashing once per user would take hours
+    users = [
+        User(
+            username=f"{PREFIX}{i}",
+            email=f"{PREFIX}{i}@example.com",
+            password=password,
+            date_joined=START,
+        )
+        for i in range(spec.users)
+    ]
+    User.objects.bulk_create(users, batch_size=batch_size)
+    ids = dict(
+        User.objects.filter(username__startswith=PREFIX).values_list("username", "id")
+    )
+    return [ids[f"{PREFIX}{i}"] for i in range(spec.users)]
+
+
+def seed(
+    spec: LoadSpec,
+    *,
+    workers: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    progress: Optional[Callable[[str, int, float], None]] = None,
+) -> SeedStats:
+    """
+    Write the dataset described by `spec`. Generation fans out over
+    `workers` processes (default: one per CPU); inserts stay in this one.
+    """
+    stats = SeedStats()
+    seed_ = spec.seed
+    workers = workers or os.cpu_count() or 1
+    user_ids: List[int] = []
+    product_ids = [_uuid(seed_, "product", i) for i in range(spec.products)]
+    asset_ids = [_uuid(seed_, "asset", k) for k in range(spec.assets)]
+
+    def timed(table: str, write: Callable[[], int]) -> None:
+        began = time.perf_counter()
+        stats.rows[table] = write()
+        stats.seconds[table] = time.perf_counter() - began
+        if progress:
+            progress(table, stats.rows[table], stats.seconds[table])
+
+    def insert(model, objs, **kwargs) -> int:
+        model.objects.bulk_create(objs, batch_size=batch_size, **kwargs)
+        return len(objs)
+
+    def products(rows):
+        return insert(
+            Product,
+            [
+                Product(
+                    id=product_ids[i],
+                    slug=f"{PREFIX}{i}",
+                    title=title,
+                    description=description,
+                    price_pennies=price,
+                    active=active,
+                    created_at=created,
+                    updated_at=created,
+                )
+                for i, title, description, price, active, created in rows
+            ],
+        )
+
+    def assets(rows):
+        return insert(
+            DigitalAsset,
+            [
+                DigitalAsset(
+                    id=asset_ids[k],
+                    product_id=product_ids[k % spec.products],
+                    file_path=f"products/{PREFIX}{k}.mp3",
+                    file_name=f"{PREFIX}{k}.mp3",
+                    sha256=blake2b(asset_ids[k].bytes, digest_size=32).hexdigest(),
+                    size_bytes=size,
+                )
+                for k, size in rows
+            ],
+        )
+
+    def orders(rows):
+        orders, items, grants = [], [], []
+        for i, user, status, subtotal, created, lines, granted in rows:
+            order_id = _uuid(seed_, "order", i)
+            orders.append(
+                Order(
+                    id=order_id,
+                    user_id=user_ids[user],
+                    status=status,
+                    subtotal_pennies=subtotal,
+                    total_pennies=subtotal,
+                    stripe_session_id=f"cs_{PREFIX}{seed_}_{i}",
+                    created_at=created,
+                )
+            )
+            items.extend(
+                OrderItem(
+                    id=_uuid(seed_, "item", i, j),
+                    order_id=order_id,
+                    product_id=product_ids[p],
+                    unit_price_pennies=price,
+                )
+                for j, p, price in lines
+            )
+            grants.extend(
+                UserAsset(
+                    id=_uuid(seed_, "grant", i, k),
+                    user_id=user_ids[user],
+                    product_id=product_ids[p],
+                    digital_asset_id=asset_ids[k],
+                    granted_at=at,
+                )
+                for p, k, at in granted
+            )
+        insert(Order, orders)
+        insert(OrderItem, items)
+        # Repeat purchases of a product grant nothing new
+        insert(UserAsset, grants, ignore_conflicts=True)
+        stats.rows["order items"] = stats.rows.get("order items", 0) + len(items)
+        return len(orders)
+
+    def reviews(rows):
+        return insert(
+            Review,
+            [
+                Review(
+                    product_id=product_ids[p],
+                    user_id=user_ids[u],
+                    rating=rating,
+                    comment=comment,
+                    created_at=created,
+                )
+                for p, u, rating, comment, created in rows
+            ],
+            ignore_conflicts=True,  # one review per user and product
+        )
+
+    def notes(rows):
+        return insert(
+            UserNote,
+            [
+                UserNote(
+                    id=_uuid(seed_, "note", n),
+                    product_id=product_ids[p],
+                    user_id=user_ids[u],
+                    title=title,
+                    body=body,
+                    created_at=created,
+                    updated_at=created,
+                )
+                for n, p, u, title, body, created in rows
+            ],
+        )
+
+    tables = [
+        ("products", _product_rows, spec.products, products),
+        ("assets", _asset_rows, spec.assets, assets),
+        ("orders", _order_rows, spec.orders, orders),
+        ("reviews", _review_rows, spec.reviews, reviews),
+        ("notes", _note_rows, spec.notes, notes),
+    ]
+
+    def users() -> int:
+        user_ids.extend(_create_users(spec, batch_size))
+        return len(user_ids)
+
+    timed("users", users)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        with _explicit_timestamps(Product, Order, UserAsset, Review, UserNote):
+            for table, generator, total, write in tables:
+
+                def write_all(generator=generator, total=total, write=write) -> int:
+                    written = 0
+                    for rows in _generated(pool, workers, generator, spec, total):
+                        with transaction.atomic():
+                            written += write(rows)
+                    return written
+
+                timed(table, write_all)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    # Bulk inserts skip the model signals
+    timed("review stats", lambda: recompute_stats(batch_size=batch_size))
+    timed("library", lambda: rebuild_library(batch_size=batch_size))
+    bump_all()
+    return stats
@@ -0,0 +1,82 @@
+from core.load_data import DEFAULT_BATCH_SIZE, LoadSpec, already_seeded, seed
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULTS = LoadSpec()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic dataset for load tests: products, "
+        "assets, users, orders with items and grants, reviews and notes."
+    )
+
+    def add_arguments(self, parser):
+        for name in ("products", "assets", "users", "orders", "reviews", "notes"):
+            parser.add_argument(
+                f"--{name}",
+                type=int,
+                default=getattr(DEFAULTS, name),
+                help=f"Number of {name} (default: %(default)s).",
+            )
+        parser.add_argument(
+            "--max-items",
+            type=int,
+            default=DEFAULTS.max_items,
+            help="Most products in one order.",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=DEFAULTS.seed,
+            help="Same seed and counts, same data.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Generator processes (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Rows per bulk insert.",
+        )
+
+    def handle(self, *args, **options):
+        spec = LoadSpec(
+            products=options["products"],
+            assets=options["assets"],
+            users=options["users"],
+            orders=options["orders"],
+            max_items=options["max_items"],
+            reviews=options["reviews"],
+            notes=options["notes"],
+            seed=options["seed"],
+        )
+        if min(spec.products, spec.users, spec.max_items) < 1:
+            raise CommandError("--products, --users and --max-items must be >= 1.")
+        if already_seeded():
+            raise CommandError(
+                "This database already holds load data; seed an empty database."
+            )
+
+        def progress(table, rows, seconds):
+            rate = rows / seconds if seconds else 0
+            self.stdout.write(
+                f"  {table:<13}{rows:>10} rows {seconds:>8.1f}s " f"{rate:>10.0f}/s"
+            )
+
+        stats = seed(
+            spec,
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            progress=progress,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"[seed_load_data] Seeded {stats.rows['orders']} orders in "
+                f"{sum(stats.seconds.values()):.1f}s (seed {spec.seed}); users "
+                f"log in as load-<n> with password 'load-test'."
+            )
+        )
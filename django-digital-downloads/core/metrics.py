@@ -0,0 +1,180 @@
+"""
+Process metrics in Prometheus text format, served at /metrics.
+
+Each process keeps its own histograms and counters and publishes a
+snapshot to the cache at most every PUBLISH_SECONDS, under a slot it takes
+once from a cache counter. /metrics merges the live snapshots it can see.
+With a shared cache (settings.SHARED_CACHE) that is every worker, and a
+worker that exits drops out when its snapshot expires. With a per-process
+cache a scrape reports only the worker that served it. Values are cumulative
+(rate() over them gives rolling windows), and recording one is a dict update
+under a lock.
+
+Other apps add their own lines with `register(collector)`.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from django.core.cache import cache
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PUBLISH_SECONDS = 10
+SNAPSHOT_TTL = 300
+# Slots only grow (one per process start); older ones have long expired
+MAX_SLOTS = 256
+SLOTS_KEY = "metrics:slots"
+SNAPSHOT_KEY = "metrics:snapshot:{}"
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+HELP = {
+    "http_request_duration_seconds": ("histogram", "Request latency by endpoint."),
+    "http_request_phase_seconds": (
+        "histogram",
+        "Time per request phase (db, template, stripe, webhook_verify, "
+        "file_open, stream).",
+    ),
+    "http_responses_total": ("counter", "Responses by endpoint and status."),
+    "db_queries_total": ("counter", "SQL queries run by endpoint."),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._owner = uuid.uuid4().hex
+        # (name, labels) -> [count per bucket ..., count above, sum]
+        self._histograms: Dict[Tuple[str, Labels], list] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._slot = None
+        self._published = time.monotonic()
+
+    def _check_fork(self) -> None:
+        # A forked worker must not re-publish what its parent recorded
+        if os.getpid() != self._pid:
+            self._reset()
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._check_fork()
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+            h[bisect_left(BUCKETS, seconds)] += 1
+            h[-1] += seconds
+        self._maybe_publish()
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._check_fork()
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._check_fork()
+            return {
+                "owner": self._owner,
+                "histograms": {k: list(v) for k, v in self._histograms.items()},
+                "counters": dict(self._counters),
+            }
+
+    def _maybe_publish(self) -> None:
+        if time.monotonic() - self._published > PUBLISH_SECONDS:
+            self.publish()
+
+    def publish(self) -> dict:
+        self._published = time.monotonic()
+        snapshot = self.snapshot()
+        held = self._slot and cache.get(SNAPSHOT_KEY.format(self._slot))
+        if self._slot is None or (held and held["owner"] != self._owner):
+            # First publish, or the slot counter was lost and the slot reused
+            cache.add(SLOTS_KEY, 0, None)
+            self._slot = cache.incr(SLOTS_KEY)
+        else:
+            cache.add(SLOTS_KEY, self._slot, None)
+        cache.set(SNAPSHOT_KEY.format(self._slot), snapshot, SNAPSHOT_TTL)
+        return snapshot
+
+
+registry = Registry()
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def register(collector: Callable[[], Iterable[str]]) -> None:
+    """Add a function returning extra exposition lines to /metrics."""
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+# Exposition
+def collect() -> dict:
+    """Every live process's snapshot, merged."""
+    own = registry.publish()
+    last = cache.get(SLOTS_KEY) or 0
+    keys = [SNAPSHOT_KEY.format(n) for n in range(max(1, last - MAX_SLOTS), last + 1)]
+    others = [s for s in cache.get_many(keys).values() if s["owner"] != own["owner"]]
+    merged: dict = {"histograms": {}, "counters": {}}
+    for snapshot in [own] + others:
+        for key, values in snapshot["histograms"].items():
+            into = merged["histograms"].setdefault(key, [0] * len(values))
+            for i, v in enumerate(values):
+                into[i] += v
+        for key, value in snapshot["counters"].items():
+            merged["counters"][key] = merged["counters"].get(key, 0) + value
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(str(v))}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render(merged: dict) -> str:
+    lines: List[str] = []
+    by_name: Dict[str, list] = {}
+    for (name, labels), values in merged["histograms"].items():
+        by_name.setdefault(name, []).append((labels, values))
+    for (name, labels), value in merged["counters"].items():
+        by_name.setdefault(name, []).append((labels, value))
+
+    for name in sorted(by_name):
+        kind, help_text = HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, values in sorted(by_name[name]):
+            if kind != "histogram":
+                lines.append(f"{name}{_labels(labels)} {values:g}")
+                continue
+            running = 0
+            for bound, count in zip(BUCKETS, values):
+                running += count
+                le = 'le="%g"' % bound
+                lines.append(f"{name}_bucket{_labels(labels, le)} {running}")
+            total = running + values[len(BUCKETS)]
+            le = 'le="+Inf"'
+            lines.append(f"{name}_bucket{_labels(labels, le)} {total}")
+            lines.append(f"{name}_sum{_labels(labels)} {values[-1]:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {total}")
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+
+__all__ = ["InvalidCursor", "KeysetPage", "encode_cursor", "decode_cursor", "paginate"]
+
+
+class InvalidCursor(ValueError):
+    """Raised when a ?cursor= value cannot be decoded."""
+
+
+@dataclass
+class KeysetPage:
+    items: List[Any]
+    next_cursor: Optional[str] = None
+    page_size: int = 0
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+
+# Cursor encoding
+def encode_cursor(created_at: datetime, pk: Any) -> str:
+    raw = json.dumps([created_at.isoformat(), str(pk)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(ts), str(pk)
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+# Keyset pagination
+def paginate(
+    queryset: QuerySet,
+    cursor: Optional[str],
+    page_size: int,
+    time_field: str = "created_at",
+) -> KeysetPage:
+    """
+    Newest-first keyset pagination over (time_field, id).
+
+    Each page is a single indexed range scan, so page N costs the same as
+    page 1. Ties on the timestamp are broken by the primary key.
+    """
+    qs = queryset.order_by(f"-{time_field}", "-id")
+    if cursor:
+        ts, pk = decode_cursor(cursor)
+        try:
+            qs = qs.filter(
+                Q(**{f"{time_field}__lt": ts}) | Q(**{time_field: ts, "id__lt": pk})
+            )
+        except ValidationError as exc:
+            raise InvalidCursor(cursor) from exc
+    rows = list(qs[: page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, time_field), last.pk)
+    return KeysetPage(items=rows, next_cursor=next_cursor, page_size=page_size)
@@ -0,0 +1,58 @@
+"""
+pytest plugin for core.query_budget, loaded by the root conftest.py.
+
+Every test runs with QUERY_BUDGET_MODE="raise", so a request that goes
+over its view's budget fails the test with the repeated-query report.
+Time budgets are skipped unless --query-budget-time is given.
+
+    pytest --query-budget=warn          # report without failing
+    @pytest.mark.query_budget("catalog:detail", queries=8)
+
+The `query_budget` fixture holds any block of code to a budget:
+
+    with query_budget(queries=3):
+        fulfil_checkout_session(session)
+"""
+
+import pytest
+from core.query_budget import MODES
+from core.query_budget import query_budget as _query_budget
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("query budget")
+    group.addoption(
+        "--query-budget",
+        choices=MODES,
+        default="raise",
+        help="What a request over its query budget does (default: raise).",
+    )
+    group.addoption(
+        "--query-budget-time",
+        action="store_true",
+        help="Also enforce the time_ms budgets.",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "query_budget(view_name, queries=None, time_ms=None): "
+        "replace one view's query budget for this test",
+    )
+
+
+@pytest.fixture(autouse=True)
+def _enforce_query_budgets(request, settings):
+    settings.QUERY_BUDGET_MODE = request.config.getoption("--query-budget")
+    settings.QUERY_BUDGET_CHECK_TIME = request.config.getoption("--query-budget-time")
+    budgets = dict(settings.QUERY_BUDGETS)
+    # Closest marker first; apply it last so it wins
+    for marker in reversed(list(request.node.iter_markers("query_budget"))):
+        budgets[marker.args[0]] = dict(marker.kwargs)
+    settings.QUERY_BUDGETS = budgets
+
+
+@pytest.fixture
+def query_budget():
+    return _query_budget
@@ -0,0 +1,176 @@
+"""
+SQL budgets per view.
+
+QueryBudgetMiddleware records the queries a request runs and their total
+database time, and checks them against the budget for the request's URL
+name in settings.QUERY_BUDGETS:
+
+    QUERY_BUDGETS = {"catalog:detail": {"queries": 5, "time_ms": 50}, ...}
+
+QUERY_BUDGET_MODE decides what happens over budget: "warn" logs a report,
+"raise" raises QueryBudgetExceeded (a failing test; a 500 in a browser),
+"off" records nothing. Time budgets are only checked when
+QUERY_BUDGET_CHECK_TIME is set, since they depend on the machine.
+
+The report lists statements that ran more than once, with the project
+code and template lines that issued them; an N+1 shows up there as one
+statement repeated once per row. Queries run while a streaming response
+is consumed happen after the middleware returns and are not counted.
+
+Tests run in "raise" mode through the core.pytest_query_budget plugin.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "warn", "raise")
+STACK_DEPTH = 4
+REPORT_LIMIT = 5
+PROJECT_DIR = str(Path(settings.BASE_DIR).resolve())
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@dataclass(frozen=True)
+class Budget:
+    queries: Optional[int] = None
+    time_ms: Optional[float] = None
+
+
+def budget_for(view_name: Optional[str]) -> Optional[Budget]:
+    spec = settings.QUERY_BUDGETS.get(view_name) if view_name else None
+    return Budget(**spec) if spec else None
+
+
+# Recording
+def _origin() -> Tuple[str, ...]:
+    """Innermost project frames and template line behind the current query."""
+    lines: List[str] = []
+    template = None
+    frame = sys._getframe(1)
+    while frame is not None and len(lines) < STACK_DEPTH:
+        code = frame.f_code
+        if template is None and code.co_name == "render_annotated":
+            # django.template.base.Node: the template tag or variable rendering
+            node, context = frame.f_locals.get("self"), frame.f_locals.get("context")
+            origin = getattr(getattr(context, "template", None), "origin", None)
+            if node is not None and origin is not None:
+                name = origin.template_name or origin.name
+                template = f"{name}:{node.token.lineno}"
+                lines.append(f"template {template}")
+        filename = code.co_filename
+        if filename.startswith(PROJECT_DIR) and "site-packages" not in filename:
+            rel = filename[len(PROJECT_DIR) + 1 :]
+            if not rel.startswith("core/query_budget"):
+                lines.append(f"{rel}:{frame.f_lineno} in {code.co_name}")
+        frame = frame.f_back
+    return tuple(lines)
+
+
+class QueryRecorder:
+    """
+    A connection.execute_wrapper counting statements and their time. The
+    call site is captured only for statements already seen in this request,
+    so requests without repeats pay almost nothing for the stacks.
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.time_ms = 0.0
+        self.seen: Counter = Counter()
+        self.origins: Dict[str, Counter] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time_ms += (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.seen[sql] += 1
+            if self.seen[sql] > 1:
+                self.origins.setdefault(sql, Counter())[_origin()] += 1
+
+    def over(self, budget: Budget, check_time: bool = True) -> List[str]:
+        problems = []
+        if budget.queries is not None and self.count > budget.queries:
+            problems.append(f"{self.count} queries (budget {budget.queries})")
+        if check_time and budget.time_ms is not None and self.time_ms > budget.time_ms:
+            problems.append(
+                f"{self.time_ms:.1f} ms in the database (budget {budget.time_ms:g})"
+            )
+        return problems
+
+    def report(self, label: str, problems: List[str]) -> str:
+        lines = [f"Query budget exceeded for {label}: " + "; ".join(problems)]
+        repeated = [(n, sql) for sql, n in self.seen.most_common() if n > 1]
+        if not repeated:
+            lines.append("  No statement ran more than once.")
+        for n, sql in repeated[:REPORT_LIMIT]:
+            lines.append(f"  {n}x {sql[:200]}")
+            for origin, _ in self.origins[sql].most_common(2):
+                for line in origin or ("(no project frames)",):
+                    lines.append(f"       {line}")
+        if len(repeated) > REPORT_LIMIT:
+            lines.append(f"  ... and {len(repeated) - REPORT_LIMIT} more repeated")
+        return "\n".join(lines)
+
+
+def enforce(label: str, recorder: QueryRecorder, budget: Budget, mode: str) -> None:
+    problems = recorder.over(budget, settings.QUERY_BUDGET_CHECK_TIME)
+    if not problems:
+        return
+    message = recorder.report(label, problems)
+    if mode == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+@contextmanager
+def query_budget(
+    queries: Optional[int] = None,
+    time_ms: Optional[float] = None,
+    label: str = "block",
+):
+    """Hold a block of code to a budget, outside a request."""
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        yield recorder
+    enforce(label, recorder, Budget(queries, time_ms), "raise")
+
+
+# Middleware
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = settings.QUERY_BUDGET_MODE
+        if mode == "off":
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        budget = budget_for(view_name)
+        if budget is not None:
+            enforce(view_name, recorder, budget, mode)
+        return response
@@ -0,0 +1,62 @@
+import pytest
+from catalog.models import Product
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+def test_liveness_does_no_io(client, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        resp = client.get(reverse("core:healthz"))
+    assert resp.status_code == 200
+    assert "no-cache" in resp["Cache-Control"]
+
+
+@pytest.mark.django_db
+def test_readiness_checks_database_and_media(
+    client, protected_media, django_assert_num_queries
+):
+    with django_assert_num_queries(1):
+        resp = client.get(reverse("core:readyz"))
+    assert resp.status_code == 200
+    assert resp.json() == {
+        "status": "ok",
+        "checks": {"database": "ok", "protected_media": "ok"},
+    }
+
+
+@pytest.mark.django_db
+def test_readiness_fails_without_protected_media(client, settings, tmp_path):
+    settings.PROTECTED_MEDIA_ROOT = tmp_path / "missing"
+    resp = client.get(reverse("core:readyz"))
+    assert resp.status_code == 503
+    assert resp.json()["checks"]["protected_media"] == "missing"
+
+
+# Counts come from a cached snapshot; slugs are no longer listed
+@pytest.mark.django_db
+def test_catalog_health_reads_cached_stats(client, product, django_assert_num_queries):
+    Product.objects.create(slug="hidden", title="Hidden", price_pennies=1, active=False)
+    with django_assert_num_queries(1):
+        first = client.get(reverse("catalog:health")).content.decode()
+    with django_assert_num_queries(0):
+        again = client.get(reverse("catalog:health")).content.decode()
+
+    assert first == again
+    assert first.startswith("total=2 active=1 ")
+    assert "sample" not in first
+
+
+@pytest.mark.django_db
+def test_slugs_diagnostic_is_staff_only_and_paginated(client, user, product):
+    url = reverse("catalog:health_slugs")
+    Product.objects.create(slug="loop", title="Loop", price_pennies=250)
+    client.force_login(user)
+    assert client.get(url).status_code == 302
+
+    client.force_login(User.objects.create(username="ops", is_staff=True))
+    first = client.get(url, {"page_size": 1}).json()
+    second = client.get(url, {"page_size": 1, "cursor": first["next_cursor"]}).json()
+
+    assert first["slugs"] + second["slugs"] == ["loop", "sample"]
+    assert second["next_cursor"] is None
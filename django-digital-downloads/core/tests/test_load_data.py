@@ -0,0 +1,107 @@
+import pytest
+from catalog.models import DigitalAsset, Product, UserNote
+from core.load_data import START, LoadSpec, seed
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count, Sum
+from orders.models import Order, OrderItem, UserAsset
+from reviews.models import Review
+
+SPEC = LoadSpec(
+    products=40, assets=60, users=12, orders=90, reviews=70, notes=15, seed=3
+)
+
+
+def _snapshot():
+    return {
+        "products": list(
+            Product.objects.order_by("id").values_list(
+                "id", "slug", "title", "price_pennies", "active", "created_at"
+            )
+        ),
+        "orders": list(
+            Order.objects.order_by("id").values_list(
+                "id", "user__username", "status", "total_pennies", "created_at"
+            )
+        ),
+        "items": list(OrderItem.objects.order_by("id").values_list("id", "product_id")),
+        "grants": list(
+            UserAsset.objects.order_by("id").values_list(
+                "user__username", "digital_asset_id", "granted_at"
+            )
+        ),
+        "reviews": list(
+            Review.objects.order_by("product_id", "user__username").values_list(
+                "product_id", "user__username", "rating", "created_at"
+            )
+        ),
+        "notes": list(UserNote.objects.order_by("id").values_list("id", "title")),
+    }
+
+
+def _wipe():
+    Order.objects.all().delete()
+    Product.objects.all().delete()
+    User.objects.all().delete()
+
+
+# The generated rows hang together like real ones
+@pytest.mark.django_db
+def test_seed_writes_a_consistent_dataset():
+    stats = seed(SPEC, workers=1, batch_size=25)
+
+    assert Product.objects.count() == 40
+    assert DigitalAsset.objects.count() == 60
+    assert User.objects.count() == 12
+    assert Order.objects.count() == stats.rows["orders"] == 90
+    assert UserNote.objects.count() == 15
+    assert 0 < Review.objects.count() <= 70  # one per user and product
+
+    for order in Order.objects.annotate(lines=Sum("items__unit_price_pennies")):
+        assert order.total_pennies == order.lines
+    paid = Order.objects.filter(status=Order.Status.PAID)
+    assert paid.exists()
+    for item in OrderItem.objects.filter(order__in=paid).select_related("order"):
+        assert (
+            UserAsset.objects.filter(
+                user_id=item.order.user_id, product_id=item.product_id
+            ).count()
+            == DigitalAsset.objects.filter(product_id=item.product_id).count()
+        )
+    assert not UserAsset.objects.exclude(
+        user__orders__status=Order.Status.PAID
+    ).exists()
+
+    # Spread over the synthetic year, not stamped with "now"
+    assert Order.objects.filter(created_at__lt=START).count() == 0
+    assert Order.objects.values("created_at").distinct().count() > 80
+
+    # Review aggregates are rebuilt after the bulk insert
+    counted = Product.objects.aggregate(total=Sum("review_count"))["total"]
+    assert counted == Review.objects.count()
+    top = Product.objects.annotate(n=Count("reviews")).order_by("-n").first()
+    assert top.review_count == top.n
+
+
+# Same seed and counts, same data, whatever the workers or batch size
+@pytest.mark.django_db
+def test_seed_is_deterministic():
+    seed(SPEC, workers=1, batch_size=7)
+    first = _snapshot()
+    _wipe()
+    seed(SPEC, workers=2, batch_size=50)
+    assert _snapshot() == first
+
+    _wipe()
+    seed(LoadSpec(**{**SPEC.__dict__, "seed": 4}), workers=1)
+    assert _snapshot()["orders"] != first["orders"]
+
+
+@pytest.mark.django_db
+def test_command_refuses_to_seed_twice():
+    args = ["--products=5", "--assets=5", "--users=3", "--orders=10"]
+    call_command("seed_load_data", *args, "--reviews=5", "--notes=2", "--workers=1")
+    assert Order.objects.count() == 10
+    with pytest.raises(CommandError):
+        call_command("seed_load_data", *args, "--workers=1")
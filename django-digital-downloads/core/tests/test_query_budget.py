@@ -0,0 +1,75 @@
+import logging
+
+import pytest
+from core.query_budget import Budget, QueryBudgetExceeded, QueryRecorder
+from django.contrib.auth.models import User
+from django.db import connection
+from django.template import engines
+from django.urls import reverse
+from reviews.models import Review
+
+
+@pytest.fixture
+def reviewed(product):
+    users = User.objects.bulk_create(
+        [User(username=f"r{i}", password="!") for i in range(3)]
+    )
+    Review.objects.bulk_create([Review(product=product, user=u) for u in users])
+    return product
+
+
+# An N+1 in a template is reported with the template line that caused it
+@pytest.mark.django_db
+def test_report_points_at_repeated_queries(reviewed):
+    template = engines["django"].from_string(
+        "{% for r in reviews %}\n{{ r.user.username }}\n{% endfor %}"
+    )
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        template.render({"reviews": Review.objects.all()})
+
+    assert recorder.count == 4
+    report = recorder.report("reviews", recorder.over(Budget(queries=1)))
+    assert "3x SELECT" in report
+    assert ":2" in report  # the {{ r.user.username }} line
+    assert "core/tests/test_query_budget.py" in report
+
+
+# Over budget in "raise" mode (the default under pytest) fails the request
+@pytest.mark.django_db
+@pytest.mark.query_budget("catalog:detail", queries=1)
+def test_request_over_budget_raises(client, user, product):
+    client.force_login(user)
+    with pytest.raises(QueryBudgetExceeded, match="catalog:detail"):
+        client.get(reverse("catalog:detail", args=[product.slug]))
+
+
+@pytest.mark.django_db
+@pytest.mark.query_budget("catalog:detail", queries=1)
+def test_warn_mode_logs_and_serves(client, user, product, settings, caplog):
+    settings.QUERY_BUDGET_MODE = "warn"
+    client.force_login(user)
+    with caplog.at_level(logging.WARNING, logger="core.query_budget"):
+        resp = client.get(reverse("catalog:detail", args=[product.slug]))
+    assert resp.status_code == 200
+    assert "Query budget exceeded for catalog:detail" in caplog.text
+
+
+@pytest.mark.django_db
+@pytest.mark.query_budget("catalog:detail", queries=50, time_ms=0)
+def test_time_budget_checked_when_enabled(client, product, settings):
+    url = reverse("catalog:detail", args=[product.slug])
+    assert client.get(url).status_code == 200  # time not checked by default
+
+    settings.QUERY_BUDGET_CHECK_TIME = True
+    with pytest.raises(QueryBudgetExceeded, match="ms in the database"):
+        client.get(url + "?page=1")
+
+
+@pytest.mark.django_db
+def test_query_budget_fixture(query_budget, reviewed):
+    with query_budget(queries=1):
+        list(Review.objects.select_related("user"))
+    with pytest.raises(QueryBudgetExceeded, match="4 queries"):
+        with query_budget(queries=1, label="reviews"):
+            [r.user.username for r in Review.objects.all()]
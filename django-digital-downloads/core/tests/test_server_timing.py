@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+import pytest
+import stripe
+from core.metrics import registry
+from django.urls import reverse
+
+
+def _phases(response):
+    return {
+        entry.split(";")[0].strip() for entry in response["Server-Timing"].split(",")
+    }
+
+
+def _streamed(endpoint):
+    key = ("http_request_phase_seconds", (("endpoint", endpoint), ("phase", "stream")))
+    return registry.snapshot()["histograms"].get(key, [0])[-1]
+
+
+# Pages report their database and template time
+@pytest.mark.django_db
+def test_header_splits_db_and_template(client, product):
+    resp = client.get(reverse("catalog:detail", args=[product.slug]))
+
+    assert resp.status_code == 200
+    assert {"db", "template", "total"} <= _phases(resp)
+    assert 'queries"' in resp["Server-Timing"]
+
+
+@pytest.mark.django_db
+def test_header_times_stripe_calls(client, user, product, monkeypatch):
+    session = SimpleNamespace(id="cs_test_1", url="https://stripe.test/1")
+    monkeypatch.setattr(
+        stripe.checkout.Session, "create", staticmethod(lambda **kw: session)
+    )
+    client.force_login(user)
+    client.get(reverse("cart:add", args=[product.id]))
+
+    resp = client.get(reverse("checkout:start"))
+
+    assert resp.status_code == 302
+    assert "stripe" in _phases(resp)
+
+
+@pytest.mark.django_db
+def test_header_can_be_turned_off(settings, client):
+    settings.SERVER_TIMING = False
+    assert "Server-Timing" not in client.get(reverse("core:home"))
+
+
+# Sending the file is timed once the server has closed the response
+@pytest.mark.django_db
+def test_stream_time_recorded_after_close(
+    settings, client, user, owned_asset, protected_media
+):
+    settings.DOWNLOAD_DELIVERY = "stream"
+    client.force_login(user)
+    before = _streamed("orders:download")
+
+    resp = client.get(reverse("orders:download", args=[owned_asset.id]))
+    assert "file_open" in _phases(resp)
+    assert _streamed("orders:download") == before
+
+    assert b"".join(resp.streaming_content) == b"hello"
+    assert _streamed("orders:download") > before
+
+
+@pytest.mark.django_db
+def test_metrics_exposes_endpoint_histograms(settings, client, product):
+    settings.METRICS_TOKEN = "s3cret"
+    client.get(reverse("catalog:detail", args=[product.slug]))
+
+    resp = client.get(reverse("core:metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+    body = resp.content.decode()
+
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert (
+        'http_request_duration_seconds_bucket{endpoint="catalog:detail",'
+        'method="GET",le="+Inf"}'
+    ) in body
+    assert 'http_request_phase_seconds_count{endpoint="catalog:detail",' in body
+    assert 'db_queries_total{endpoint="catalog:detail"}' in body
+    assert "catalog_cache_requests_total" in body
+
+
+@pytest.mark.django_db
+def test_metrics_token(settings, client):
+    settings.METRICS_TOKEN = "s3cret"
+
+    assert client.get(reverse("core:metrics")).status_code == 401
+    for wrong in ("Bearer s3cre", "Bearer s\u00e9cret"):
+        resp = client.get(reverse("core:metrics"), HTTP_AUTHORIZATION=wrong)
+        assert resp.status_code == 401
+    resp = client.get(reverse("core:metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+    assert resp.status_code == 200
+
+
+# No token configured: hidden in production, open for local debugging
+@pytest.mark.django_db
+def test_metrics_hidden_without_token(settings, client):
+    assert client.get(reverse("core:metrics")).status_code == 404
+
+    settings.DEBUG = True
+    assert client.get(reverse("core:metrics")).status_code == 200
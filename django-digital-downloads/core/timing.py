@@ -0,0 +1,166 @@
+"""
+Per-request phase timing.
+
+ServerTimingMiddleware times each request, split into phases:
+
+    db              SQL queries (connection.execute_wrapper)
+    template        template rendering, excluding the queries it triggers
+    stripe          Stripe API calls (checkout.start)
+    webhook_verify  Stripe webhook signature check
+    file_open       locating and opening a download
+    stream          sending a streamed body, after the view returned
+
+Every phase but `stream` goes into a Server-Timing header (when
+SERVER_TIMING is on). All of them, plus total latency and query counts,
+go into the per-endpoint histograms in core.metrics.
+
+Code marks a phase with `with phase("stripe"): ...`; outside a request
+that is a no-op.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.db import connection
+from django.template.backends.django import DjangoTemplates
+
+from .metrics import registry
+
+HEADER_PHASES = ("db", "template", "stripe", "webhook_verify", "file_open")
+
+
+class RequestTimings:
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+        self.queries = 0
+        self._open: set = set()
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper: every query adds to "db"
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.add("db", time.perf_counter() - start)
+
+    def header(self, total: float) -> str:
+        parts = []
+        for name in HEADER_PHASES:
+            if name in self.phases:
+                entry = f"{name};dur={self.phases[name] * 1000:.1f}"
+                if name == "db":
+                    entry += f';desc="{self.queries} queries"'
+                parts.append(entry)
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Add the block's duration to `name` for the current request. Nested
+    blocks of the same phase count once; "template" leaves out the
+    queries run while rendering, which "db" already has.
+    """
+    timings = _current.get()
+    if timings is None or name in timings._open:
+        yield
+        return
+    timings._open.add(name)
+    db_before = timings.phases.get("db", 0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if name == "template":
+            elapsed -= timings.phases.get("db", 0.0) - db_before
+        timings._open.discard(name)
+        timings.add(name, elapsed)
+
+
+# Templates
+class TimedTemplate:
+    def __init__(self, template) -> None:
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with phase("template"):
+            return self.template.render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with rendering timed per request."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+# Middleware
+class ServerTimingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timings):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - start
+
+        match = request.resolver_match
+        endpoint = match.view_name if match else "unmatched"
+        if settings.SERVER_TIMING:
+            response["Server-Timing"] = timings.header(total)
+        registry.observe(
+            "http_request_duration_seconds",
+            total,
+            endpoint=endpoint,
+            method=request.method,
+        )
+        for name, seconds in timings.phases.items():
+            registry.observe(
+                "http_request_phase_seconds", seconds, endpoint=endpoint, phase=name
+            )
+        registry.inc("db_queries_total", timings.queries, endpoint=endpoint)
+        registry.inc(
+            "http_responses_total", endpoint=endpoint, status=str(response.status_code)
+        )
+        if response.streaming:
+            sent = time.perf_counter()
+
+            def streamed():
+                registry.observe(
+                    "http_request_phase_seconds",
+                    time.perf_counter() - sent,
+                    endpoint=endpoint,
+                    phase="stream",
+                )
+
+            # Runs when the server closes the response, after the last chunk
+            response._resource_closers.append(streamed)
+        return response
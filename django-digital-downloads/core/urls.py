@@ -1,7 +1,12 @@
 from django.urls import path
 
-from .views import home
+from .views import healthz, home, metrics, readyz
 
 app_name = "core"
 
-urlpatterns = [path("", home, name="home")]
+urlpatterns = [
+    path("", home, name="home"),
+    path("metrics", metrics, name="metrics"),
+    path("healthz", healthz, name="healthz"),
+    path("readyz", readyz, name="readyz"),
+]
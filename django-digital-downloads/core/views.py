@@ -1,13 +1,52 @@
-from django.shortcuts import redirect, render
-
-
-def home(request):
-    return render(request, "home.html")
-
-
-def not_found_redirect(request, exception=None):
-    return redirect("core:home")
-
-
-def server_error_redirect(request):
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import redirect, render
+from django.views.decorators.cache import never_cache
+
+from . import metrics as process_metrics
+from .health import run_checks
+
+
+def home(request):
+    return render(request, "home.html")
+
+
+# Metrics View (Prometheus text format)
+def metrics(request):
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponse(status=404)  # hidden until a scrape token is set
+    if token and not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()
+    ):
+        return HttpResponse(status=401)
+    body = process_metrics.render(process_metrics.collect())
+    return HttpResponse(body, content_type=process_metrics.CONTENT_TYPE)
+
+
+# Liveness Probe (the process answers; no I/O, so a slow database
+# does not get healthy workers restarted)
+@never_cache
+def healthz(request):
+    return HttpResponse("ok", content_type="text/plain")
+
+
+# Readiness Probe
+@never_cache
+def readyz(request):
+    checks = run_checks()
+    ready = all(result == "ok" for result in checks.values())
+    return JsonResponse(
+        {"status": "ok" if ready else "unavailable", "checks": checks},
+        status=200 if ready else 503,
+    )
+
+
+def not_found_redirect(request, exception=None):
+    return redirect("core:home")
+
+
+def server_error_redirect(request):
     return redirect("core:home")
@@ -0,0 +1,253 @@
+"""
+File delivery for purchased assets.
+
+Supports resumable downloads: strong validators (ETag / Last-Modified),
+conditional GET, and HTTP Range / If-Range with single and multi-range
+(multipart/byteranges) responses.
+
+Delivery can also be handed to the front proxy (DOWNLOAD_DELIVERY):
+  - "stream"   : Django streams the file itself (default)
+  - "nginx"    : X-Accel-Redirect to an internal nginx location
+  - "sendfile" : X-Sendfile for Apache mod_xsendfile / lighttpd
+"""
+
+from __future__ import annotations
+
+import mimetypes
+import os
+import uuid
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from core.timing import phase
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+CHUNK_SIZE = 64 * 1024
+MAX_RANGES = 16
+
+ByteRange = Tuple[int, int]  # inclusive (start, end)
+
+
+# Paths
+def protected_path(rel_path: str) -> Path:
+    """Resolve a DigitalAsset.file_path under PROTECTED_MEDIA_ROOT."""
+    return Path(settings.PROTECTED_MEDIA_ROOT) / rel_path.lstrip("/\\")
+
+
+# Validators
+def make_etag(sha256: str, st: os.stat_result) -> str:
+    """Strong ETag: content hash when known, else size + mtime."""
+    if sha256:
+        return f'"{sha256}"'
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _if_range_matches(request, etag: str, last_modified: int) -> bool:
+    """
+    True when the Range header may be honoured.
+    If-Range holds either an ETag (strong comparison) or an HTTP date.
+    """
+    if_range = request.META.get("HTTP_IF_RANGE", "").strip()
+    if not if_range:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return not if_range.startswith("W/") and if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and since == last_modified
+
+
+# Range parsing
+def parse_range_header(header: str, size: int) -> Optional[List[ByteRange]]:
+    """
+    Parse a `Range: bytes=...` header against a file of `size` bytes.
+
+    Returns None when the header is absent or malformed (serve the whole
+    file), [] when no range is satisfiable (416), otherwise a sorted list
+    of coalesced inclusive ranges.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    ranges: List[ByteRange] = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        if not sep:
+            return None
+        first, last = first.strip(), last.strip()
+        try:
+            if first:
+                start = int(first)
+                end = int(last) if last else size - 1
+                if start < 0 or end < start:
+                    return None
+            else:
+                suffix = int(last)
+                if suffix < 0:
+                    return None
+                if suffix == 0:
+                    continue
+                start, end = max(size - suffix, 0), size - 1
+        except ValueError:
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size - 1)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    ranges.sort()
+    merged: List[ByteRange] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+# Streaming helpers
+def _iter_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    remaining = end - start + 1
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _multipart_parts(
+    ranges: List[ByteRange], size: int, content_type: str, boundary: str
+) -> List[Tuple[bytes, ByteRange]]:
+    parts = []
+    for start, end in ranges:
+        head = (
+            f"\r\n--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode()
+        parts.append((head, (start, end)))
+    return parts
+
+
+def _iter_multipart(path, parts, boundary: str) -> Iterator[bytes]:
+    for head, (start, end) in parts:
+        yield head
+        yield from _iter_range(path, start, end)
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+# Response builder
+def serve_file(
+    request,
+    path: Path,
+    file_name: str,
+    sha256: str = "",
+) -> HttpResponse:
+    """
+    Serve `path` as an attachment named `file_name`, honouring
+    conditional and Range requests.
+    """
+    st = path.stat()
+    size = st.st_size
+    last_modified = int(st.st_mtime)
+    etag = make_etag(sha256, st)
+    content_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": "private",
+    }
+
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if not_modified is not None:
+        for key, value in headers.items():
+            not_modified[key] = value
+        return not_modified
+
+    ranges = None
+    if _if_range_matches(request, etag, last_modified):
+        ranges = parse_range_header(request.META.get("HTTP_RANGE", ""), size)
+
+    if ranges is None:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Content-Length"] = str(size)
+    elif not ranges:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+    elif len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(
+            _iter_range(path, start, end), status=206, content_type=content_type
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    else:
+        boundary = uuid.uuid4().hex
+        parts = _multipart_parts(ranges, size, content_type, boundary)
+        length = sum(len(head) + end - start + 1 for head, (start, end) in parts)
+        length += len(f"\r\n--{boundary}--\r\n")
+        response = StreamingHttpResponse(
+            _iter_multipart(path, parts, boundary),
+            status=206,
+            content_type=f"multipart/byteranges; boundary={boundary}",
+        )
+        response["Content-Length"] = str(length)
+
+    for key, value in headers.items():
+        response[key] = value
+    response["Content-Disposition"] = f'attachment; filename="{file_name}"'
+    return response
+
+
+# Proxy offload
+def _proxy_response(header: str, value: str, file_name: str) -> HttpResponse:
+    content_type = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+    response = HttpResponse(content_type=content_type)
+    response[header] = value
+    response["Content-Disposition"] = f'attachment; filename="{file_name}"'
+    response["Cache-Control"] = "private"
+    return response
+
+
+def deliver(request, rel_path: str, file_name: str, sha256: str = "") -> HttpResponse:
+    """
+    Hand an entitled download to the configured delivery backend.
+    Proxy modes skip the filesystem entirely; the proxy answers 404 itself.
+    """
+    mode = settings.DOWNLOAD_DELIVERY
+    rel_path = rel_path.lstrip("/\\")
+
+    if mode == "nginx":
+        prefix = settings.DOWNLOAD_ACCEL_PREFIX.rstrip("/") + "/"
+        return _proxy_response("X-Accel-Redirect", prefix + quote(rel_path), file_name)
+
+    if mode == "sendfile":
+        return _proxy_response("X-Sendfile", str(protected_path(rel_path)), file_name)
+
+    if mode == "stream":
+        with phase("file_open"):
+            abs_path = protected_path(rel_path)
+            if not abs_path.is_file():
+                raise Http404("File not found")
+            return serve_file(request, abs_path, file_name, sha256=sha256)
+
+    raise ImproperlyConfigured(f"Unknown DOWNLOAD_DELIVERY mode: {mode!r}")
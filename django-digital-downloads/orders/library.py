@@ -0,0 +1,121 @@
+"""
+Per-user library read model.
+
+The purchases page lists LibraryEntry rows: each grant with its product
+title and slug and its file details copied in, so a page (filtered by
+title or product, or not) is one indexed range scan on the user's rows
+rather than a three-way join over every grant they hold.
+
+Entries are kept in step with UserAsset:
+
+    UserAsset save / delete      orders.signals
+    webhook fulfilment           refresh_library() after the bulk grant
+    product / file edits         orders.signals copy the new details
+    anything else (bulk loads,   rebuild_library(), or
+    raw SQL)                     `manage.py rebuild_library`
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, List, Optional
+
+from core.pagination import KeysetPage, paginate
+
+from .models import LibraryEntry, UserAsset
+
+__all__ = [
+    "entry_for",
+    "write_entries",
+    "refresh_library",
+    "rebuild_library",
+    "library_page",
+    "group_by_product",
+]
+
+ENTRY_FIELDS = [
+    "product_title",
+    "product_slug",
+    "file_path",
+    "file_name",
+    "sha256",
+    "granted_at",
+]
+
+
+def entry_for(grant: UserAsset) -> LibraryEntry:
+    """`grant` should have `product` and `digital_asset` loaded."""
+    product, asset = grant.product, grant.digital_asset
+    return LibraryEntry(
+        id=grant.pk,
+        user_id=grant.user_id,
+        product_id=product.pk,
+        digital_asset_id=asset.pk,
+        product_title=product.title,
+        product_slug=product.slug,
+        file_path=asset.file_path,
+        file_name=asset.file_name,
+        sha256=asset.sha256,
+        granted_at=grant.granted_at,
+    )
+
+
+def write_entries(entries: List[LibraryEntry], batch_size: Optional[int] = None) -> int:
+    """Upsert entries by grant id; one statement per batch."""
+    if entries:
+        LibraryEntry.objects.bulk_create(
+            entries,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["id"],
+            update_fields=ENTRY_FIELDS,
+        )
+    return len(entries)
+
+
+def refresh_library(grants) -> int:
+    """Copy a UserAsset queryset into the library: one read, one upsert."""
+    grants = grants.select_related("product", "digital_asset")
+    return write_entries([entry_for(g) for g in grants])
+
+
+def rebuild_library(batch_size: int = 1000) -> int:
+    """Re-copy every grant and drop entries whose grant has gone."""
+    grants = UserAsset.objects.select_related("product", "digital_asset").order_by()
+    written, batch = 0, []
+    for grant in grants.iterator(chunk_size=batch_size):
+        batch.append(entry_for(grant))
+        if len(batch) >= batch_size:
+            written += write_entries(batch)
+            batch = []
+    written += write_entries(batch)
+    LibraryEntry.objects.exclude(id__in=UserAsset.objects.values("id")).delete()
+    return written
+
+
+# Reading
+def library_page(
+    user, cursor: Optional[str], page_size: int, q: str = "", product: str = ""
+) -> KeysetPage:
+    """
+    One page of the user's library, newest grant first, optionally limited
+    to one product (by slug) or to titles containing `q`.
+    Raises InvalidCursor.
+    """
+    entries = LibraryEntry.objects.filter(user=user)
+    if product:
+        entries = entries.filter(product_slug=product)
+    if q:
+        entries = entries.filter(product_title__icontains=q)
+    return paginate(entries, cursor, page_size, time_field="granted_at")
+
+
+def group_by_product(entries: Iterable[LibraryEntry]) -> List[dict]:
+    """Group a page's entries by product, in order of each product's newest."""
+    groups: dict = {}
+    for entry in entries:
+        group = groups.setdefault(
+            entry.product_id,
+            {"title": entry.product_title, "slug": entry.product_slug, "entries": []},
+        )
+        group["entries"].append(entry)
+    return list(groups.values())
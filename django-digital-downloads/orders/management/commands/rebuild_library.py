@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from orders.library import rebuild_library
+
+
+class Command(BaseCommand):
+    help = "Rebuild every user's purchases library (LibraryEntry) from UserAsset"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        written = rebuild_library(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"[rebuild_library] Copied {written} grants; orphaned entries removed."
+            )
+        )
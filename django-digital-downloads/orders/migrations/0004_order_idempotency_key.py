@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0003_delete_usernote"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="idempotency_key",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name="order",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(
+                    ("status", "pending"),
+                    models.Q(("idempotency_key", ""), _negated=True),
+                ),
+                fields=("user", "idempotency_key"),
+                name="orders_order_pending_cart_uniq",
+            ),
+        ),
+    ]
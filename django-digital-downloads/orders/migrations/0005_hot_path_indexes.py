@@ -0,0 +1,36 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0010_product_updated_at"),
+        ("orders", "0004_order_idempotency_key"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["user", "-created_at"], name="orders_user_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userasset",
+            index=models.Index(
+                fields=["user", "-granted_at"], name="orders_ua_user_granted"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="order",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("stripe_session_id", ""), _negated=True),
+                fields=("stripe_session_id",),
+                name="orders_order_session_uniq",
+            ),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_grants(apps, schema_editor):
+    UserAsset = apps.get_model("orders", "UserAsset")
+    LibraryEntry = apps.get_model("orders", "LibraryEntry")
+    grants = UserAsset.objects.select_related("product", "digital_asset").order_by()
+    batch = []
+    for grant in grants.iterator(chunk_size=1000):
+        batch.append(
+            LibraryEntry(
+                id=grant.pk,
+                user_id=grant.user_id,
+                product_id=grant.product_id,
+                digital_asset_id=grant.digital_asset_id,
+                product_title=grant.product.title,
+                product_slug=grant.product.slug,
+                file_path=grant.digital_asset.file_path,
+                file_name=grant.digital_asset.file_name,
+                sha256=grant.digital_asset.sha256,
+                granted_at=grant.granted_at,
+            )
+        )
+        if len(batch) >= 1000:
+            LibraryEntry.objects.bulk_create(batch)
+            batch = []
+    LibraryEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0011_listing_partial_index"),
+        ("orders", "0005_hot_path_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LibraryEntry",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(editable=False, primary_key=True, serialize=False),
+                ),
+                ("product_title", models.CharField(max_length=140)),
+                ("product_slug", models.SlugField(max_length=140)),
+                ("file_path", models.CharField(max_length=512)),
+                ("file_name", models.CharField(max_length=255)),
+                ("sha256", models.CharField(blank=True, max_length=64)),
+                ("granted_at", models.DateTimeField()),
+                (
+                    "digital_asset",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="library_entries",
+                        to="catalog.digitalasset",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="library_entries",
+                        to="catalog.product",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="library",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-granted_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-granted_at"], name="orders_lib_user_granted"
+                    ),
+                    models.Index(
+                        fields=["user", "product_slug", "-granted_at"],
+                        name="orders_lib_user_product",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(copy_grants, migrations.RunPython.noop),
+    ]
@@ -38,10 +38,30 @@ class Order(models.Model):
     )
     stripe_session_id = models.CharField(max_length=255, blank=True)
     stripe_payment_intent = models.CharField(max_length=255, blank=True)
+    # Hash of the priced cart; stops one cart spawning several pending orders
+    idempotency_key = models.CharField(max_length=64, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "idempotency_key"],
+                condition=models.Q(status="pending") & ~models.Q(idempotency_key=""),
+                name="orders_order_pending_cart_uniq",
+            ),
+            # Webhook fulfilment looks orders up by session; blank until
+            # checkout starts
+            models.UniqueConstraint(
+                fields=["stripe_session_id"],
+                condition=~models.Q(stripe_session_id=""),
+                name="orders_order_session_uniq",
+            ),
+        ]
+        indexes = [
+            # Order history, newest first
+            models.Index(fields=["user", "-created_at"], name="orders_user_created"),
+        ]
 
     def __str__(self) -> str:
         return f"Order {self.id} ({self.status})"
@@ -83,6 +103,55 @@ class UserAsset(models.Model):
     class Meta:
         unique_together = ("user", "digital_asset")
         ordering = ["-granted_at"]
+        indexes = [
+            # Purchases page, newest grant first
+            models.Index(fields=["user", "-granted_at"], name="orders_ua_user_granted"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.user} → {self.digital_asset.file_name}"
+
+
+class LibraryEntry(models.Model):
+    """
+    Read model for the purchases page: one row per grant, with the product
+    and file details copied in, so a page of a user's library is a single
+    indexed query. Kept in step by orders.library.
+    """
+
+    # Same id as the UserAsset it mirrors
+    id = models.UUIDField(primary_key=True, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="library",
+        db_index=False,  # leads both indexes below
+    )
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="library_entries"
+    )
+    digital_asset = models.ForeignKey(
+        DigitalAsset, on_delete=models.CASCADE, related_name="library_entries"
+    )
+    product_title = models.CharField(max_length=140)
+    product_slug = models.SlugField(max_length=140)
+    file_path = models.CharField(max_length=512)
+    file_name = models.CharField(max_length=255)
+    sha256 = models.CharField(max_length=64, blank=True)
+    granted_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-granted_at"]
+        indexes = [
+            models.Index(
+                fields=["user", "-granted_at"], name="orders_lib_user_granted"
+            ),
+            # One product's files
+            models.Index(
+                fields=["user", "product_slug", "-granted_at"],
+                name="orders_lib_user_product",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user_id} → {self.file_name}"
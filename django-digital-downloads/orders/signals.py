@@ -0,0 +1,41 @@
+from catalog.models import DigitalAsset, Product
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .library import entry_for, write_entries
+from .models import LibraryEntry, UserAsset
+
+
+# Refunds delete the grant, which also retires its signed links
+@receiver(post_delete, sender=UserAsset)
+def grant_deleted(sender, instance, **kwargs):
+    LibraryEntry.objects.filter(id=instance.pk).delete()
+
+
+@receiver(post_save, sender=UserAsset)
+def grant_saved(sender, instance, **kwargs):
+    write_entries([entry_for(instance)])
+
+
+# Library entries carry copies of these; a save that changes nothing
+# updates no rows
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    if not created:
+        LibraryEntry.objects.filter(product=instance).exclude(
+            product_title=instance.title, product_slug=instance.slug
+        ).update(product_title=instance.title, product_slug=instance.slug)
+
+
+@receiver(post_save, sender=DigitalAsset)
+def asset_saved(sender, instance, created, **kwargs):
+    if not created:
+        LibraryEntry.objects.filter(digital_asset=instance).exclude(
+            file_path=instance.file_path,
+            file_name=instance.file_name,
+            sha256=instance.sha256,
+        ).update(
+            file_path=instance.file_path,
+            file_name=instance.file_name,
+            sha256=instance.sha256,
+        )
@@ -0,0 +1,105 @@
+"""
+Stateless signed download URLs.
+
+The purchases page mints short-lived HMAC tokens that carry everything the
+download endpoint needs (user, grant, path, file name, hash, expiry), so a
+signed download needs no session, user or asset lookup. Refunds delete the
+grant, and the download checks the grant still exists with one
+primary-key lookup; the database is the one place every worker agrees on.
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core import signing
+from django.urls import reverse
+
+SALT = "orders.download"
+
+
+class ExpiredToken(signing.BadSignature):
+    """Signature is valid but the link is past its expiry."""
+
+    def __init__(self, grant):
+        super().__init__("Download link expired")
+        self.grant = grant
+
+
+@dataclass(frozen=True)
+class SignedGrant:
+    user_id: int
+    user_asset_id: str
+    file_path: str
+    file_name: str
+    sha256: str
+    expires: int
+
+
+# Minting
+def make_download_token(user_asset, ttl: int | None = None) -> str:
+    """
+    `user_asset` must have `digital_asset` loaded (select_related).
+    """
+    asset = user_asset.digital_asset
+    return _sign(user_asset.user_id, user_asset.id, asset, ttl)
+
+
+def _sign(user_id: int, grant_id, asset, ttl: int | None) -> str:
+    """`asset` is anything with file_path, file_name and sha256."""
+    ttl = settings.DOWNLOAD_URL_TTL if ttl is None else ttl
+    payload = {
+        "u": user_id,
+        "a": str(grant_id),
+        "p": asset.file_path,
+        "n": asset.file_name,
+        "h": asset.sha256,
+        "e": int(time.time()) + ttl,
+    }
+    return signing.Signer(salt=SALT).sign_object(payload, compress=True)
+
+
+def signed_download_url(user_asset, ttl: int | None = None) -> str:
+    token = make_download_token(user_asset, ttl)
+    return reverse("orders:signed_download", args=[token])
+
+
+def signed_entry_url(entry, ttl: int | None = None) -> str:
+    """Signed link for a LibraryEntry, which carries the file details itself."""
+    token = _sign(entry.user_id, entry.id, entry, ttl)
+    return reverse("orders:signed_download", args=[token])
+
+
+# Verification
+def read_download_token(token: str) -> SignedGrant:
+    """
+    Verify a token (constant-time HMAC compare) and return its grant.
+    Raises signing.BadSignature, or ExpiredToken once past expiry.
+    """
+    data = signing.Signer(salt=SALT).unsign_object(token)
+    try:
+        grant = SignedGrant(
+            user_id=int(data["u"]),
+            user_asset_id=str(data["a"]),
+            file_path=str(data["p"]),
+            file_name=str(data["n"]),
+            sha256=str(data["h"]),
+            expires=int(data["e"]),
+        )
+    except (KeyError, TypeError, ValueError) as exc:
+        raise signing.BadSignature("Malformed download token") from exc
+    if grant.expires < time.time():
+        raise ExpiredToken(grant)
+    return grant
+
+
+# Revocation (refunds)
+def is_revoked(grant: SignedGrant) -> bool:
+    """True once the grant behind the token has been deleted (refunded)."""
+    from .models import UserAsset
+
+    return not UserAsset.objects.filter(
+        pk=grant.user_asset_id, user_id=grant.user_id
+    ).exists()
@@ -0,0 +1,100 @@
+from pathlib import Path
+from urllib.parse import unquote
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+
+
+class StubProxy:
+    """
+    Minimal stand-in for nginx / Apache in front of gunicorn: forwards the
+    request to Django and, when the app answers with an X-Accel-Redirect or
+    X-Sendfile header, serves the referenced file itself.
+    """
+
+    def __init__(self, app, root: Path, accel_prefix: str = "/protected/"):
+        self.app = app
+        self.root = root
+        self.accel_prefix = accel_prefix
+        self.offloaded = None
+
+    def __call__(self, environ):
+        captured = {}
+
+        def start_response(status, headers, exc_info=None):
+            captured["status"], captured["headers"] = status, headers
+            return lambda data: None
+
+        result = self.app(environ, start_response)
+        try:
+            body = b"".join(result)
+        finally:
+            getattr(result, "close", lambda: None)()
+
+        headers = dict(captured["headers"])
+        if "X-Accel-Redirect" in headers:
+            self.offloaded = "X-Accel-Redirect"
+            uri = headers.pop("X-Accel-Redirect")
+            assert uri.startswith(self.accel_prefix)
+            target = self.root / unquote(uri[len(self.accel_prefix) :])
+        elif "X-Sendfile" in headers:
+            self.offloaded = "X-Sendfile"
+            target = Path(headers.pop("X-Sendfile"))
+        else:
+            return captured["status"], headers, body
+
+        if not target.is_file():
+            return "404 Not Found", {}, b""
+        return "200 OK", headers, target.read_bytes()
+
+
+def _environ(client, path):
+    environ = {
+        "PATH_INFO": path,
+        "REQUEST_METHOD": "GET",
+        "HTTP_COOKIE": f"sessionid={client.cookies['sessionid'].value}",
+    }
+    setup_testing_defaults(environ)
+    return environ
+
+
+@pytest.fixture
+def proxy(protected_media):
+    return StubProxy(get_wsgi_application(), protected_media)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "mode,offloaded",
+    [("stream", None), ("nginx", "X-Accel-Redirect"), ("sendfile", "X-Sendfile")],
+)
+def test_download_delivery_modes(
+    settings, client, user, owned_asset, proxy, mode, offloaded
+):
+    settings.DOWNLOAD_DELIVERY = mode
+    client.force_login(user)
+
+    url = reverse("orders:download", args=[owned_asset.id])
+    status, headers, body = proxy(_environ(client, url))
+
+    assert status.startswith("200")
+    assert body == b"hello"
+    assert proxy.offloaded == offloaded
+    assert headers["Content-Disposition"] == 'attachment; filename="hello.txt"'
+
+
+# Entitlement is still enforced before anything is handed to the proxy
+@pytest.mark.django_db
+def test_proxy_mode_requires_entitlement(settings, client, owned_asset, proxy):
+    from django.contrib.auth.models import User
+
+    settings.DOWNLOAD_DELIVERY = "nginx"
+    other = User.objects.create_user("mallory", password="x")
+    client.force_login(other)
+
+    url = reverse("orders:download", args=[owned_asset.id])
+    status, headers, body = proxy(_environ(client, url))
+    assert not status.startswith("200")  # 404 handler redirects home
+    assert proxy.offloaded is None
@@ -0,0 +1,76 @@
+import pytest
+from django.urls import reverse
+
+
+def _body(resp):
+    return b"".join(resp.streaming_content)
+
+
+@pytest.fixture
+def download_url(client, user, owned_asset, protected_media):
+    client.force_login(user)
+    return reverse("orders:download", args=[owned_asset.id])
+
+
+# Full download advertises ranges and strong validators
+@pytest.mark.django_db
+def test_download_full_file_has_validators(client, download_url):
+    resp = client.get(download_url)
+    assert resp.status_code == 200
+    assert _body(resp) == b"hello"
+    assert resp["Accept-Ranges"] == "bytes"
+    assert resp["ETag"] == '"deadbeef"'
+    assert resp["Content-Length"] == "5"
+    assert "Last-Modified" in resp
+
+
+# Single range resumes mid-file
+@pytest.mark.django_db
+def test_download_single_range(client, download_url):
+    resp = client.get(download_url, HTTP_RANGE="bytes=1-3")
+    assert resp.status_code == 206
+    assert resp["Content-Range"] == "bytes 1-3/5"
+    assert _body(resp) == b"ell"
+
+    resp = client.get(download_url, HTTP_RANGE="bytes=-2")
+    assert resp.status_code == 206
+    assert _body(resp) == b"lo"
+
+
+# Several ranges come back as multipart/byteranges
+@pytest.mark.django_db
+def test_download_multi_range(client, download_url):
+    resp = client.get(download_url, HTTP_RANGE="bytes=0-0,3-4")
+    assert resp.status_code == 206
+    assert resp["Content-Type"].startswith("multipart/byteranges; boundary=")
+    body = _body(resp)
+    assert int(resp["Content-Length"]) == len(body)
+    assert b"Content-Range: bytes 0-0/5\r\n\r\nh" in body
+    assert b"Content-Range: bytes 3-4/5\r\n\r\nlo" in body
+
+
+# Unsatisfiable ranges return 416
+@pytest.mark.django_db
+def test_download_unsatisfiable_range(client, download_url):
+    resp = client.get(download_url, HTTP_RANGE="bytes=10-20")
+    assert resp.status_code == 416
+    assert resp["Content-Range"] == "bytes */5"
+
+
+# A stale If-Range falls back to the full file; a match is honoured
+@pytest.mark.django_db
+def test_download_if_range(client, download_url):
+    resp = client.get(download_url, HTTP_RANGE="bytes=1-3", HTTP_IF_RANGE='"old"')
+    assert resp.status_code == 200
+    assert _body(resp) == b"hello"
+
+    resp = client.get(download_url, HTTP_RANGE="bytes=1-3", HTTP_IF_RANGE='"deadbeef"')
+    assert resp.status_code == 206
+
+
+# Repeat downloads with a matching ETag send no body
+@pytest.mark.django_db
+def test_download_if_none_match(client, download_url):
+    resp = client.get(download_url, HTTP_IF_NONE_MATCH='"deadbeef"')
+    assert resp.status_code == 304
+    assert resp["ETag"] == '"deadbeef"'
@@ -0,0 +1,86 @@
+import re
+from datetime import timedelta
+
+import pytest
+from catalog.models import Product
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from orders.models import Order, OrderItem
+
+
+@pytest.fixture
+def orders(user, product):
+    loop = Product.objects.create(slug="loop", title="Loop", price_pennies=250)
+    now = timezone.now()
+    created = []
+    for i in range(5):
+        order = Order.objects.create(user=user, status="paid", total_pennies=999 + i)
+        Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(hours=i))
+        OrderItem.objects.create(
+            order=order, product=product, quantity=2, unit_price_pennies=499
+        )
+        if i % 2:
+            OrderItem.objects.create(
+                order=order, product=loop, quantity=1, unit_price_pennies=250
+            )
+        created.append(order)
+    # Someone else's order never shows up
+    other = User.objects.create_user("bob", password="x")
+    Order.objects.create(user=other, total_pennies=1)
+    return created
+
+
+# Pages cost the same number of queries, however deep
+@pytest.mark.django_db
+def test_history_pages_by_cursor(
+    client, user, orders, settings, django_assert_num_queries
+):
+    settings.ORDER_HISTORY_PAGE_SIZE = 2
+    client.force_login(user)
+
+    seen = []
+    cursor = None
+    for _ in range(3):
+        with django_assert_num_queries(4):  # session, user, orders, lines
+            resp = client.get(
+                reverse("orders:history"), {"cursor": cursor} if cursor else {}
+            )
+        page = resp.context["page"]
+        seen += [o.id for o in page.items]
+        cursor = page.next_cursor
+
+    assert cursor is None
+    assert seen == [o.id for o in orders]
+
+
+@pytest.mark.django_db
+def test_history_shows_counts_titles_and_pounds(client, user, orders):
+    client.force_login(user)
+    html = client.get(reverse("orders:history")).content.decode()
+
+    amounts = re.findall(r"&middot; GBP (\S+) &middot;", html)
+    assert amounts == ["9.99", "10.00", "10.01", "10.02", "10.03"]
+    assert "3 items" in html and "2 items" in html
+    assert "Loop &times; 1, Sample Product &times; 2" in html
+
+
+@pytest.mark.django_db
+def test_history_api_for_infinite_scroll(client, user, orders):
+    client.force_login(user)
+    url = reverse("orders:history_api")
+
+    first = client.get(url, {"page_size": 3}).json()
+    second = client.get(first["next"]).json()
+
+    assert [o["id"] for o in first["results"] + second["results"]] == [
+        str(o.id) for o in orders
+    ]
+    assert second["next"] is None
+    newest = first["results"][0]
+    assert newest["item_count"] == 2
+    assert newest["total_pennies"] == 999
+    assert newest["items"] == [
+        {"title": "Sample Product", "quantity": 2, "unit_price_pennies": 499}
+    ]
+    assert client.get(url, {"cursor": "nope"}).status_code == 400
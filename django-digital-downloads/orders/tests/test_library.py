@@ -0,0 +1,124 @@
+import uuid
+from datetime import timedelta
+
+import pytest
+from catalog.models import DigitalAsset, Product
+from checkout.fulfilment import fulfil_checkout_session
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from orders.library import rebuild_library
+from orders.models import LibraryEntry, Order, OrderItem, UserAsset
+
+
+@pytest.fixture
+def library(user):
+    """Two products, three files each, granted an hour apart (newest last)."""
+    now = timezone.now()
+    for p, title in enumerate(["Night Drive", "Summer Loop"]):
+        product = Product.objects.create(
+            slug=title.lower().replace(" ", "-"), title=title, price_pennies=100
+        )
+        for f in range(3):
+            asset = DigitalAsset.objects.create(
+                product=product, file_path=f"{product.slug}/{f}", file_name=f"{f}.mp3"
+            )
+            grant = UserAsset.objects.create(
+                user=user, product=product, digital_asset=asset
+            )
+            at = now - timedelta(hours=10 - 3 * p - f)
+            UserAsset.objects.filter(pk=grant.pk).update(granted_at=at)
+    rebuild_library()
+    # Someone else's grants never show up
+    other = User.objects.create_user("bob", password="x")
+    UserAsset.objects.create(user=other, product=product, digital_asset=asset)
+
+
+def _files(resp):
+    return [e.file_name for g in resp.context["groups"] for e in g["entries"]]
+
+
+# Webhook grants land in the library; a page is one query on it, no joins
+@pytest.mark.django_db
+def test_fulfilment_fills_library(client, user, product, digital_asset):
+    order = Order.objects.create(user=user, stripe_session_id="cs_1")
+    OrderItem.objects.create(order=order, product=product, unit_price_pennies=499)
+    fulfil_checkout_session({"id": "cs_1"})
+    fulfil_checkout_session({"id": "cs_1"})
+
+    entry = LibraryEntry.objects.get()
+    assert entry.pk == UserAsset.objects.get().pk
+    assert (entry.product_title, entry.file_name) == ("Sample Product", "hello.txt")
+
+    client.force_login(user)
+    with CaptureQueriesContext(connection) as ctx:
+        resp = client.get(reverse("orders:downloads"))
+    reads = [
+        q["sql"] for q in ctx.captured_queries if "orders_libraryentry" in q["sql"]
+    ]
+    assert len(reads) == 1
+    assert "JOIN" not in reads[0]
+    assert b"hello.txt" in resp.content
+
+
+@pytest.mark.django_db
+def test_purchases_pages_and_groups(client, user, library, settings):
+    settings.PURCHASES_PAGE_SIZE = 4
+    client.force_login(user)
+
+    first = client.get(reverse("orders:downloads"))
+    groups = first.context["groups"]
+    assert [g["title"] for g in groups] == ["Summer Loop", "Night Drive"]
+    assert _files(first) == ["2.mp3", "1.mp3", "0.mp3", "2.mp3"]
+
+    cursor = first.context["page"].next_cursor
+    second = client.get(reverse("orders:downloads"), {"cursor": cursor})
+    assert _files(second) == ["1.mp3", "0.mp3"]
+    assert not second.context["page"].has_next
+
+    stale = client.get(reverse("orders:downloads"), {"cursor": "junk"})
+    assert _files(stale) == _files(first)
+
+
+@pytest.mark.django_db
+def test_purchases_filter_by_title_and_product(client, user, library):
+    client.force_login(user)
+
+    resp = client.get(reverse("orders:downloads"), {"q": "night"})
+    assert [g["slug"] for g in resp.context["groups"]] == ["night-drive"]
+    assert len(_files(resp)) == 3
+
+    resp = client.get(reverse("orders:downloads"), {"product": "summer-loop"})
+    assert [g["title"] for g in resp.context["groups"]] == ["Summer Loop"]
+
+    resp = client.get(reverse("orders:downloads"), {"q": "nothing"})
+    assert b"No purchases match." in resp.content
+
+
+# Renames and refunds reach the library
+@pytest.mark.django_db
+def test_library_follows_product_edits_and_refunds(client, user, owned_asset):
+    product = owned_asset.product
+    product.title = "Renamed"
+    product.save()
+    assert LibraryEntry.objects.get().product_title == "Renamed"
+
+    owned_asset.delete()
+    assert not LibraryEntry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_rebuild_library_restores_and_prunes(user, owned_asset):
+    LibraryEntry.objects.all().delete()
+    LibraryEntry.objects.create(
+        id=uuid.uuid4(),
+        user=user,
+        product=owned_asset.product,
+        digital_asset=owned_asset.digital_asset,
+        granted_at=timezone.now(),
+    )
+
+    assert rebuild_library() == 1
+    assert list(LibraryEntry.objects.values_list("pk", flat=True)) == [owned_asset.pk]
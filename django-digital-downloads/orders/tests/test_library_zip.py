@@ -0,0 +1,58 @@
+import io
+import zipfile
+
+import pytest
+from catalog.models import DigitalAsset, Product
+from django.urls import reverse
+from orders.models import Order, OrderItem, UserAsset
+
+
+def _zip(resp):
+    assert resp.status_code == 200
+    assert resp["Content-Type"] == "application/zip"
+    return zipfile.ZipFile(io.BytesIO(b"".join(resp.streaming_content)))
+
+
+@pytest.fixture
+def second_grant(user, protected_media):
+    product = Product.objects.create(slug="loop", title="Loop", price_pennies=299)
+    asset = DigitalAsset.objects.create(
+        product=product, file_path="samples/loop.mp3", file_name="loop.mp3"
+    )
+    (protected_media / "samples" / "loop.mp3").write_bytes(b"ID3" + b"\0" * 100)
+    return UserAsset.objects.create(user=user, product=product, digital_asset=asset)
+
+
+# Whole library streams as one archive; MP3s are stored uncompressed
+@pytest.mark.django_db
+def test_library_zip_contains_every_owned_file(client, user, owned_asset, second_grant):
+    client.force_login(user)
+    archive = _zip(client.get(reverse("orders:download_library_zip")))
+
+    assert sorted(archive.namelist()) == ["loop/loop.mp3", "sample/hello.txt"]
+    assert archive.read("sample/hello.txt") == b"hello"
+    assert archive.getinfo("loop/loop.mp3").compress_type == zipfile.ZIP_STORED
+    assert archive.testzip() is None
+
+
+# Per-order archive only includes that order's products
+@pytest.mark.django_db
+def test_order_zip_is_limited_to_order(client, user, owned_asset, second_grant):
+    order = Order.objects.create(user=user, status="paid")
+    OrderItem.objects.create(
+        order=order, product=second_grant.product, unit_price_pennies=299
+    )
+    client.force_login(user)
+    archive = _zip(client.get(reverse("orders:download_order_zip", args=[order.id])))
+    assert archive.namelist() == ["loop/loop.mp3"]
+
+
+# Other users' orders are not downloadable
+@pytest.mark.django_db
+def test_order_zip_requires_ownership(client, user, owned_asset, protected_media):
+    from django.contrib.auth.models import User
+
+    order = Order.objects.create(user=user, status="paid")
+    client.force_login(User.objects.create_user("mallory", password="x"))
+    resp = client.get(reverse("orders:download_order_zip", args=[order.id]))
+    assert resp.status_code != 200
@@ -0,0 +1,70 @@
+import pytest
+from catalog.models import DigitalAsset
+from django.core.cache import cache
+from django.urls import reverse
+from orders import views
+from orders.models import UserAsset
+
+
+@pytest.fixture
+def signed_in(client, user):
+    client.force_login(user)
+    return client
+
+
+def _revalidate(client, resp):
+    return client.get(
+        reverse("orders:downloads"),
+        HTTP_IF_NONE_MATCH=resp["ETag"],
+        HTTP_IF_MODIFIED_SINCE=resp["Last-Modified"],
+    )
+
+
+@pytest.mark.django_db
+def test_purchases_304_until_grants_change(signed_in, user, owned_asset, product):
+    first = signed_in.get(reverse("orders:downloads"))
+    assert first.status_code == 200
+    assert "private" in first["Cache-Control"]
+    assert _revalidate(signed_in, first).status_code == 304
+
+    owned_asset.delete()
+    assert _revalidate(signed_in, first).status_code == 200
+
+
+# The worker grants in another process: nothing in this one is told
+@pytest.mark.django_db
+def test_purchases_etag_sees_grants_from_other_processes(
+    signed_in, user, owned_asset, product
+):
+    first = signed_in.get(reverse("orders:downloads"))
+    extra = DigitalAsset.objects.create(
+        product=product, file_path="samples/extra.txt", file_name="extra.txt"
+    )
+    UserAsset.objects.bulk_create(
+        [UserAsset(user=user, product=product, digital_asset=extra)]
+    )
+    cache.clear()
+
+    assert _revalidate(signed_in, first).status_code == 200
+
+
+# Signed links on a revalidated page must not be about to expire
+@pytest.mark.django_db
+def test_purchases_validators_roll_with_link_window(
+    signed_in, owned_asset, monkeypatch
+):
+    first = signed_in.get(reverse("orders:downloads"))
+    next_window = views._link_window() + 1
+    monkeypatch.setattr(views, "_link_window", lambda: next_window)
+    assert _revalidate(signed_in, first).status_code == 200
+
+
+@pytest.mark.django_db
+def test_purchases_etag_is_per_user(client, user, owned_asset, django_user_model):
+    client.force_login(user)
+    mine = client.get(reverse("orders:downloads"))
+
+    other = django_user_model.objects.create_user("bob", password="pw")
+    client.force_login(other)
+    assert _revalidate(client, mine).status_code == 200
+    assert not UserAsset.objects.filter(user=other).exists()
@@ -0,0 +1,57 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from orders.signing import signed_download_url
+
+
+def _body(resp):
+    return b"".join(resp.streaming_content)
+
+
+# Purchases page hands out signed links
+@pytest.mark.django_db
+def test_purchases_page_mints_signed_links(client, user, owned_asset):
+    client.force_login(user)
+    resp = client.get(reverse("orders:downloads"))
+    prefix = reverse("orders:signed_download", args=["x"]).rsplit("x", 1)[0]
+    assert prefix.encode() in resp.content
+
+
+# Signed download needs no session: one primary-key check of the grant
+@pytest.mark.django_db
+def test_signed_download_checks_only_the_grant(
+    client, owned_asset, protected_media, django_assert_num_queries
+):
+    url = signed_download_url(owned_asset)
+    with django_assert_num_queries(1):
+        resp = client.get(url)
+    assert resp.status_code == 200
+    assert _body(resp) == b"hello"
+
+
+# Tampered tokens are rejected
+@pytest.mark.django_db
+def test_signed_download_rejects_tampering(client, owned_asset, protected_media):
+    url = signed_download_url(owned_asset)
+    resp = client.get(url[:-3] + "abc/")
+    assert resp.status_code != 200
+
+
+# Expired links fall back to the login-checked route
+@pytest.mark.django_db
+def test_signed_download_expired_redirects(client, owned_asset, protected_media):
+    url = signed_download_url(owned_asset, ttl=-1)
+    resp = client.get(url)
+    assert resp.status_code == 302
+    assert resp["Location"] == reverse("orders:download", args=[owned_asset.id])
+
+
+# Refund (grant deleted) revokes links already handed out, in every worker
+@pytest.mark.django_db
+def test_signed_download_revoked_on_refund(client, owned_asset, protected_media):
+    url = signed_download_url(owned_asset)
+    owned_asset.delete()
+    cache.clear()  # another worker's cache never saw the refund
+    resp = client.get(url)
+    assert resp.status_code != 200
+    assert not hasattr(resp, "streaming_content")
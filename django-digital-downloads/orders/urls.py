@@ -1,12 +1,27 @@
 from django.urls import path
 
-from .views import download_asset, order_detail, order_history, purchases
+from .views import (
+    download_asset,
+    download_library_zip,
+    download_order_zip,
+    order_detail,
+    order_history,
+    order_history_api,
+    purchases,
+    signed_download,
+)
 
 app_name = "orders"
 
 urlpatterns = [
     path("", order_history, name="history"),
+    path("api/history/", order_history_api, name="history_api"),
     path("<uuid:order_id>/", order_detail, name="detail"),
     path("downloads/", purchases, name="downloads"),
+    path("downloads/all.zip", download_library_zip, name="download_library_zip"),
+    path(
+        "<uuid:order_id>/downloads.zip", download_order_zip, name="download_order_zip"
+    ),
     path("download/<uuid:asset_id>/", download_asset, name="download"),
+    path("dl/<str:token>/", signed_download, name="signed_download"),
 ]
@@ -1,19 +1,119 @@
-import mimetypes
-from pathlib import Path
+from datetime import datetime, timezone
 
+from core.conditional import conditional_page, make_etag, viewer
+from core.pagination import InvalidCursor, paginate
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import FileResponse, Http404, HttpResponse
-from django.shortcuts import get_object_or_404, render
+from django.core import signing
+from django.db.models import Count, Max, OuterRef, Prefetch, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods
 
+from .downloads import deliver, protected_path
+from .library import group_by_product, library_page
 from .models import Order, OrderItem, UserAsset
+from .signing import (
+    ExpiredToken,
+    is_revoked,
+    read_download_token,
+    signed_entry_url,
+)
+from .zipstream import iter_zip
+
+MAX_HISTORY_PAGE_SIZE = 100
+
+
+def _history_page(user, cursor, page_size: int):
+    """
+    One page of the user's orders, newest first, with an item count per
+    order and its lines (title, quantity, price) prefetched in one query.
+    The count is a correlated subquery, so it is only computed for the
+    rows on the page.
+    """
+    item_count = (
+        OrderItem.objects.filter(order=OuterRef("pk"))
+        .values("order")
+        .annotate(n=Sum("quantity"))
+        .values("n")
+    )
+    lines = (
+        OrderItem.objects.select_related("product")
+        .only("order", "quantity", "unit_price_pennies", "product__title")
+        .order_by("product__title")
+    )
+    orders = (
+        Order.objects.filter(user=user)
+        .only("id", "status", "currency", "total_pennies", "created_at")
+        .annotate(item_count=Coalesce(Subquery(item_count), 0))
+        .prefetch_related(Prefetch("items", queryset=lines, to_attr="lines"))
+    )
+    return paginate(orders, cursor, page_size)
+
+
+def _order_json(order) -> dict:
+    return {
+        "id": str(order.id),
+        "created_at": order.created_at.isoformat(),
+        "status": order.status,
+        "currency": order.currency,
+        "total_pennies": order.total_pennies,
+        "item_count": order.item_count,
+        "items": [
+            {
+                "title": item.product.title,
+                "quantity": item.quantity,
+                "unit_price_pennies": item.unit_price_pennies,
+            }
+            for item in order.lines
+        ],
+        "url": reverse("orders:detail", args=[order.id]),
+    }
 
 
 # Orders and Purchases Views
 @login_required
 def order_history(request):
-    orders = Order.objects.filter(user=request.user).order_by("-created_at")
-    return render(request, "orders/history.html", {"orders": orders})
+    cursor = request.GET.get("cursor")
+    try:
+        page = _history_page(request.user, cursor, settings.ORDER_HISTORY_PAGE_SIZE)
+    except InvalidCursor:
+        # Stale or mangled link: start again from the newest orders
+        page = _history_page(request.user, None, settings.ORDER_HISTORY_PAGE_SIZE)
+    return render(request, "orders/history.html", {"page": page})
+
+
+# Order History API (infinite scroll)
+@login_required
+def order_history_api(request):
+    try:
+        page_size = int(
+            request.GET.get("page_size") or settings.ORDER_HISTORY_PAGE_SIZE
+        )
+    except ValueError:
+        return JsonResponse({"error": "Invalid page_size"}, status=400)
+    page_size = max(1, min(page_size, MAX_HISTORY_PAGE_SIZE))
+
+    try:
+        page = _history_page(request.user, request.GET.get("cursor"), page_size)
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor"}, status=400)
+
+    next_url = None
+    if page.next_cursor:
+        next_url = (
+            f"{reverse('orders:history_api')}?cursor={page.next_cursor}"
+            f"&page_size={page_size}"
+        )
+    return JsonResponse(
+        {
+            "results": [_order_json(o) for o in page.items],
+            "next_cursor": page.next_cursor,
+            "next": next_url,
+        }
+    )
 
 
 # Order Detail View
@@ -24,36 +124,128 @@ def order_detail(request, order_id):
     return render(request, "orders/detail.html", {"order": order, "items": items})
 
 
+# Purchases validators. The page embeds signed links that expire after
+# DOWNLOAD_URL_TTL, so validators also roll over every half TTL: a 304
+# never leaves the browser holding links with under half their life left.
+def _link_window() -> int:
+    return int(datetime.now(timezone.utc).timestamp()) // (
+        settings.DOWNLOAD_URL_TTL // 2
+    )
+
+
+def _grant_state(request) -> dict:
+    """Count and newest grant time, read once for both validators."""
+    if not hasattr(request, "_grant_state"):
+        request._grant_state = UserAsset.objects.filter(user=request.user).aggregate(
+            count=Count("id"), latest=Max("granted_at")
+        )
+    return request._grant_state
+
+
+def _purchases_etag(request):
+    # From the database, so grants made by the worker process count too
+    state = _grant_state(request)
+    return make_etag(viewer(request), state["count"], state["latest"], _link_window())
+
+
+def _purchases_last_modified(request):
+    latest = _grant_state(request)["latest"]
+    window_start = datetime.fromtimestamp(
+        _link_window() * (settings.DOWNLOAD_URL_TTL // 2), tz=timezone.utc
+    )
+    return max(latest, window_start) if latest else window_start
+
+
 # Purchases View
 @login_required
+@conditional_page(_purchases_etag, _purchases_last_modified)
 def purchases(request) -> HttpResponse:
-    assets = (
-        UserAsset.objects.select_related("product", "digital_asset")
-        .filter(user=request.user)
-        .order_by("-granted_at")
+    q = request.GET.get("q", "").strip()
+    product = request.GET.get("product", "").strip()
+    cursor, size = request.GET.get("cursor"), settings.PURCHASES_PAGE_SIZE
+    try:
+        page = library_page(request.user, cursor, size, q=q, product=product)
+    except InvalidCursor:
+        # Stale or mangled link: start again from the newest grants
+        page = library_page(request.user, None, size, q=q, product=product)
+    for entry in page.items:
+        entry.download_url = signed_entry_url(entry)
+    return render(
+        request,
+        "orders/purchases.html",
+        {
+            "page": page,
+            "groups": group_by_product(page.items),
+            "q": q,
+            "product": product,
+        },
     )
-    return render(request, "orders/purchases.html", {"assets": assets})
 
 
 # Download Asset View
 @login_required
-def download_asset(request, asset_id) -> FileResponse:
+@require_http_methods(["GET", "HEAD"])
+def download_asset(request, asset_id) -> HttpResponse:
     ua = get_object_or_404(
         UserAsset.objects.select_related("digital_asset", "product"),
         id=asset_id,
         user=request.user,
     )
-    # Ensure the file exists
-    rel_path = ua.digital_asset.file_path.lstrip("/\\")
-    abs_path = Path(settings.BASE_DIR) / "protected_media" / rel_path
-    if not abs_path.exists() or not abs_path.is_file():
-        raise Http404("File not found")
-    # Serve the file as an attachment
-    mime, _ = mimetypes.guess_type(abs_path.name)
-    response = FileResponse(open(abs_path, "rb"), as_attachment=True)
-    if mime:
-        response["Content-Type"] = mime
-    response["Content-Disposition"] = (
-        f'attachment; filename="{ua.digital_asset.file_name}"'
+    # Entitlement checked above; the delivery backend moves the bytes
+    return deliver(
+        request,
+        ua.digital_asset.file_path,
+        ua.digital_asset.file_name,
+        sha256=ua.digital_asset.sha256,
+    )
+
+
+# Signed Download View (no session lookup; one grant check)
+@require_http_methods(["GET", "HEAD"])
+def signed_download(request, token: str) -> HttpResponse:
+    try:
+        grant = read_download_token(token)
+    except ExpiredToken as exc:
+        # Old tab: fall back to the login-checked route for this grant
+        return redirect("orders:download", asset_id=exc.grant.user_asset_id)
+    except signing.BadSignature:
+        raise Http404("Invalid download link")
+    if is_revoked(grant):
+        raise Http404("Download link revoked")
+    return deliver(request, grant.file_path, grant.file_name, sha256=grant.sha256)
+
+
+# Library ZIP Views
+def _zip_entries(grants):
+    for ua in grants.iterator(chunk_size=200):
+        asset = ua.digital_asset
+        yield f"{ua.product.slug}/{asset.file_name}", protected_path(asset.file_path)
+
+
+def _zip_response(grants, filename: str) -> StreamingHttpResponse:
+    grants = grants.select_related("product", "digital_asset").only(
+        "product__slug", "digital_asset__file_path", "digital_asset__file_name"
+    )
+    response = StreamingHttpResponse(
+        iter_zip(_zip_entries(grants.order_by("product__slug", "granted_at"))),
+        content_type="application/zip",
     )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["Cache-Control"] = "private, no-store"
     return response
+
+
+@login_required
+def download_library_zip(request) -> StreamingHttpResponse:
+    grants = UserAsset.objects.filter(user=request.user)
+    return _zip_response(grants, "my-library.zip")
+
+
+@login_required
+def download_order_zip(request, order_id) -> StreamingHttpResponse:
+    order = get_object_or_404(Order, id=order_id, user=request.user)
+    grants = UserAsset.objects.filter(
+        user=request.user,
+        product_id__in=OrderItem.objects.filter(order=order).values("product_id"),
+    )
+    return _zip_response(grants, f"order-{order.id}.zip")
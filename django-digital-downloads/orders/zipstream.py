@@ -0,0 +1,102 @@
+"""
+On-the-fly ZIP archives of purchased files.
+
+Archives are produced by zipfile writing into a non-seekable sink, so each
+entry uses a trailing data descriptor and bytes can be yielded as soon as
+they are written. Nothing is buffered beyond one read chunk and no
+temporary archive touches the disk.
+"""
+
+from __future__ import annotations
+
+import logging
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Already-compressed formats: deflating them only burns CPU
+STORED_EXTENSIONS = {
+    ".mp3",
+    ".m4a",
+    ".aac",
+    ".ogg",
+    ".opus",
+    ".flac",
+    ".zip",
+    ".jpg",
+    ".jpeg",
+    ".png",
+}
+
+
+class _Sink:
+    """Write-only, non-seekable buffer drained by the generator."""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _unique(name: str, used: set) -> str:
+    if name not in used:
+        used.add(name)
+        return name
+    stem, dot, ext = name.rpartition(".")
+    if not dot:
+        stem, ext = name, ""
+    n = 2
+    while True:
+        candidate = f"{stem} ({n}){dot}{ext}"
+        if candidate not in used:
+            used.add(candidate)
+            return candidate
+        n += 1
+
+
+def iter_zip(entries: Iterable[Tuple[str, Path]]) -> Iterator[bytes]:
+    """
+    Yield a ZIP archive of (arcname, path) entries chunk by chunk.
+    Missing files are skipped.
+    """
+    sink = _Sink()
+    used: set = set()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as zf:
+        for arcname, path in entries:
+            try:
+                info = zipfile.ZipInfo.from_file(path, _unique(arcname, used))
+                src = open(path, "rb")
+            except OSError:
+                logger.warning("Skipping missing file in archive: %s", path)
+                continue
+            if path.suffix.lower() in STORED_EXTENSIONS:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+            with src, zf.open(info, "w") as dst:
+                while chunk := src.read(CHUNK_SIZE):
+                    dst.write(chunk)
+                    if data := sink.drain():
+                        yield data
+            if data := sink.drain():
+                yield data
+    yield sink.drain()
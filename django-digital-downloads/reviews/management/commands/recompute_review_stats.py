@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from reviews.utils import recompute_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild Product review_count / rating_sum / rating histogram from reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = recompute_stats(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"[recompute_review_stats] Updated stats for {updated} reviewed "
+                "products; all others reset to zero."
+            )
+        )
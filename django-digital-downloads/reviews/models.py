@@ -22,6 +22,13 @@ class Review(models.Model):
     class Meta:
         ordering = ("-created_at",)
         unique_together = (("product", "user"),)
+        indexes = [
+            # Product page review list, newest first
+            models.Index(
+                fields=["product", "-created_at", "-id"],
+                name="reviews_product_created",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product.title} — {self.user} ({self.rating}/5)"
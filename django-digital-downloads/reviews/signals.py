@@ -0,0 +1,19 @@
+from catalog.cache import bump_product
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Review
+from .utils import apply_rating_change
+
+
+# Reviews removed in the admin (or by cascade) leave the product stats
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    apply_rating_change(instance.product_id, instance.rating, None)
+    bump_product(instance.product_id)
+
+
+# Review text and stats are cached with the product page
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, **kwargs):
+    bump_product(instance.product_id)
@@ -0,0 +1,80 @@
+import pytest
+from catalog.models import Product
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from reviews.models import Review
+
+
+def _post_review(client, product, rating, comment=""):
+    return client.post(
+        reverse("reviews:add", args=[product.slug]),
+        {"rating": rating, "comment": comment},
+    )
+
+
+# Adding and editing a review keeps the product aggregates in step
+@pytest.mark.django_db
+def test_add_review_updates_product_stats(client, user, product):
+    client.force_login(user)
+    _post_review(client, product, 4)
+    product.refresh_from_db()
+    assert (product.review_count, product.rating_sum, product.rating_4) == (1, 4, 1)
+
+    _post_review(client, product, 2)  # same user edits their review
+    product.refresh_from_db()
+    assert (product.review_count, product.rating_sum) == (1, 2)
+    assert (product.rating_4, product.rating_2) == (0, 1)
+    assert product.average_rating == 2.0
+
+
+# Out-of-range ratings are clamped to 1-5
+@pytest.mark.django_db
+def test_add_review_clamps_rating(client, user, product):
+    client.force_login(user)
+    _post_review(client, product, 9)
+    assert Review.objects.get().rating == 5
+
+
+# Deleting a review (e.g. in the admin) decrements the stats
+@pytest.mark.django_db
+def test_deleting_review_updates_stats(client, user, product):
+    client.force_login(user)
+    _post_review(client, product, 3)
+    Review.objects.get().delete()
+    product.refresh_from_db()
+    assert (product.review_count, product.rating_sum, product.rating_3) == (0, 0, 0)
+
+
+# Backfill command rebuilds stats from the reviews table
+@pytest.mark.django_db
+def test_recompute_review_stats_command(user, product):
+    other = User.objects.create_user("bob", password="x")
+    Review.objects.bulk_create(
+        [
+            Review(product=product, user=user, rating=5),
+            Review(product=product, user=other, rating=2),
+        ]
+    )
+    Product.objects.filter(pk=product.pk).update(review_count=99)
+
+    call_command("recompute_review_stats")
+    product.refresh_from_db()
+    assert product.review_count == 2
+    assert product.rating_sum == 7
+    assert product.rating_histogram == [(5, 1), (4, 0), (3, 0), (2, 1), (1, 0)]
+
+
+# Detail page renders reviews without one query per reviewer
+@pytest.mark.django_db
+def test_detail_reviews_query_count_is_flat(client, product, django_assert_num_queries):
+    users = User.objects.bulk_create(
+        [User(username=f"u{i}", password="!") for i in range(8)]
+    )
+    Review.objects.bulk_create(
+        [Review(product=product, user=u, rating=4) for u in users]
+    )
+    url = reverse("catalog:detail", args=[product.slug])
+    with django_assert_num_queries(3):  # product, review count, review page
+        resp = client.get(url)
+    assert b"u7" in resp.content
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from catalog.cache import bump_all
+from catalog.models import Product
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import Review
+
+__all__ = ["clamp_rating", "save_review", "apply_rating_change", "recompute_stats"]
+
+STAT_FIELDS = ["review_count", "rating_sum"] + [f"rating_{n}" for n in range(1, 6)]
+
+
+def clamp_rating(value) -> int:
+    try:
+        return min(5, max(1, int(value)))
+    except (TypeError, ValueError):
+        return 5
+
+
+def apply_rating_change(product_id, old: int | None, new: int | None) -> None:
+    """
+    Adjust Product's denormalized review stats for one review changing
+    from `old` to `new` rating (None = no review). Single UPDATE with F();
+    always touches updated_at, since the review text may have changed.
+    """
+    deltas = {"review_count": 0, "rating_sum": 0}
+    if old is not None:
+        deltas["review_count"] -= 1
+        deltas["rating_sum"] -= old
+        if 1 <= old <= 5:
+            deltas[f"rating_{old}"] = deltas.get(f"rating_{old}", 0) - 1
+    if new is not None:
+        deltas["review_count"] += 1
+        deltas["rating_sum"] += new
+        if 1 <= new <= 5:
+            deltas[f"rating_{new}"] = deltas.get(f"rating_{new}", 0) + 1
+
+    updates = {name: F(name) + delta for name, delta in deltas.items() if delta}
+    Product.objects.filter(pk=product_id).update(updated_at=timezone.now(), **updates)
+
+
+def save_review(product, user, rating, comment: str) -> Review:
+    """Create or update the user's review and its product stats atomically."""
+    rating = clamp_rating(rating)
+    with transaction.atomic():
+        # A first review has no row to lock yet, so lock the product and
+        # read the old rating with it: concurrent saves for the product (a
+        # double click) see each other's reviews instead of both seeing None
+        old_rating = Review.objects.filter(product=OuterRef("pk"), user=user)
+        previous = (
+            Product.objects.select_for_update()
+            .filter(pk=product.pk)
+            .values_list(Subquery(old_rating.values("rating")[:1]), flat=True)
+            .get()
+        )
+        review, _ = Review.objects.update_or_create(
+            product=product,
+            user=user,
+            defaults={"rating": rating, "comment": comment},
+        )
+        apply_rating_change(product.pk, previous, rating)
+    return review
+
+
+def recompute_stats(batch_size: int = 1000) -> int:
+    """Rebuild every product's review stats from the reviews table."""
+    rows = (
+        Review.objects.order_by()
+        .values("product_id")
+        .annotate(
+            review_count=Count("id"),
+            rating_sum=Sum("rating"),
+            **{f"rating_{n}": Count("id", filter=Q(rating=n)) for n in range(1, 6)},
+        )
+    )
+    products = [Product(pk=row.pop("product_id"), **row) for row in rows.iterator()]
+    with transaction.atomic():
+        Product.objects.update(
+            updated_at=timezone.now(), **{name: 0 for name in STAT_FIELDS}
+        )
+        Product.objects.bulk_update(products, STAT_FIELDS, batch_size=batch_size)
+        bump_all()
+    return len(products)
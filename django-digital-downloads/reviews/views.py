@@ -3,7 +3,7 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect
 
-from .models import Review
+from .utils import save_review
 
 # Create your views here.
 
@@ -13,15 +13,12 @@ def add_review(request, slug):
     if request.method != "POST":
         return redirect("catalog:detail", slug=slug)
 
-    product = get_object_or_404(Product, slug=slug, active=True)
-    rating = int(request.POST.get("rating") or 5)
+    product = get_object_or_404(Product.objects.only("id"), slug=slug, active=True)
+    rating = request.POST.get("rating") or 5
     comment = (request.POST.get("comment") or "").strip()
 
-    # Enforce 1 review per user per product (per model Meta)
-    Review.objects.update_or_create(
-        product=product,
-        user=request.user,
-        defaults={"rating": rating, "comment": comment},
-    )
+    # Enforce 1 review per user per product (per model Meta); keeps the
+    # product's rating stats in step within the same transaction
+    save_review(product, request.user, rating, comment)
     messages.success(request, "Thanks for your review!")
     return redirect("catalog:detail", slug=slug)
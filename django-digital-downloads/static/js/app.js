@@ -12,20 +12,20 @@ const CSRF = getCookie("csrftoken");
 
 // Django to inject URLs; fallback to paths.
 const APP_URLS = (window.APP_URLS || {
-  cartAdd: "/cart/add/",
-  cartUpdate: "/cart/update/",
-  cartRemove: "/cart/remove/",
+  cartBatch: "/cart/api/batch/",
 });
 
 /**
  * POST JSON helper
  * @param {string} url
  * @param {object} data
+ * @param {boolean} [keepalive] let the request outlive the page
  * @returns {Promise<object>}
  */
-async function postJSON(url, data) {
+async function postJSON(url, data, keepalive = false) {
   const res = await fetch(url, {
     method: "POST",
+    keepalive,
     headers: {
       "Content-Type": "application/json",
       "X-CSRFToken": CSRF || "",
@@ -45,56 +45,270 @@ async function postJSON(url, data) {
   return res.json();
 }
 
+// Cart edits go to the batch endpoint. Quick successive changes are
+// collected for CART_BATCH_DELAY_MS and sent as one request; only one
+// request is in flight at a time, so batches apply in order. Leaving the
+// page (or following the checkout link) sends whatever is still queued.
+const CART_BATCH_DELAY_MS = 400;
+const cartOps = new Map(); // product id -> one op with the same effect as its queue
+let cartTimer = null;
+let cartInFlight = null;
+
+// Fold `op` into the op already queued for its product. "set" and
+// "remove" replace what came before; an "add" adds to it.
+function mergeCartOp(previous, op) {
+  if (op.op !== "add" || !previous) return op;
+  if (previous.op === "remove") return { ...op, op: "set" };
+  return { ...op, op: previous.op, qty: previous.qty + op.qty };
+}
+
+function queueCartOp(op) {
+  cartOps.set(op.product_id, mergeCartOp(cartOps.get(op.product_id), op));
+  clearTimeout(cartTimer);
+  cartTimer = setTimeout(() => {
+    flushCartOps().catch(cartFailed);
+  }, CART_BATCH_DELAY_MS);
+}
+
+async function flushCartOps() {
+  clearTimeout(cartTimer);
+  while (cartInFlight) {
+    await cartInFlight.catch(() => null);
+  }
+  if (!cartOps.size) return null;
+  const ops = Array.from(cartOps.values());
+  cartOps.clear();
+  cartInFlight = postJSON(APP_URLS.cartBatch, { ops });
+  try {
+    const cart = await cartInFlight;
+    renderCart(cart);
+    return cart;
+  } finally {
+    cartInFlight = null;
+  }
+}
+
+// Last chance for queued edits when the page goes away
+window.addEventListener("pagehide", () => {
+  clearTimeout(cartTimer);
+  if (!cartOps.size) return;
+  const ops = Array.from(cartOps.values());
+  cartOps.clear();
+  postJSON(APP_URLS.cartBatch, { ops }, true).catch(() => null);
+});
+
+function formatPennies(p) {
+  return (Math.floor(p / 100)) + "." + String(p % 100).padStart(2, "0");
+}
+
+function renderCart(cart) {
+  const table = document.querySelector("[data-batch-url]");
+  if (!table) return;
+  const lines = new Map(cart.lines.map((line) => [line.id, line]));
+  if (!lines.size) {
+    window.location.reload(); // shows the empty cart and hides checkout
+    return;
+  }
+  table.querySelectorAll("tr[data-product-id]").forEach((row) => {
+    const line = lines.get(row.dataset.productId);
+    if (!line) {
+      row.remove();
+      return;
+    }
+    const total = row.querySelector(".js-line-total");
+    if (total) total.textContent = "\u00a3" + formatPennies(line.line_total_pennies);
+  });
+  document.querySelectorAll(".js-items").forEach((el) => {
+    el.textContent = cart.items;
+  });
+  document.querySelectorAll(".js-subtotal").forEach((el) => {
+    el.textContent = formatPennies(cart.subtotal_pennies);
+  });
+}
+
+function cartFailed(e) {
+  alert(e.message || "Could not update cart");
+  window.location.reload();
+}
+
 // 1) Product detail: Add to cart
 document.addEventListener("click", async (ev) => {
   const btn = ev.target.closest("#btnAddToCart");
   if (!btn) return;
 
+  const qtyEl = document.getElementById("qty");
+  const qty = Math.max(1, parseInt((qtyEl && qtyEl.value) || "1", 10));
+  if (!CSRF) {
+    // Cached product pages set no CSRF cookie: follow the link instead
+    btn.href = btn.href.split("?")[0] + "?qty=" + qty;
+    return;
+  }
+  ev.preventDefault();
+  queueCartOp({ op: "add", product_id: btn.dataset.productId, qty });
   try {
-    const productId = btn.dataset.productId;
-    const qtyEl = document.getElementById("qty");
-    const qty = Math.max(1, parseInt((qtyEl && qtyEl.value) || "1", 10));
-
-    await postJSON(APP_URLS.cartAdd, { product_id: productId, qty });
-
+    await flushCartOps();
     alert("Added to cart");
   } catch (e) {
     alert(e.message || "Could not add to cart");
   }
 });
 
-// 2) Cart page: change quantity
-document.addEventListener("change", async (ev) => {
+// 2) Cart page: change quantity as the user types
+document.addEventListener("input", (ev) => {
   const input = ev.target.closest(".js-qty");
   if (!input) return;
 
   const row = input.closest("tr");
   const productId = row ? row.dataset.productId : null;
-  if (!productId) return;
-
-  const qty = Math.max(1, parseInt(input.value || "1", 10));
-  try {
-    await postJSON(APP_URLS.cartUpdate, { product_id: productId, qty });
+  const qty = parseInt(input.value, 10);
+  if (!productId || !(qty >= 1)) return;
 
-    window.location.reload();
-  } catch (e) {
-    alert(e.message || "Update failed");
-  }
+  queueCartOp({ op: "set", product_id: productId, qty });
 });
 
 // 3) Cart page: remove line
-document.addEventListener("click", async (ev) => {
+document.addEventListener("click", (ev) => {
   const btn = ev.target.closest(".js-remove");
   if (!btn) return;
 
   const row = btn.closest("tr");
   const productId = row ? row.dataset.productId : null;
-  if (!productId) return;
+  if (!productId || !CSRF) return;
 
+  ev.preventDefault();
+  queueCartOp({ op: "remove", product_id: productId });
+  flushCartOps().catch(cartFailed);
+});
+
+// 4) Cart page: checkout only once queued edits are saved
+document.addEventListener("click", async (ev) => {
+  const link = ev.target.closest(".js-checkout");
+  if (!link || !(cartOps.size || cartInFlight)) return;
+
+  ev.preventDefault();
   try {
-    await postJSON(APP_URLS.cartRemove, { product_id: productId });
-    window.location.reload();
+    await flushCartOps();
+    window.location.href = link.href;
   } catch (e) {
-    alert(e.message || "Remove failed");
+    cartFailed(e);
+  }
+});
+
+// 5) Search box: type-ahead suggestions
+const SUGGEST_DELAY_MS = 120;
+let suggestTimer = null;
+let suggestAbort = null;
+
+function renderSuggestions(list, results) {
+  list.replaceChildren(
+    ...results.map((r) => {
+      const a = document.createElement("a");
+      a.className = "list-group-item list-group-item-action";
+      a.href = r.url;
+      a.textContent = r.title;
+      return a;
+    })
+  );
+}
+
+document.addEventListener("input", (ev) => {
+  const input = ev.target.closest(".js-suggest");
+  if (!input) return;
+  const list = input.form.querySelector(".js-suggest-list");
+  if (!list) return;
+
+  clearTimeout(suggestTimer);
+  const q = input.value.trim();
+  if (!q) {
+    renderSuggestions(list, []);
+    return;
   }
+  suggestTimer = setTimeout(async () => {
+    if (suggestAbort) suggestAbort.abort();
+    suggestAbort = new AbortController();
+    try {
+      const url = input.dataset.suggestUrl + "?q=" + encodeURIComponent(q);
+      const res = await fetch(url, { signal: suggestAbort.signal });
+      if (res.ok) renderSuggestions(list, (await res.json()).results || []);
+    } catch (_) { /* superseded by a newer keystroke */ }
+  }, SUGGEST_DELAY_MS);
+});
+
+document.addEventListener("click", (ev) => {
+  if (ev.target.closest(".js-suggest")) return;
+  document.querySelectorAll(".js-suggest-list").forEach((list) => {
+    renderSuggestions(list, []);
+  });
 });
+
+// 6) Order history: load older orders as the list scrolls into view
+function orderRow(order) {
+  const row = document.createElement("div");
+  row.className = "list-group-item";
+  const head = document.createElement("div");
+  head.className = "d-flex justify-content-between align-items-center";
+  const info = document.createElement("div");
+  const title = document.createElement("div");
+  title.className = "fw-semibold";
+  title.textContent = "Order #" + order.id;
+  const meta = document.createElement("div");
+  meta.className = "small text-muted";
+  const status = order.status.charAt(0).toUpperCase() + order.status.slice(1);
+  meta.textContent = [
+    order.created_at.slice(0, 16).replace("T", " "),
+    status,
+    order.currency + " " + formatPennies(order.total_pennies),
+    order.item_count + (order.item_count === 1 ? " item" : " items"),
+  ].join(" \u00b7 ");
+  const view = document.createElement("a");
+  view.className = "btn btn-sm btn-outline-primary";
+  view.href = order.url;
+  view.textContent = "View";
+  info.append(title, meta);
+  head.append(info, view);
+  row.append(head);
+  if (order.items.length) {
+    const details = document.createElement("div");
+    details.className = "small mt-1 text-muted";
+    const titles = order.items
+      .slice(0, 3)
+      .map((item) => item.title + " \u00d7 " + item.quantity)
+      .join(", ");
+    const more = order.items.length - 3;
+    details.textContent = more > 0 ? titles + " and " + more + " more" : titles;
+    row.append(details);
+  }
+  return row;
+}
+
+const moreOrders = document.querySelector(".js-more-orders");
+if (moreOrders && "IntersectionObserver" in window) {
+  const list = document.querySelector(".js-order-list");
+  let nextUrl = moreOrders.dataset.apiUrl;
+  let loading = false;
+  const observer = new IntersectionObserver(async (entries) => {
+    if (!entries.some((e) => e.isIntersecting) || loading || !nextUrl) return;
+    loading = true;
+    try {
+      const res = await fetch(nextUrl, { headers: { Accept: "application/json" } });
+      if (!res.ok) throw new Error("Could not load orders");
+      const page = await res.json();
+      list.append(...page.results.map(orderRow));
+      nextUrl = page.next;
+      if (page.next_cursor) {
+        moreOrders.href = "?cursor=" + page.next_cursor;
+        // Re-check: on a tall screen the link may still be in view
+        observer.unobserve(moreOrders);
+        observer.observe(moreOrders);
+      } else {
+        observer.disconnect();
+        moreOrders.remove();
+      }
+    } catch (_) {
+      observer.disconnect(); // leave the plain link to page on
+    } finally {
+      loading = false;
+    }
+  }, { rootMargin: "200px" });
+  observer.observe(moreOrders);
+}